@@ -0,0 +1,189 @@
+# Benchmarks of the build, lowering and simulation stages of the level 1 and level 2 Shor codes
+#
+#   python benchmark.py            run the stages and compare them against benchmark-baseline.json
+#   python benchmark.py --save     run the stages and store the results as the new baseline
+#
+# Every stage reports its wall time (best of --repeat runs) and the peak memory allocated by Python during one extra
+# traced run (tracemalloc slows the code down, so it is kept out of the timed runs). The sampling stages also report
+# shots per second. A stage is a regression when it is more than --tolerance times slower, or uses more than
+# --tolerance times the memory, than in the baseline. The baseline records the machine it was measured on and the commit
+# of every stage; timings from another machine are not compared, and a change that makes a stage faster or slower on
+# purpose records a new baseline for it (python benchmark.py --save --only STAGE) in the same commit.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import cirq
+import numpy as np
+from qualtran import Bloq
+
+import code_concatenation as cc
+from code_concatenation import LEVEL_QUBITS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, 'benchmark-baseline.json')
+
+# physical error rate and number of shots of the sampling stages
+ERROR_RATE = 0.03
+SHOTS = {'cirq after encoding': 200, 'cirq everywhere': 10, 1: 10**6}
+
+# timings and peaks below these are noise and are not compared
+NOISE_FLOOR = {'seconds': 0.01, 'peak_mb': 1.0}
+
+
+def build_stage(bloq):
+    # decompose without the decomposition cache, so that the sub-bloqs are built again as well
+    def run():
+        cc.DECOMPOSITIONS.clear()
+        Bloq.decompose_bloq(bloq)
+    return run
+
+
+# as_composite_bloq().to_cirq_circuit(...) and the decomposition of the result into the project gates
+def lowering_stage(bloq, level):
+    def run():
+        cc.DECOMPOSITIONS.clear()
+        cc.lower_to_cirq(bloq, **LEVEL_QUBITS[level])
+    return run
+
+
+def simulate_stage():
+    circuit, _ = cc.ShorCodeAll().as_composite_bloq().to_cirq_circuit(**LEVEL_QUBITS[1])
+    simulator = cirq.Simulator()
+    def run():
+        simulator.simulate(circuit)
+    return run
+
+
+def sampling_stage(sampler, shots):
+    def run():
+        sampler.sample(shots, ERROR_RATE, seed=0)
+        return shots
+    return run
+
+
+# name -> function running the stage once, the sampling stages return their number of shots
+def make_stages():
+    stages = {}
+    for bloq in [cc.ShorEncode(), cc.ShorSyndrome(), cc.ShorRecovery(), cc.ShorDecode(), cc.ShorCodeAll(),
+                 cc.concatenatedShor_encode(), cc.concatenatedShor_syndrome(), cc.concatenatedShor_recovery(),
+                 cc.concatenatedShor_decode(), cc.concatenatedShorAll()]:
+        stages[f'build {type(bloq).__name__}'] = build_stage(bloq)
+
+    stages['lower ShorCodeAll'] = lowering_stage(cc.ShorCodeAll(), 1)
+    stages['lower concatenatedShorAll'] = lowering_stage(cc.concatenatedShorAll(), 2)
+    stages['simulate ShorCodeAll'] = simulate_stage()
+
+    # the circuits of the error-rate sweeps
+    for model in cc.NOISE_MODELS:
+        sampler = cc.CirqSampler(cc.noisy_circuit(1, model))
+        stages[f'sweep cirq level 1 {model}'] = sampling_stage(sampler, SHOTS[f'cirq {model}'])
+    # (the Pauli-frame sampler rejects the level 2 circuit, whose noiseless syndromes are random)
+    for model in cc.NOISE_MODELS:
+        stages[f'sweep frame level 1 {model}'] = sampling_stage(cc.frame_sampler(1, model), SHOTS[1])
+    return stages
+
+
+def measure(run, repeat: int) -> dict:
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        shots = run()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {'seconds': min(seconds), 'peak_mb': peak / 2**20}
+    if shots is not None:
+        result['shots_per_second'] = shots / result['seconds']
+    return result
+
+
+# stages that got slower or bigger than tolerance times the baseline
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    slow = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for field in ['seconds', 'peak_mb']:
+            if result[field] > tolerance * max(base[field], NOISE_FLOOR[field]):
+                slow.append((name, field, result[field] / base[field]))
+    return slow
+
+
+def report(results: dict, baseline: dict):
+    print(f'{"stage":<40} {"seconds":>10} {"baseline":>10} {"ratio":>7} {"peak MB":>9} {"shots/s":>12}')
+    for name, result in results.items():
+        base = baseline.get(name)
+        base_seconds = f'{base["seconds"]:10.4f}' if base else f'{"-":>10}'
+        ratio = f'{result["seconds"] / base["seconds"]:7.2f}' if base else f'{"-":>7}'
+        shots = f'{result["shots_per_second"]:12.0f}' if 'shots_per_second' in result else f'{"-":>12}'
+        print(f'{name:<40} {result["seconds"]:10.4f} {base_seconds} {ratio} {result["peak_mb"]:9.2f} {shots}')
+
+
+def machine() -> dict:
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'numpy': np.__version__, 'cirq': cirq.__version__}
+
+
+# commit the results were measured at (None outside of a git checkout)
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the Shor code stages')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline JSON file')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage, the best one is reported')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='slowdown (or memory growth) factor that fails')
+    parser.add_argument('--only', default='', help='only run the stages whose name contains this string')
+    args = parser.parse_args(argv)
+
+    stages = {name: run for name, run in make_stages().items() if args.only in name}
+    results = {name: measure(run, args.repeat) for name, run in stages.items()}
+
+    baseline, baseline_machine = {}, None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        baseline, baseline_machine = saved['stages'], saved['machine']
+
+    report(results, baseline)
+
+    if args.save:
+        # stages that no longer exist are dropped, the ones that didn't run (--only) are kept
+        kept = {name: result for name, result in baseline.items() if name in make_stages() and name not in results}
+        commit = git_commit()
+        with open(args.baseline, 'w') as f:
+            json.dump({'machine': machine(),
+                       'stages': {**kept, **{name: dict(result, commit=commit) for name, result in results.items()}}},
+                      f, indent=2)
+        return 0
+
+    if baseline_machine != machine():
+        print(f'the baseline was recorded on another machine ({baseline_machine}), the timings are not compared; '
+              f'record a baseline on this one with --save')
+        return 0
+    slow = regressions(results, baseline, args.tolerance)
+    for name, field, ratio in slow:
+        print(f'regression: {name} {field} is {ratio:.2f} times the baseline')
+    return 1 if slow else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
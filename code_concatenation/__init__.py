@@ -0,0 +1,42 @@
+# Shor's code and its concatenation as Qualtran bloqs, with the simulations of their logical error rates.
+# Importing the package only loads cirq, qualtran and numpy; the plotting and drawing libraries are imported by the
+# commands of code_concatenation.cli that use them.
+
+from .cache import CachedBloq, DecompositionCache, DECOMPOSITIONS, set_decomposition_cache_dir
+from .noise import PHYSICAL_ERROR, SymbolicDepolarize, depolarize
+from .bloqs import (
+    CVS, Z_CORRECTIONS, RECOVERY_MODES, CONCATENATED_RECOVERY_MODES, SYNDROME_ANCILLAS, X_LOOKUP, Z_LOOKUP,
+    syndrome_lookup_table, bloq_calls,
+    ShorCodeAll, ShorEncode, ShorSyndrome, ShorRecovery, MeasureQubit, ResetQubit, ClassicallyControlledPauli,
+    lookup_correction_calls, ShorLookupRecovery, ShorResetRecovery, ShorDecode,
+    shor_recovery_bloq, add_shor_recovery, shor_syndrome_recovery_bloqs, add_shor_syndrome_recovery,
+    logicalX, logicalZ, logicalH, logicalCNOT, logical_6TargetCNOT, logical_2TargetCNOT, logical_6controlToffoli,
+    logical_2controlCZ, add_coherent_logical_recovery, encoding_top_calls, syndrome_top_calls, recovery_top_calls,
+    concatenatedShorAll, concatenatedShor_encode, concatenatedShor_syndrome, concatenatedShor_recovery,
+    concatenatedShor_decode,
+    concatenated_shor_qubits, split_register, join_register, ConcatenatedShor, ConcatenatedShorEncode,
+    ConcatenatedShorSyndrome, ConcatenatedShorRecovery, ConcatenatedShorDecode,
+    ShorCodeAll_withError, concatenatedShorAll_withError,
+)
+from .frame import (
+    PROJECT_GATES, keep_project_gate, line_qubits, lower_to_cirq, sample_bernoulli_positions, PauliFrameSampler,
+)
+from .memory import MemoryExperiment
+from .mps import concatenated_order, MatrixProductState, MPSSampler
+from .optimize import MERGED_GATES, is_self_inverse, cancel_self_inverse_pairs, merge_single_qubit_runs, optimize_circuit
+from .schedule import operation_roles, schedule_circuit
+from .resources import (
+    LEVEL, LEAF_BLOQS, GATES, is_leaf, gate_counts, lowered_depth, stage_depths, stage_resources, level_resources,
+)
+from .sparse import NOISE_GATES, FAULT_PAULIS, FaultConfiguration, SparseNoise, PrefixStates, OutcomeCache
+from .statevector import StateVectorSampler
+from .store import SWEEP_COLUMNS, ResultsStore
+from .records import MAGIC, ShotRecordWriter, ShotRecords, syndrome_words, record_shots
+from .dem import DetectorErrorModel, detector_error_model
+from .sweeps import (
+    with_logical_readout, count_logical_errors, CirqSampler, run_sweep, wilson_interval, clopper_pearson_interval,
+    CONFIDENCE_INTERVALS, run_adaptive_sweep, NOISE_MODELS, LEVEL_QUBITS, READOUT_BASIS, syndrome_qubits, noisy_circuit,
+    frame_sampler, mps_sampler,
+)
+from .threshold import ThresholdEstimate, find_threshold
+from .faults import FaultCountEstimate, sample_by_fault_count, LogicalErrorPolynomial, enumerate_fault_configurations
@@ -0,0 +1,1277 @@
+# Code for PQC project by Mahtab
+
+# import the necessary tools
+import collections
+import cirq.circuits
+from qualtran import Bloq, CompositeBloq, BloqBuilder, Signature, Register, QBit, QAny
+from qualtran.bloqs.basic_gates import CNOT, Hadamard, XGate, Toffoli, ZGate 
+from qualtran.bloqs.mcmt import MultiTargetCNOT, MultiControlPauli, multi_control_multi_target_pauli
+from typing import *
+from qualtran import SoquetT
+from qualtran.resource_counting import BloqCountT, SympySymbolAllocator
+import cirq
+import numpy as np
+import sympy
+import attrs
+
+from .cache import CachedBloq
+from .noise import depolarize
+
+# Patterns for Syndrome and Recovery
+CVS = [
+(1, 0, 0, 0, 0, 0),  #X1
+(1, 1, 0, 0, 0, 0),  #X2
+(0, 1, 0, 0, 0, 0),  #X3
+(0, 0, 1, 0, 0, 0),  #X4
+(0, 0, 1, 1, 0, 0),  #X5
+(0, 0, 0, 1, 0, 0),  #X6
+(0, 0, 0, 0, 1, 0),  #X7
+(0, 0, 0, 0, 1, 1),  #X8
+(0, 0, 0, 0, 0, 1),  #X9
+(1, 0),  #Z1, Z2, Z3
+(1, 1),  #Z6, Z5, Z4
+(0, 1),  #Z7, Z8, Z9
+]
+
+# the qubit (or block of qubits) each Z correction pattern acts on
+Z_CORRECTIONS = [(9, 0), (10, 3), (11, 6)]
+
+# Recovery modes: 'coherent' corrects with the multi-controlled Paulis of ShorRecovery, 'lookup' measures the ancillas
+# and applies one classically chosen Pauli (ShorLookupRecovery). 'reset' (level 1 only) measures every check on one
+# ancilla that is reset and reused for the next check, and then corrects like 'lookup' (ShorResetRecovery).
+RECOVERY_MODES = ('coherent', 'lookup', 'reset')
+CONCATENATED_RECOVERY_MODES = ('coherent', 'lookup')
+
+# number of syndrome ancillas ShorCodeAll uses with each recovery mode
+SYNDROME_ANCILLAS = {'coherent': 8, 'lookup': 8, 'reset': 1}
+
+
+# NumPy lookup table derived from CVS: table[s] is the qubit to correct for the syndrome s, where the measured ancillas
+# are read as an integer with the first ancilla as the most significant bit (like cirq measurement keys), -1 is no correction
+def syndrome_lookup_table(patterns: Sequence[Tuple[tuple, int]]) -> np.ndarray:
+    table = np.full(2 ** len(patterns[0][0]), -1)
+    for cvs, qubit in patterns:
+        table[int(''.join(map(str, cvs)), 2)] = qubit
+    return table
+
+
+X_LOOKUP = syndrome_lookup_table([(CVS[i], i) for i in range(9)])           # ancillas 0-5
+Z_LOOKUP = syndrome_lookup_table([(CVS[i], j) for (i, j) in Z_CORRECTIONS])  # ancillas 6-7
+
+
+# callees for build_call_graph from lists of bloqs (one entry per call) and {bloq: number of calls} mappings. Every bloq
+# here declares its calls, so Qualtran's call_graph and bloq_counts walk the hierarchy without decomposing anything
+def bloq_calls(*calls) -> Set[BloqCountT]:
+    counts = collections.Counter()
+    for c in calls:
+        counts.update(c)
+    return set(counts.items())
+
+
+# Bloq for (unconcatenated) Shor code
+# In this code "logical" is the Soquet with the 9 qubits, and "qubits" is the form of "logical" that's modified during the code. Same goes for "ancilla" and "a".
+@attrs.frozen
+class ShorCodeAll(CachedBloq):
+    recovery: str = 'coherent'
+    @property
+    def signature(self):
+        return Signature.build(logical=9, ancilla=SYNDROME_ANCILLAS[self.recovery])
+
+    
+    def build_composite_bloq(self, bb: BloqBuilder, *, logical: SoquetT, ancilla: SoquetT) -> Dict[str, SoquetT]: 
+
+        # Initialize the data qubit to |+> state
+        qubits = bb.split(logical)
+        qubits[0] = bb.add(Hadamard(), q=qubits[0])
+        qubits = bb.join(qubits)
+
+        # Encoding 
+        qubits= bb.add_from(ShorEncode(), logical=qubits)[0]
+
+        # syndrome measurements and recovery
+        qubits, a = add_shor_syndrome_recovery(bb, self.recovery, logical=qubits, ancilla=ancilla)
+
+        # decoding step
+        qubits= bb.add_from(ShorDecode(), logical=qubits)[0]
+
+        # return the error corrected qubits
+        return {'logical': qubits, 'ancilla': a}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls([Hadamard(), ShorEncode(), ShorDecode()], shor_syndrome_recovery_bloqs(self.recovery))
+
+
+@attrs.frozen
+class ShorEncode(CachedBloq):
+    @property
+    def signature(self):
+        return Signature.build(logical=9)
+
+    
+    def build_composite_bloq(self, bb: BloqBuilder, *, logical: SoquetT) -> Dict[str, SoquetT]: 
+
+        qubits = bb.split(logical)
+
+        # Entangle qubits 0, 3, and 6 for phase flip error detection
+        qubits[0], qubits[3] = bb.add(CNOT(), ctrl = qubits[0], target=qubits[3])
+        qubits[0], qubits[6] = bb.add(CNOT(), ctrl = qubits[0], target=qubits[6])
+        
+        # the three groups of three bit flip detecting qubits
+        for i in [0, 3, 6]:
+            # add hadamard to the qubiti
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+            # CNOT between qubiti and qubiti+1
+            qubits[i], qubits[i+1] = bb.add(CNOT(), ctrl=qubits[i], target=qubits[i+1])
+            # CNOT between qubiti and qubiti+2
+            qubits[i], qubits[i+2] = bb.add(CNOT(), ctrl=qubits[i], target=qubits[i+2])
+
+
+        return {'logical': bb.join(qubits)}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls({CNOT(): 8, Hadamard(): 3})
+
+
+@attrs.frozen
+class ShorSyndrome(CachedBloq):
+    @property
+    def signature(self):
+        return Signature.build(logical=9, ancilla=8)
+
+    
+    def build_composite_bloq(self, bb: BloqBuilder, *, logical: SoquetT, ancilla:SoquetT) -> Dict[str, SoquetT]: 
+        
+        qubits = bb.split(logical)
+        a = bb.split(ancilla)
+
+        for i in range(8):
+            # apply Hadamards on all the ancillas
+            a[i] = bb.add(Hadamard(), q=a[i])
+        
+        
+
+        multiCNOT6 = MultiTargetCNOT(bitsize=6)
+
+        # syndrome X3X4X5X6X7X8 with ancilla7
+        a[7], trgt = bb.add(multiCNOT6, control=a[7], targets=bb.join(qubits[3:9]))
+
+        qubits[3:9] = bb.split(trgt)
+         
+        
+        # syndrome X0X1X2X3X4X5 with the ancilla6
+        a[6], trgt = bb.add(multiCNOT6, control=a[6], targets=bb.join(qubits[0:6]))
+
+        qubits[0:6] = bb.split(trgt)
+
+
+        # syndrome Z7Z8 with ancilla5 (applied as Hadamard sandwiched multi-target CNOT)
+        for i in [7, 8]:
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+        
+        multiCNOT2 = MultiTargetCNOT(bitsize=2)
+        a[5], trgt = bb.add(multiCNOT2, control=a[5], targets=bb.join(qubits[7:9]))
+        qubits[7:9] = bb.split(trgt)
+
+        for i in [7, 8]:
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+        
+
+        # syndrome Z6Z7 with ancilla4
+        for i in [6, 7]:
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+        
+        a[4], trgt = bb.add(multiCNOT2, control=a[4], targets=bb.join(qubits[6:8]))
+        qubits[6:8] = bb.split(trgt)
+
+        for i in [6, 7]:
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+
+
+        # syndrome Z4Z5 with ancilla3
+        for i in [4, 5]:
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+        
+        a[3], trgt = bb.add(multiCNOT2, control=a[3], targets=bb.join(qubits[4:6]))
+        qubits[4:6] = bb.split(trgt)
+
+        for i in [4, 5]:
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+        
+
+        # syndrome Z3Z4 with ancilla2
+        for i in [3, 4]:
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+        
+        a[2], trgt = bb.add(multiCNOT2, control=a[2], targets=bb.join(qubits[3:5]))
+        qubits[3:5] = bb.split(trgt)
+
+        for i in [3, 4]:
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+        
+        
+        # syndrome Z1Z2 with ancilla1
+        for i in [1, 2]:
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+        
+        a[1], trgt = bb.add(multiCNOT2, control=a[1], targets=bb.join(qubits[1:3]))
+        qubits[1:3] = bb.split(trgt)
+
+        for i in [1, 2]:
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+        
+        
+        # syndrome Z0Z1 with ancilla0
+        for i in [0, 1]:
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+        
+        a[0], trgt = bb.add(multiCNOT2, control=a[0], targets=bb.join(qubits[0:2]))
+        qubits[0:2] = bb.split(trgt)
+
+        for i in [0, 1]:
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+        
+
+        for i in range(8):
+            # apply Hadamards on all the ancillas
+            a[i] = bb.add(Hadamard(), q=a[i])
+
+        return {'logical': bb.join(qubits), 'ancilla': bb.join(a)}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        # 16 Hadamards on the ancillas and 4 around each of the 6 ZZ syndromes
+        return bloq_calls({Hadamard(): 40, MultiTargetCNOT(bitsize=6): 2, MultiTargetCNOT(bitsize=2): 6})
+
+
+
+
+@attrs.frozen
+class ShorRecovery(CachedBloq):
+    @property
+    def signature(self):
+        return Signature.build(logical=9, ancilla=8)
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, logical: SoquetT, ancilla: SoquetT):
+
+        qubits = bb.split(logical)
+        a = bb.split(ancilla)
+
+        # correct for X errors
+        for i in range(9):
+            superCNOT = MultiControlPauli(cvs=CVS[i], target_gate=cirq.X)
+            a[0:6], qubits[i] = bb.add(superCNOT, controls=a[0:6], target=qubits[i])
+        
+        # correct for Z errors
+        for (i, j) in Z_CORRECTIONS:
+            superCZ = MultiControlPauli(cvs=CVS[i], target_gate=cirq.Z)
+            a[6:8], qubits[j] = bb.add(superCZ, controls=a[6:8], target=qubits[j])
+
+        return {'logical': bb.join(qubits), 'ancilla': bb.join(a)}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls([MultiControlPauli(cvs=CVS[i], target_gate=cirq.X) for i in range(9)],
+                          [MultiControlPauli(cvs=CVS[i], target_gate=cirq.Z) for (i, j) in Z_CORRECTIONS])
+    
+
+# Leaves of the call graphs of the measured recoveries, which have no Qualtran bloq: the measurement and the reset of
+# one qubit, and an X or Z on one qubit conditioned on measured bits. They are only counted, never decomposed or lowered.
+@attrs.frozen
+class MeasureQubit(Bloq):
+    @property
+    def signature(self):
+        return Signature.build(q=1)
+
+
+@attrs.frozen
+class ResetQubit(Bloq):
+    @property
+    def signature(self):
+        return Signature.build(q=1)
+
+
+@attrs.frozen
+class ClassicallyControlledPauli(Bloq):
+    pauli: str = 'X'
+    @property
+    def signature(self):
+        return Signature.build(q=1)
+
+
+# the conditional corrections of X_LOOKUP and Z_LOOKUP, on blocks of n qubits
+def lookup_correction_calls(n=1) -> Dict[Bloq, int]:
+    return {ClassicallyControlledPauli('X'): int(np.count_nonzero(X_LOOKUP >= 0)) * n,
+            ClassicallyControlledPauli('Z'): int(np.count_nonzero(Z_LOOKUP >= 0)) * n}
+
+
+# Recovery by measuring the 8 ancillas mid-circuit and looking the syndrome up in X_LOOKUP and Z_LOOKUP.
+# The 9 * n logical qubits are 9 blocks of n qubits and a correction is applied to a whole block, so n = 1 replaces
+# ShorRecovery and n = 9 replaces the logical_6controlToffoli and logical_2controlCZ gates of concatenatedShor_recovery.
+# The syndromes are stored under the measurement keys '<key>_x' (ancillas 0-5) and '<key>_z' (ancillas 6-7).
+@attrs.frozen
+class ShorLookupRecovery(Bloq):
+    key: str = 'syndrome'
+    n: int = 1
+    @property
+    def signature(self):
+        return Signature.build(logical=9 * self.n, ancilla=8)
+
+    def as_cirq_op(self, qubit_manager: cirq.QubitManager, logical, ancilla):
+        blocks = np.reshape(logical, (9, self.n))
+        x_key, z_key = f'{self.key}_x', f'{self.key}_z'
+        ops = [cirq.measure(*ancilla[0:6], key=x_key), cirq.measure(*ancilla[6:8], key=z_key)]
+
+        # only the correction chosen by the measured syndrome is applied
+        for key, table, pauli in [(x_key, X_LOOKUP, cirq.X), (z_key, Z_LOOKUP, cirq.Z)]:
+            for syndrome in np.flatnonzero(table >= 0):
+                condition = sympy.Eq(sympy.Symbol(key), int(syndrome))
+                ops += [pauli(q).with_classical_controls(condition) for q in blocks[table[syndrome]]]
+
+        return cirq.CircuitOperation(cirq.FrozenCircuit(ops)), {'logical': logical, 'ancilla': ancilla}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls({MeasureQubit(): 8}, lookup_correction_calls(self.n))
+
+
+# Syndrome measurement and recovery with a single ancilla: every check is measured into '<key>_<ancilla>' (the
+# ancilla ShorSyndrome uses for it) as soon as it is done, and the ancilla is reset for the next check. The corrections
+# of X_LOOKUP and Z_LOOKUP are then conditioned on the recorded bits, so the level 1 code runs on 10 qubits instead of 17.
+@attrs.frozen
+class ShorResetRecovery(Bloq):
+    key: str = 'syndrome'
+    @property
+    def signature(self):
+        return Signature.build(logical=9, ancilla=1)
+
+    def as_cirq_op(self, qubit_manager: cirq.QubitManager, logical, ancilla):
+        a = ancilla[0]
+        checks = [(7, range(3, 9), False), (6, range(0, 6), False)]
+        checks += [(k, (i, i + 1), True) for k, i in [(5, 7), (4, 6), (3, 4), (2, 3), (1, 1), (0, 0)]]
+
+        # the checks in the order of ShorSyndrome, ZZ checks as Hadamard sandwiched multi-target CNOTs
+        ops = []
+        for k, targets, zz in checks:
+            targets = [logical[i] for i in targets]
+            sandwich = [cirq.H(q) for q in targets] if zz else []
+            ops += [cirq.H(a), *sandwich, MultiTargetCNOT(len(targets)).on(a, *targets), *sandwich, cirq.H(a),
+                    cirq.measure(a, key=f'{self.key}_{k}'), cirq.ResetChannel().on(a)]
+
+        # only the correction chosen by the recorded syndrome is applied
+        for ancillas, table, pauli in [(range(6), X_LOOKUP, cirq.X), (range(6, 8), Z_LOOKUP, cirq.Z)]:
+            for syndrome in np.flatnonzero(table >= 0):
+                bits = np.binary_repr(syndrome, width=len(ancillas))
+                condition = sympy.And(*[sympy.Eq(sympy.Symbol(f'{self.key}_{k}'), int(b)) for k, b in zip(ancillas, bits)])
+                ops.append(pauli(logical[table[syndrome]]).with_classical_controls(condition))
+
+        return cirq.CircuitOperation(cirq.FrozenCircuit(ops)), {'logical': logical, 'ancilla': ancilla}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        # the gates of ShorSyndrome, and a measurement and a reset of the ancilla after each of the 8 checks
+        return bloq_calls({Hadamard(): 40, MultiTargetCNOT(bitsize=6): 2, MultiTargetCNOT(bitsize=2): 6},
+                          {MeasureQubit(): 8, ResetQubit(): 8}, lookup_correction_calls())
+
+
+# the recovery bloq of the given mode, and adding it to the bloq builder
+def shor_recovery_bloq(recovery: str, key: str = 'syndrome') -> Bloq:
+    if recovery == 'coherent':
+        return ShorRecovery()
+    if recovery == 'lookup':
+        return ShorLookupRecovery(key)
+    if recovery == 'reset':
+        raise ValueError("the 'reset' recovery replaces the syndrome measurement as well and only exists for the level 1 code")
+    raise ValueError(f'unknown recovery mode {recovery}, expected one of {RECOVERY_MODES}')
+
+
+def add_shor_recovery(bb: BloqBuilder, recovery: str, logical: SoquetT, ancilla: SoquetT, key: str = 'syndrome'):
+    add = bb.add_from if recovery == 'coherent' else bb.add
+    return add(shor_recovery_bloq(recovery, key), logical=logical, ancilla=ancilla)
+
+
+# the syndrome measurement and recovery of the level 1 code, and adding them to the bloq builder
+def shor_syndrome_recovery_bloqs(recovery: str) -> List[Bloq]:
+    if recovery == 'reset':
+        return [ShorResetRecovery()]
+    return [ShorSyndrome(), shor_recovery_bloq(recovery)]
+
+
+def add_shor_syndrome_recovery(bb: BloqBuilder, recovery: str, logical: SoquetT, ancilla: SoquetT):
+    if recovery == 'reset':
+        return bb.add(ShorResetRecovery(), logical=logical, ancilla=ancilla)
+    logical, ancilla = bb.add_from(ShorSyndrome(), logical=logical, ancilla=ancilla)
+    return add_shor_recovery(bb, recovery, logical=logical, ancilla=ancilla)
+
+
+
+@attrs.frozen
+class ShorDecode(CachedBloq):
+    @property
+    def signature(self):
+        return Signature.build(logical=9)
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, logical: SoquetT):
+
+        qubits = bb.split(logical)
+
+        for i in [0, 3, 6]:
+            # apply CNOTs
+            qubits[i], qubits[i+1] = bb.add(CNOT(), ctrl=qubits[i], target=qubits[i+1])
+            qubits[i], qubits[i+2] = bb.add(CNOT(), ctrl=qubits[i], target=qubits[i+2])
+
+            # apply Hadamards
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+
+
+        # CNOT between q0&q3 and q0&q6
+        qubits[0], qubits[3] = bb.add(CNOT(), ctrl = qubits[0], target=qubits[3])
+        qubits[0], qubits[6] = bb.add(CNOT(), ctrl = qubits[0], target=qubits[6])
+
+
+        return {'logical': bb.join(qubits)}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls({CNOT(): 8, Hadamard(): 3})
+
+
+
+@attrs.frozen
+class logicalX(CachedBloq):
+    @property
+    def signature(self):
+        return Signature.build(logical=9)
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, logical: SoquetT):
+
+        qubits = bb.split(logical)
+        
+        # logical X = XXXXXXXXX
+        for i in range(9):
+            qubits[i] = bb.add(XGate(), q=qubits[i])
+
+        return {'logical': bb.join(qubits)}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls({XGate(): 9})
+
+
+
+@attrs.frozen
+class logicalZ(CachedBloq):
+    @property
+    def signature(self):
+        return Signature.build(logical=9)
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, logical: SoquetT):
+        
+        qubits = bb.split(logical)
+        
+        # logical Z = ZZZZZZZZZ
+        for i in range(9):
+            qubits[i] = bb.add(ZGate(), q=qubits[i])
+
+        return {'logical': bb.join(qubits)}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls({ZGate(): 9})
+
+
+
+@attrs.frozen
+class logicalH(CachedBloq):
+    n: int
+    @property
+    def signature(self):
+        return Signature.build(logical=self.n)
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, logical: SoquetT):
+        
+        qubits = bb.split(logical)
+        
+        # logical H = HHHHHHHHH
+        for i in range(self.n):
+            qubits[i] = bb.add(Hadamard(), q=qubits[i])
+
+        logical = bb.join(qubits)
+
+        return {'logical': logical}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls({Hadamard(): self.n})
+
+
+
+@attrs.frozen
+class logicalCNOT(CachedBloq):
+    n: int = 9
+    @property
+    def signature(self):
+        return Signature.build(lctrl=self.n, ltarget=self.n)
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, lctrl: SoquetT, ltarget: SoquetT):
+        
+        c = bb.split(lctrl)
+        t = bb.split(ltarget)
+
+        for i in range(self.n):
+            c[i], t[i] = bb.add(CNOT(), ctrl=c[i], target=t[i])
+        
+        return {'lctrl': bb.join(c), 'ltarget': bb.join(t)}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls({CNOT(): self.n})
+
+
+@attrs.frozen
+class logical_6TargetCNOT(CachedBloq):
+    n: int = 9
+    @property
+    def signature(self):
+        n = self.n
+        return Signature.build(lctrl=1, ltarget1=n, ltarget2=n, ltarget3=n, ltarget4=n, ltarget5=n, ltarget6=n)
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, lctrl: SoquetT, ltarget1: SoquetT, ltarget2: SoquetT, ltarget3: SoquetT, ltarget4: SoquetT, ltarget5: SoquetT, ltarget6: SoquetT):
+
+        ltargets = [ltarget1, ltarget2, ltarget3, ltarget4, ltarget5, ltarget6]
+        multiCNOT9 = MultiTargetCNOT(bitsize=self.n)
+        c = lctrl
+        t = []
+
+
+        for i, target in enumerate(ltargets):
+            c, tr = bb.add(multiCNOT9, control=c, targets=target)
+            t.append(tr)
+        
+        t = np.array(t)
+        
+        return {'lctrl': c, 'ltarget1': t[0], 'ltarget2': t[1], 'ltarget3': t[2], 'ltarget4': t[3], 'ltarget5': t[4], 'ltarget6': t[5]}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls({MultiTargetCNOT(bitsize=self.n): 6})
+ 
+
+
+@attrs.frozen
+class logical_2TargetCNOT(CachedBloq):
+    n: int = 9
+    @property
+    def signature(self):
+        return Signature.build(lctrl=1, ltarget1=self.n, ltarget2=self.n)
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, lctrl: SoquetT, ltarget1: SoquetT, ltarget2: SoquetT):
+
+        ltargets = [ltarget1, ltarget2]
+        multiCNOT9 = MultiTargetCNOT(bitsize=self.n)
+        c = lctrl
+        t = []
+
+
+        for i, target in enumerate(ltargets):
+            c, tr = bb.add(multiCNOT9, control=c, targets=target)
+            t.append(tr)
+        
+        t = np.array(t)
+        
+        return {'lctrl': c, 'ltarget1': t[0], 'ltarget2': t[1]}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls({MultiTargetCNOT(bitsize=self.n): 2})
+ 
+
+
+@attrs.frozen
+class logical_6controlToffoli(CachedBloq):
+    cvs: tuple 
+    n: int = 9
+    @property
+    def signature(self):
+        return Signature.build(lctrl1=1, lctrl2=1, lctrl3=1, lctrl4=1, lctrl5=1, lctrl6=1, ltarget=self.n)
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, lctrl1: SoquetT, lctrl2: SoquetT, lctrl3: SoquetT, lctrl4: SoquetT, lctrl5: SoquetT, lctrl6: SoquetT, ltarget: SoquetT):
+
+        ctrls = [lctrl1, lctrl2, lctrl3, lctrl4, lctrl5, lctrl6]
+        target = bb.split(ltarget)
+        superCNOT = MultiControlPauli(cvs=self.cvs, target_gate=cirq.X)
+
+        for i in range(self.n):
+            ctrls, target[i] = bb.add(superCNOT, controls=ctrls, target=target[i])
+        
+
+        return {'lctrl1': ctrls[0], 'lctrl2': ctrls[1], 'lctrl3': ctrls[2], 'lctrl4': ctrls[3], 'lctrl5': ctrls[4], 'lctrl6': ctrls[5], 'ltarget': bb.join(target)}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls({MultiControlPauli(cvs=self.cvs, target_gate=cirq.X): self.n})
+            
+
+@attrs.frozen
+class logical_2controlCZ(CachedBloq):
+    cvs: tuple 
+    n: int = 9
+    @property
+    def signature(self):
+        return Signature.build(lctrl1=1, lctrl2=1, ltarget=self.n)
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, lctrl1: SoquetT, lctrl2: SoquetT, ltarget: SoquetT):
+
+        ctrls = [lctrl1, lctrl2]
+        target = bb.split(ltarget)
+        superCZ = MultiControlPauli(cvs=self.cvs, target_gate=cirq.Z)
+
+        for i in range(self.n):
+            ctrls, target[i] = bb.add(superCZ, controls=ctrls, target=target[i])
+        
+
+        return {'lctrl1': ctrls[0], 'lctrl2': ctrls[1], 'ltarget': bb.join(target)}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls({MultiControlPauli(cvs=self.cvs, target_gate=cirq.Z): self.n})
+            
+
+
+# correct the 9 logical qubits (blocks of n qubits) coherently with the last 8 ancillas as controls
+def add_coherent_logical_recovery(bb: BloqBuilder, logs, last_ancilla: SoquetT, n: int = 9):
+
+    last_ancilla = bb.split(last_ancilla)   # the split version of soquet representing the last 8 ancillas
+    # correct for X errors of the 9 logical qubits
+    for i in range(9):
+        last_ancilla[0], last_ancilla[1], last_ancilla[2], last_ancilla[3], last_ancilla[4], last_ancilla[5], logs[i] = bb.add_from(logical_6controlToffoli(CVS[i], n), lctrl1=last_ancilla[0], lctrl2=last_ancilla[1], lctrl3=last_ancilla[2], lctrl4=last_ancilla[3], lctrl5=last_ancilla[4], lctrl6=last_ancilla[5], ltarget=logs[i])
+
+
+    # correct for Z errors of the 9 logical qubits
+    for (i, j) in Z_CORRECTIONS:
+        last_ancilla[6], last_ancilla[7], logs[j] = bb.add_from(logical_2controlCZ(CVS[i], n), lctrl1=last_ancilla[6], lctrl2=last_ancilla[7], ltarget=logs[j])
+    
+
+    # join back the last ancilla
+    return logs, bb.join(last_ancilla)
+
+
+# the calls each stage of the concatenated code makes on its 9 logical qubits (blocks of n qubits) and its last 8
+# ancillas, on top of the same stage on every block. Decoding makes the calls of encoding in reverse order.
+def encoding_top_calls(n: int) -> Dict[Bloq, int]:
+    return {logicalCNOT(n): 8, logicalH(n): 3}
+
+
+def syndrome_top_calls(n: int) -> Dict[Bloq, int]:
+    return {logicalH(8): 2, logical_6TargetCNOT(n): 2, logicalH(n): 24, logical_2TargetCNOT(n): 6}
+
+
+def recovery_top_calls(n: int, recovery: str = 'coherent', key: str = 'syndrome') -> Dict[Bloq, int]:
+    if recovery == 'lookup':
+        return {ShorLookupRecovery(key, n=n): 1}
+    return dict.fromkeys([logical_6controlToffoli(CVS[i], n) for i in range(9)]
+                         + [logical_2controlCZ(CVS[i], n) for (i, j) in Z_CORRECTIONS], 1)
+
+
+
+# concatenated Shor code bloqs.
+@attrs.frozen
+class concatenatedShorAll(CachedBloq):
+    recovery: str = 'coherent'
+    @property
+    def signature(self):
+        return Signature.build(logicals=81, ancillas=80)
+
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, logicals: SoquetT, ancillas: SoquetT):
+
+        # Encoding
+        l, a = bb.add_from(concatenatedShor_encode(), logicals=logicals, ancillas=ancillas)
+
+        # syndrome measurements
+        l, a = bb.add_from(concatenatedShor_syndrome(), logicals=l, ancillas=a)
+
+        # recovery
+        l, a = bb.add_from(concatenatedShor_recovery(self.recovery), logicals=l, ancillas=a)
+
+        # decoding
+        l, a = bb.add_from(concatenatedShor_decode(), logicals=l, ancillas=a)
+
+        return {'logicals': l, 'ancillas': a}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls([concatenatedShor_encode(), concatenatedShor_syndrome(), concatenatedShor_recovery(self.recovery),
+                           concatenatedShor_decode()])
+
+
+
+
+@attrs.frozen
+class concatenatedShor_encode(CachedBloq):
+    @property
+    def signature(self):
+        return Signature.build(logicals=81, ancillas=80)
+
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, logicals: SoquetT, ancillas: SoquetT):
+        
+        # split the register to 81 qubits
+        l = bb.split(logicals)
+
+        # join the corresponding qubits to make the 9 logical qubits
+        logs = [] # array to store the logical qubits
+        for i in range(9):
+            start = i * 9
+            logs.append(bb.join(l[start:start+9]))
+        
+        logs = np.array(logs)
+
+        # Do normal Shor encoding on each of the logical qubits and ancillas 
+        for i in range(9):
+            logs[i] = bb.add_from(ShorEncode(), logical=logs[i])[0]
+        
+        # Entangle logicals 0, 3, and 6 
+        logs[0], logs[3] = bb.add_from(logicalCNOT(), lctrl=logs[0], ltarget=logs[3])
+        logs[0], logs[6] = bb.add_from(logicalCNOT(), lctrl=logs[0], ltarget=logs[6])
+
+
+        # Entangle 0->1, 2; 3->4, 5; 6->7, 8
+        for i in [0, 3, 6]:
+            # add_from gives a tuple, so when you have one-qubit gate, you need to have [0]
+            logs[i] = bb.add_from(logicalH(9), logical=logs[i])[0]
+            logs[i], logs[i+1] = bb.add_from(logicalCNOT(), lctrl=logs[i], ltarget=logs[i+1])
+            logs[i], logs[i+2] = bb.add_from(logicalCNOT(), lctrl=logs[i], ltarget=logs[i+2])
+        
+        
+        # split the logical qubits back into l
+        l = []
+        for i in range(9):
+            l.append(bb.split(logs[i]))
+        
+        # flatten the array (to get a 1d array)
+        l = np.array([item for sublist in l for item in sublist])
+        
+        return {'logicals': bb.join(l), 'ancillas': ancillas}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls([ShorEncode()] * 9, encoding_top_calls(9))
+    
+
+
+
+@attrs.frozen
+class concatenatedShor_syndrome(CachedBloq):
+    @property
+    def signature(self):
+        return Signature.build(logicals=81, ancillas=80)
+
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, logicals: SoquetT, ancillas: SoquetT):
+        
+        # split the register to 81 qubits
+        l = bb.split(logicals)
+
+        # join the corresponding qubits to make the 9 logical qubits
+        logs = [] # array to store the logical qubits
+        for i in range(9):
+            start = i * 9
+            logs.append(bb.join(l[start:start+9]))
+        
+        logs = np.array(logs)
+
+        # split the ancillas register to 80 qubits
+        a = bb.split(ancillas)
+
+        # join the corresponding qubits to make 10 soquets of 8 ancillas each
+        ancis = [] # array to store the "logical" ancillas
+        for i in range(10):
+            start = i * 8
+            ancis.append(bb.join(a[start:start+8]))
+        
+        ancis = np.array(ancis)
+
+
+        # do normal syndrome measurement on each logical qubit
+        for i in range(9):
+            logs[i], ancis[i] = bb.add_from(ShorSyndrome(), logical=logs[i], ancilla=ancis[i])
+        
+        # Hadmards on the last logical ancilla
+        ancis[9] = bb.add_from(logicalH(8), logical=ancis[9])[0]
+        last_ancilla = bb.split(ancis[9])   # the split version of soquet representing the last 8 ancillas
+
+        # syndrome X3X4X5X6X7X8 with ancilla79 and syndrome X0X1X2X3X4X5 with ancilla78
+        last_ancilla[7], logs[3], logs[4], logs[5], logs[6], logs[7], logs[8] = bb.add_from(logical_6TargetCNOT(), lctrl=last_ancilla[7], ltarget1=logs[3], ltarget2=logs[4], ltarget3=logs[5], ltarget4=logs[6], ltarget5=logs[7], ltarget6=logs[8])
+
+        last_ancilla[6], logs[0], logs[1], logs[2], logs[3], logs[4], logs[5] = bb.add_from(logical_6TargetCNOT(), lctrl=last_ancilla[6], ltarget1=logs[0], ltarget2=logs[1], ltarget3=logs[2], ltarget4=logs[3], ltarget5=logs[4], ltarget6=logs[5])
+
+        # perform the ZZ syndromes
+        # Z0Z1: last_ancilla0, Z1Z2: last_ancilla1
+        for i in range(2):
+            # Hadamards
+            logs[i] = bb.add_from(logicalH(9), logical=logs[i])[0]
+            logs[i+1] = bb.add_from(logicalH(9), logical=logs[i+1])[0]
+
+            # 2target CNOTS
+            last_ancilla[i], logs[i], logs[i+1] = bb.add_from(logical_2TargetCNOT(), lctrl=last_ancilla[i], ltarget1=logs[i], ltarget2=logs[i+1])
+
+            # Hadamards
+            logs[i] = bb.add_from(logicalH(9), logical=logs[i])[0]
+            logs[i+1] = bb.add_from(logicalH(9), logical=logs[i+1])[0]
+        
+        # Z3Z4: last_ancilla2, Z4Z5: last_ancilla3
+        for i in range(2, 4):
+            # Hadamards
+            logs[i+1] = bb.add_from(logicalH(9), logical=logs[i+1])[0]
+            logs[i+2] = bb.add_from(logicalH(9), logical=logs[i+2])[0]
+
+            # 2target CNOTS
+            last_ancilla[i], logs[i+1], logs[i+2] = bb.add_from(logical_2TargetCNOT(), lctrl=last_ancilla[i], ltarget1=logs[i+1], ltarget2=logs[i+2])
+
+            # Hadamards
+            logs[i+1] = bb.add_from(logicalH(9), logical=logs[i+1])[0]
+            logs[i+2] = bb.add_from(logicalH(9), logical=logs[i+2])[0]
+
+        # Z6Z7: last_ancilla4, Z7Z8: last_ancilla5
+        for i in range(4, 6):
+            # Hadamards
+            logs[i+2] = bb.add_from(logicalH(9), logical=logs[i+2])[0]
+            logs[i+3] = bb.add_from(logicalH(9), logical=logs[i+3])[0]
+
+            # 2target CNOTS
+            last_ancilla[i], logs[i+2], logs[i+3] = bb.add_from(logical_2TargetCNOT(), lctrl=last_ancilla[i], ltarget1=logs[i+2], ltarget2=logs[i+3])
+
+            # Hadamards
+            logs[i+2] = bb.add_from(logicalH(9), logical=logs[i+2])[0]
+            logs[i+3] = bb.add_from(logicalH(9), logical=logs[i+3])[0]
+        
+        
+        # join back the last ancilla
+        ancis[9] = bb.join(last_ancilla)   
+        # Hadmards on the last logical ancilla
+        ancis[9] = bb.add_from(logicalH(8), logical=ancis[9])[0]
+
+
+        # split the logical qubits back into l
+        l = []
+        for i in range(9):
+            l.append(bb.split(logs[i]))
+        
+        # flatten the array (to get a 1d array)
+        l = np.array([item for sublist in l for item in sublist])
+
+        # split the ancilla qubits back into a
+        a = []
+        for i in range(10):
+            a.append(bb.split(ancis[i]))
+        
+        # flatten the array (to get a 1d array)
+        a = np.array([item for sublist in a for item in sublist])
+        
+        return {'logicals': bb.join(l), 'ancillas': bb.join(a)}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls([ShorSyndrome()] * 9, syndrome_top_calls(9))
+
+
+
+@attrs.frozen
+class concatenatedShor_recovery(CachedBloq):
+    recovery: str = 'coherent'
+    @property
+    def signature(self):
+        return Signature.build(logicals=81, ancillas=80)
+
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, logicals: SoquetT, ancillas: SoquetT):
+        
+        # split the register to 81 qubits
+        l = bb.split(logicals)
+
+        # join the corresponding qubits to make the 9 logical qubits
+        logs = [] # array to store the logical qubits
+        for i in range(9):
+            start = i * 9
+            logs.append(bb.join(l[start:start+9]))
+        
+        logs = np.array(logs)
+
+        # split the ancillas register to 80 qubits
+        a = bb.split(ancillas)
+
+        # join the corresponding qubits to make 10 soquets of 8 ancillas each
+        ancis = [] # array to store the "logical" ancillas
+        for i in range(10):
+            start = i * 8
+            ancis.append(bb.join(a[start:start+8]))
+        
+        ancis = np.array(ancis)
+
+        # do recovery on the physical qubits of each logical qubit
+        for i in range(9):
+            logs[i], ancis[i] = add_shor_recovery(bb, self.recovery, logical=logs[i], ancilla=ancis[i], key=f'syndrome{i}')
+        
+
+        if self.recovery == 'lookup':
+            # measure the last 8 ancillas and correct whole logical qubits
+            l = np.array([item for i in range(9) for item in bb.split(logs[i])])
+            l, ancis[9] = bb.add(ShorLookupRecovery('syndrome', n=9), logical=bb.join(l), ancilla=ancis[9])
+            l = bb.split(l)
+            for i in range(9):
+                logs[i] = bb.join(l[i * 9:i * 9 + 9])
+        else:
+            logs, ancis[9] = add_coherent_logical_recovery(bb, logs, ancis[9])
+
+
+        # split the logical qubits back into l
+        l = []
+        for i in range(9):
+            l.append(bb.split(logs[i]))
+        
+        # flatten the array (to get a 1d array)
+        l = np.array([item for sublist in l for item in sublist])
+
+        # split the ancilla qubits back into a
+        a = []
+        for i in range(10):
+            a.append(bb.split(ancis[i]))
+        
+        # flatten the array (to get a 1d array)
+        a = np.array([item for sublist in a for item in sublist])
+        
+        return {'logicals': bb.join(l), 'ancillas': bb.join(a)}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls([shor_recovery_bloq(self.recovery, f'syndrome{i}') for i in range(9)],
+                          recovery_top_calls(9, self.recovery))
+
+
+
+@attrs.frozen
+class concatenatedShor_decode(CachedBloq):
+    @property
+    def signature(self):
+        return Signature.build(logicals=81, ancillas=80)
+
+ 
+    def build_composite_bloq(self, bb: BloqBuilder, logicals: SoquetT, ancillas: SoquetT):
+        
+        # split the register to 81 qubits
+        l = bb.split(logicals)
+
+        # join the corresponding qubits to make the 9 logical qubits
+        logs = [] # array to store the logical qubits
+        for i in range(9):
+            start = i * 9
+            logs.append(bb.join(l[start:start+9]))
+        
+        logs = np.array(logs)
+
+        # Do normal Shor decoding on each of the logical qubits and ancillas 
+        for i in range(9):
+            logs[i] = bb.add_from(ShorDecode(), logical=logs[i])[0]
+        
+
+        for i in [0, 3, 6]:
+            logs[i], logs[i+1] = bb.add_from(logicalCNOT(), lctrl=logs[i], ltarget=logs[i+1])
+            logs[i], logs[i+2] = bb.add_from(logicalCNOT(), lctrl=logs[i], ltarget=logs[i+2])
+            # add_from gives a tuple, so when you have one-qubit gate, you need to have [0]
+            logs[i] = bb.add_from(logicalH(9), logical=logs[i])[0]
+
+        
+        logs[0], logs[3] = bb.add_from(logicalCNOT(), lctrl=logs[0], ltarget=logs[3])
+        logs[0], logs[6] = bb.add_from(logicalCNOT(), lctrl=logs[0], ltarget=logs[6])
+        
+        
+        # split the logical qubits back into l
+        l = []
+        for i in range(9):
+            l.append(bb.split(logs[i]))
+        
+        # flatten the array (to get a 1d array)
+        l = np.array([item for sublist in l for item in sublist])
+        
+        return {'logicals': bb.join(l), 'ancillas': ancillas}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls([ShorDecode()] * 9, encoding_top_calls(9))
+
+
+
+# Concatenated Shor code of any level
+# Level L encodes one qubit into 9^L data qubits and uses 9^L - 1 ancillas: the 9 blocks of level L - 1 with their
+# ancillas, then the 8 ancillas of level L. Each stage of level L adds the same stage of level L - 1 by reference (bb.add)
+# to its 9 blocks and then acts on the blocks like the level-1 code acts on single qubits, so ConcatenatedShor(2) is
+# concatenatedShorAll(). The decomposition of every (stage, level) is built once (see DecompositionCache) and shared by
+# all references to it.
+
+# number of data qubits and ancillas of the level-L code
+def concatenated_shor_qubits(level: int) -> Tuple[int, int]:
+    return 9 ** level, 9 ** level - 1
+
+
+# split a register into soquets of the given sizes, and join such soquets back into one register
+def split_register(bb: BloqBuilder, reg: SoquetT, sizes: Sequence[int]) -> np.ndarray:
+    q = bb.split(reg)
+    starts = np.cumsum([0, *sizes])
+    blocks = np.empty(len(sizes), dtype=object)
+    for i, size in enumerate(sizes):
+        blocks[i] = bb.join(q[starts[i]:starts[i] + size])
+    return blocks
+
+
+def join_register(bb: BloqBuilder, blocks) -> SoquetT:
+    return bb.join(np.concatenate([bb.split(block) for block in blocks]))
+
+
+# shared base of the level-L stages: the registers, the split into blocks and the stage of level L - 1 on every block.
+# A stage defines the level-1 bloq it adds, lower(i) (the stage of block i) and build_top / top_calls, the gates it
+# applies to the 9 blocks of n qubits and the last 8 ancillas after the blocks.
+@attrs.frozen
+class _ConcatenatedShorStage(CachedBloq):
+    level: int
+
+    def __attrs_post_init__(self):
+        if self.level < 1:
+            raise ValueError(f'the concatenation level must be at least 1, got {self.level}')
+
+    @property
+    def signature(self):
+        logicals, ancillas = concatenated_shor_qubits(self.level)
+        return Signature.build(logicals=logicals, ancillas=ancillas)
+
+    def lower(self, i: int) -> '_ConcatenatedShorStage':
+        return attrs.evolve(self, level=self.level - 1)
+
+    def build_composite_bloq(self, bb: BloqBuilder, logicals: SoquetT, ancillas: SoquetT):
+        if self.level == 1:
+            return self.build_level1(bb, logicals, ancillas)
+
+        # 9 logical qubits of level L - 1, their ancillas and the 8 ancillas of level L
+        n, m = concatenated_shor_qubits(self.level - 1)
+        logs = split_register(bb, logicals, [n] * 9)
+        ancis = split_register(bb, ancillas, [m] * 9 + [8])
+
+        for i in range(9):
+            logs[i], ancis[i] = bb.add(self.lower(i), logicals=logs[i], ancillas=ancis[i])
+        logs, ancis[9] = self.build_top(bb, logs, ancis[9], n)
+
+        return {'logicals': join_register(bb, logs), 'ancillas': join_register(bb, ancis)}
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        if self.level == 1:
+            return bloq_calls([self.level1_bloq()])
+        n = concatenated_shor_qubits(self.level - 1)[0]
+        return bloq_calls([self.lower(i) for i in range(9)], self.top_calls(n))
+
+
+@attrs.frozen
+class ConcatenatedShorEncode(_ConcatenatedShorStage):
+
+    def level1_bloq(self) -> Bloq:
+        return ShorEncode()
+
+    def build_level1(self, bb: BloqBuilder, logicals: SoquetT, ancillas: SoquetT):
+        return {'logicals': bb.add_from(self.level1_bloq(), logical=logicals)[0], 'ancillas': ancillas}
+
+    def build_top(self, bb: BloqBuilder, logs, last_ancilla: SoquetT, n: int):
+        # Entangle logicals 0, 3, and 6
+        logs[0], logs[3] = bb.add_from(logicalCNOT(n), lctrl=logs[0], ltarget=logs[3])
+        logs[0], logs[6] = bb.add_from(logicalCNOT(n), lctrl=logs[0], ltarget=logs[6])
+
+        # Entangle 0->1, 2; 3->4, 5; 6->7, 8
+        for i in [0, 3, 6]:
+            logs[i] = bb.add_from(logicalH(n), logical=logs[i])[0]
+            logs[i], logs[i+1] = bb.add_from(logicalCNOT(n), lctrl=logs[i], ltarget=logs[i+1])
+            logs[i], logs[i+2] = bb.add_from(logicalCNOT(n), lctrl=logs[i], ltarget=logs[i+2])
+
+        return logs, last_ancilla
+
+    def top_calls(self, n: int) -> Dict[Bloq, int]:
+        return encoding_top_calls(n)
+
+
+@attrs.frozen
+class ConcatenatedShorSyndrome(_ConcatenatedShorStage):
+
+    def level1_bloq(self) -> Bloq:
+        return ShorSyndrome()
+
+    def build_level1(self, bb: BloqBuilder, logicals: SoquetT, ancillas: SoquetT):
+        logicals, ancillas = bb.add_from(self.level1_bloq(), logical=logicals, ancilla=ancillas)
+        return {'logicals': logicals, 'ancillas': ancillas}
+
+    def build_top(self, bb: BloqBuilder, logs, last_ancilla: SoquetT, n: int):
+        # Hadmards on the last logical ancilla
+        last_ancilla = bb.split(bb.add_from(logicalH(8), logical=last_ancilla)[0])
+
+        # syndrome X3X4X5X6X7X8 with ancilla 7 and syndrome X0X1X2X3X4X5 with ancilla 6
+        for k, start in [(7, 3), (6, 0)]:
+            last_ancilla[k], *logs[start:start+6] = bb.add_from(logical_6TargetCNOT(n), lctrl=last_ancilla[k], **{f'ltarget{j+1}': logs[start+j] for j in range(6)})
+
+        # ZZ syndromes: Z0Z1, Z1Z2, Z3Z4, Z4Z5, Z6Z7, Z7Z8 with ancillas 0 to 5
+        for k, (i, j) in enumerate([(0, 1), (1, 2), (3, 4), (4, 5), (6, 7), (7, 8)]):
+            logs[i] = bb.add_from(logicalH(n), logical=logs[i])[0]
+            logs[j] = bb.add_from(logicalH(n), logical=logs[j])[0]
+            last_ancilla[k], logs[i], logs[j] = bb.add_from(logical_2TargetCNOT(n), lctrl=last_ancilla[k], ltarget1=logs[i], ltarget2=logs[j])
+            logs[i] = bb.add_from(logicalH(n), logical=logs[i])[0]
+            logs[j] = bb.add_from(logicalH(n), logical=logs[j])[0]
+
+        return logs, bb.add_from(logicalH(8), logical=bb.join(last_ancilla))[0]
+
+    def top_calls(self, n: int) -> Dict[Bloq, int]:
+        return syndrome_top_calls(n)
+
+
+# the lookup recoveries of the 9 blocks measure under '<key>0' ... '<key>8', recursively
+@attrs.frozen
+class ConcatenatedShorRecovery(_ConcatenatedShorStage):
+    recovery: str = 'coherent'
+    key: str = 'syndrome'
+
+    def lower(self, i: int) -> '_ConcatenatedShorStage':
+        # the coherent recovery measures nothing, so its 9 blocks share one bloq (and one decomposition)
+        key = f'{self.key}{i}' if self.recovery == 'lookup' else self.key
+        return ConcatenatedShorRecovery(self.level - 1, self.recovery, key)
+
+    def level1_bloq(self) -> Bloq:
+        return shor_recovery_bloq(self.recovery, self.key)
+
+    def build_level1(self, bb: BloqBuilder, logicals: SoquetT, ancillas: SoquetT):
+        logicals, ancillas = add_shor_recovery(bb, self.recovery, logical=logicals, ancilla=ancillas, key=self.key)
+        return {'logicals': logicals, 'ancillas': ancillas}
+
+    def build_top(self, bb: BloqBuilder, logs, last_ancilla: SoquetT, n: int):
+        if self.recovery == 'lookup':
+            # measure the last 8 ancillas and correct whole logical qubits
+            l, last_ancilla = bb.add(ShorLookupRecovery(self.key, n=n), logical=join_register(bb, logs), ancilla=last_ancilla)
+            return split_register(bb, l, [n] * 9), last_ancilla
+        return add_coherent_logical_recovery(bb, logs, last_ancilla, n)
+
+    def top_calls(self, n: int) -> Dict[Bloq, int]:
+        return recovery_top_calls(n, self.recovery, self.key)
+
+
+@attrs.frozen
+class ConcatenatedShorDecode(_ConcatenatedShorStage):
+
+    def level1_bloq(self) -> Bloq:
+        return ShorDecode()
+
+    def build_level1(self, bb: BloqBuilder, logicals: SoquetT, ancillas: SoquetT):
+        return {'logicals': bb.add_from(self.level1_bloq(), logical=logicals)[0], 'ancillas': ancillas}
+
+    def build_top(self, bb: BloqBuilder, logs, last_ancilla: SoquetT, n: int):
+        for i in [0, 3, 6]:
+            logs[i], logs[i+1] = bb.add_from(logicalCNOT(n), lctrl=logs[i], ltarget=logs[i+1])
+            logs[i], logs[i+2] = bb.add_from(logicalCNOT(n), lctrl=logs[i], ltarget=logs[i+2])
+            logs[i] = bb.add_from(logicalH(n), logical=logs[i])[0]
+
+        logs[0], logs[3] = bb.add_from(logicalCNOT(n), lctrl=logs[0], ltarget=logs[3])
+        logs[0], logs[6] = bb.add_from(logicalCNOT(n), lctrl=logs[0], ltarget=logs[6])
+
+        return logs, last_ancilla
+
+    def top_calls(self, n: int) -> Dict[Bloq, int]:
+        return encoding_top_calls(n)
+
+
+# encoding, syndrome measurements, recovery and decoding of the level-L code
+@attrs.frozen
+class ConcatenatedShor(CachedBloq):
+    level: int
+    recovery: str = 'coherent'
+    @property
+    def signature(self):
+        logicals, ancillas = concatenated_shor_qubits(self.level)
+        return Signature.build(logicals=logicals, ancillas=ancillas)
+
+
+    def build_composite_bloq(self, bb: BloqBuilder, logicals: SoquetT, ancillas: SoquetT):
+
+        l, a = logicals, ancillas
+        for stage in self.stages():
+            l, a = bb.add(stage, logicals=l, ancillas=a)
+
+        return {'logicals': l, 'ancillas': a}
+
+    def stages(self) -> List[_ConcatenatedShorStage]:
+        return [ConcatenatedShorEncode(self.level), ConcatenatedShorSyndrome(self.level),
+                ConcatenatedShorRecovery(self.level, self.recovery), ConcatenatedShorDecode(self.level)]
+
+    def build_call_graph(self, ssa: SympySymbolAllocator) -> Set[BloqCountT]:
+        return bloq_calls(self.stages())
+
+
+
+# Bloqs for calculating the logical error rates
+
+# Shor code bloq with a specific errro rate
+@attrs.frozen
+class ShorCodeAll_withError(Bloq):
+    x: Union[float, sympy.Expr]
+    recovery: str = 'coherent'
+    @property
+    def signature(self):
+        return Signature.build(logical=9, ancilla=SYNDROME_ANCILLAS[self.recovery])
+
+    
+    def build_composite_bloq(self, bb: BloqBuilder, *, logical: SoquetT, ancilla: SoquetT) -> Dict[str, SoquetT]: 
+
+        # Initialize the data qubit to |+> state
+        qubits = bb.split(logical)
+        qubits[0] = bb.add(Hadamard(), q=qubits[0])
+        qubits = bb.join(qubits)
+
+        # Encoding 
+        qubits= bb.add_from(ShorEncode(), logical=qubits)[0]
+
+        # cirq circuit for introducing errors
+        circuit = cirq.Circuit()
+        all_qubits = cirq.LineQubit.range(9)
+        for qubit in all_qubits:
+            circuit.append([cirq.I(qubit)])
+        
+        # add noise model to the circuit 
+        noisy = circuit.with_noise(depolarize(self.x))
+
+        # turn curcuit into bloq
+        noisyBloq = CompositeBloq.from_cirq_circuit(noisy)
+
+        # add the noisyBloq to the circuit
+        qubits = bb.split(qubits)
+        qubits = bb.add_from(noisyBloq, qubits=qubits)[0]
+        qubits = bb.join(qubits)
+
+        # syndrome measurements and recovery
+        qubits, a = add_shor_syndrome_recovery(bb, self.recovery, logical=qubits, ancilla=ancilla)
+
+        # decoding step
+        qubits= bb.add_from(ShorDecode(), logical=qubits)[0]
+
+        # return the error corrected qubits
+        return {'logical': qubits, 'ancilla': a}
+    
+
+
+# concatenated Shor code bloq with a specific error rate on the 81 data qubits after encoding
+@attrs.frozen
+class concatenatedShorAll_withError(Bloq):
+    x: Union[float, sympy.Expr]
+    recovery: str = 'coherent'
+    @property
+    def signature(self):
+        return Signature.build(logicals=81, ancillas=80)
+
+
+    def build_composite_bloq(self, bb: BloqBuilder, logicals: SoquetT, ancillas: SoquetT):
+
+        # Encoding
+        l, a = bb.add_from(concatenatedShor_encode(), logicals=logicals, ancillas=ancillas)
+
+        # cirq circuit for introducing errors
+        circuit = cirq.Circuit()
+        for qubit in cirq.LineQubit.range(81):
+            circuit.append([cirq.I(qubit)])
+        noisyBloq = CompositeBloq.from_cirq_circuit(circuit.with_noise(depolarize(self.x)))
+
+        # add the noisyBloq to the circuit
+        l = bb.split(l)
+        l = bb.add_from(noisyBloq, qubits=l)[0]
+        l = bb.join(l)
+
+        # syndrome measurements
+        l, a = bb.add_from(concatenatedShor_syndrome(), logicals=l, ancillas=a)
+
+        # recovery
+        l, a = bb.add_from(concatenatedShor_recovery(self.recovery), logicals=l, ancillas=a)
+
+        # decoding
+        l, a = bb.add_from(concatenatedShor_decode(), logicals=l, ancillas=a)
+
+        return {'logicals': l, 'ancillas': a}
@@ -0,0 +1,103 @@
+import hashlib
+import importlib.metadata
+import os
+import pickle
+from typing import Optional
+
+from qualtran import Bloq, CompositeBloq, LeftDangle, RightDangle
+
+
+# Decomposition cache
+# The Shor bloqs are frozen attrs classes, so equal bloqs have equal decompositions. A CachedBloq looks its decomposition
+# up by value instead of running build_composite_bloq again, and the (immutable) CompositeBloq is shared by every add_from
+# and every reference to the bloq. With a directory set, the decompositions are also pickled to disk so that later runs
+# skip building them; the files are keyed on the bloq, the sources of every module of this package (a bloq's
+# decomposition also depends on its sub-bloqs and the noise gates, which may live in other modules) and the qualtran
+# version. A file that can't be read back, such as a pickle of a class that was renamed since, is rebuilt.
+class DecompositionCache:
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._memory = {}
+        self._source_digest = None
+
+    def get(self, bloq: Bloq) -> CompositeBloq:
+        cbloq = self._memory.get(bloq)
+        if cbloq is not None:
+            self.hits += 1
+            return cbloq
+
+        path = self._path(bloq) if self.directory is not None else None
+        cbloq = self._load(path) if path is not None else None
+        if cbloq is None:
+            self.misses += 1
+            cbloq = Bloq.decompose_bloq(bloq)
+            if path is not None:
+                self._dump(path, cbloq)
+        else:
+            self.hits += 1
+
+        self._memory[bloq] = cbloq
+        return cbloq
+
+    def clear(self):
+        self._memory.clear()
+        self.hits = self.misses = 0
+
+    def _path(self, bloq: Bloq) -> str:
+        if self._source_digest is None:
+            self._source_digest = _package_digest()
+        key = f'{importlib.metadata.version("qualtran")}\n{self._source_digest}\n{bloq!r}'
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + '.pickle')
+
+    def _load(self, path: str) -> Optional[CompositeBloq]:
+        try:
+            with open(path, 'rb') as f:
+                return _DanglingUnpickler(f).load()
+        except Exception:
+            return None
+
+    def _dump(self, path: str, cbloq: CompositeBloq):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            _DanglingPickler(f).dump(cbloq)
+        os.replace(tmp, path)
+
+
+# digest of the sources of every module of this package
+def _package_digest() -> str:
+    digest = hashlib.sha256()
+    package = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(package)):
+        if name.endswith('.py'):
+            with open(os.path.join(package, name), 'rb') as f:
+                digest.update(name.encode() + b'\0' + f.read())
+    return digest.hexdigest()
+
+
+# LeftDangle and RightDangle are compared by identity, so they are pickled by name and mapped back to the singletons
+class _DanglingPickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        if obj is LeftDangle or obj is RightDangle:
+            return repr(obj)
+        return None
+
+
+class _DanglingUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        return {'LeftDangle': LeftDangle, 'RightDangle': RightDangle}[pid]
+
+
+DECOMPOSITIONS = DecompositionCache()
+
+
+# set (or with None, remove) the directory of the on-disk layer of the decomposition cache
+def set_decomposition_cache_dir(directory: Optional[str]):
+    DECOMPOSITIONS.directory = directory
+
+
+class CachedBloq(Bloq):
+    def decompose_bloq(self) -> CompositeBloq:
+        return DECOMPOSITIONS.get(self)
@@ -0,0 +1,478 @@
+# Command-line interface
+#
+#   python -m code_concatenation draw [--bloq NAME] [--text] [--svg FILE]
+#   python -m code_concatenation simulate [--recovery MODE]
+#   python -m code_concatenation sweep [--sampler cirq|statevector|frame|mps] [--level 1|2] [--model MODEL] [--method METHOD] ...
+#   python -m code_concatenation memory [--level 1|2] [--model MODEL] [--rounds T] [--shots N] [--error P]
+#   python -m code_concatenation record --output FILE [--level 1|2] [--model MODEL] [--shots N] [--error P]
+#   python -m code_concatenation dem --output FILE [--level 1|2] [--model MODEL] [--error P]
+#   python -m code_concatenation threshold [--model MODEL] [--min P] [--max P] [--points N] ...
+#   python -m code_concatenation plot --store FILE [--sampler cirq|statevector|frame|mps] [--level 1|2] [--model MODEL] ...
+#   python -m code_concatenation counts [--levels L ...]
+#   python -m code_concatenation resources [--levels L ...]
+#
+# matplotlib, qualtran.drawing and cirq.contrib.svg are only imported by the commands that draw or plot.
+
+import argparse
+import collections
+from typing import Dict
+
+import cirq
+import numpy as np
+
+from .bloqs import (
+    RECOVERY_MODES, CONCATENATED_RECOVERY_MODES, ShorCodeAll, ShorEncode, ShorSyndrome, ShorRecovery, ShorDecode, concatenatedShorAll,
+    concatenatedShor_encode, concatenatedShor_syndrome, concatenatedShor_recovery, concatenatedShor_decode,
+    ConcatenatedShor, concatenated_shor_qubits,
+)
+from .cache import set_decomposition_cache_dir
+from .dem import detector_error_model
+from .faults import enumerate_fault_configurations, sample_by_fault_count
+from .frame import PauliFrameSampler, line_qubits, lower_to_cirq
+from .memory import MemoryExperiment
+from .optimize import optimize_circuit
+from .records import record_shots
+from .resources import level_resources
+from .schedule import schedule_circuit
+from .sparse import OutcomeCache
+from .statevector import StateVectorSampler
+from .store import ResultsStore
+from .sweeps import (
+    CONFIDENCE_INTERVALS, NOISE_MODELS, READOUT_BASIS, CirqSampler, frame_sampler, mps_sampler, noisy_circuit,
+    run_adaptive_sweep, syndrome_qubits,
+)
+from .threshold import find_threshold
+
+SAMPLERS = ['cirq', 'statevector', 'frame', 'mps']
+
+# bloqs the draw command knows by name
+BLOQS = {bloq.__name__: bloq for bloq in [
+    ShorCodeAll, ShorEncode, ShorSyndrome, ShorRecovery, ShorDecode, concatenatedShorAll, concatenatedShor_encode,
+    concatenatedShor_syndrome, concatenatedShor_recovery, concatenatedShor_decode,
+]}
+
+
+# show the current figure, or save it when an output file is given
+def show(output=None):
+    import matplotlib.pyplot as plt
+    if output:
+        plt.savefig(output)
+        plt.close()
+    else:
+        plt.show()
+
+
+def draw(args):
+    bloq = BLOQS[args.bloq]()
+
+    if args.text or args.svg:
+        # the circuit of the bloq's decomposition
+        circuit, _ = bloq.as_composite_bloq().to_cirq_circuit(**line_qubits(bloq))
+        op = next(circuit.all_operations())
+        circuit = cirq.Circuit(cirq.decompose_once(op))
+        if args.text:
+            print(circuit)
+        if args.svg:
+            from cirq.contrib.svg import circuit_to_svg
+            with open(args.svg, 'w') as f:
+                f.write(circuit_to_svg(circuit))
+        return
+
+    # musical score of the bloq's decomposition using Qualtran
+    from qualtran.drawing import get_musical_score_data, draw_musical_score
+    msd = get_musical_score_data(bloq.decompose_bloq())
+    fig, ax = draw_musical_score(msd)
+    fig.set_figwidth(9)
+    show(args.output)
+
+
+def simulate(args):
+    # simulate the unconcatenated circuit without any errors
+    bloq = ShorCodeAll(args.recovery)
+    errorless_circuit, _ = bloq.as_composite_bloq().to_cirq_circuit(**line_qubits(bloq))
+    result = cirq.Simulator().simulate(errorless_circuit)
+    errorless_state_vector = np.around(result.final_state_vector, 5)
+    print('state vector of Shor code without error:', errorless_state_vector, '\n')
+
+
+# the Pauli-frame sampler, which rejects the level 2 circuit (its noiseless syndromes are random)
+def checked_frame_sampler(level: int, model: str, recovery: str, optimize: bool = False, schedule: bool = False):
+    try:
+        return frame_sampler(level, model, recovery, optimize, schedule)
+    except ValueError as e:
+        raise SystemExit(f'the Pauli-frame sampler can\'t simulate the level {level} circuit: {e}')
+
+
+def make_sampler(args):
+    if args.recovery not in CONCATENATED_RECOVERY_MODES and args.level != 1:
+        raise SystemExit(f'the {args.recovery!r} recovery only exists for the level 1 code')
+    if args.sampler == 'frame':
+        return checked_frame_sampler(args.level, args.model, args.recovery, args.optimize, args.schedule)
+    if args.sampler == 'mps':
+        return mps_sampler(args.level, args.model, args.recovery, args.optimize, args.schedule, args.max_bond, args.cutoff)
+    if args.level != 1:
+        raise SystemExit(f'the {args.sampler} sampler only simulates the level 1 code (use --sampler frame or mps)')
+    if args.sampler == 'statevector':
+        return StateVectorSampler(noisy_circuit(1, args.model, args.recovery, args.optimize, args.schedule),
+                                  basis=READOUT_BASIS[1])
+    sampler = CirqSampler(noisy_circuit(1, args.model, args.recovery, args.optimize, args.schedule),
+                          outcomes=OutcomeCache(args.cache_size))
+    if args.outcome_cache:
+        loaded = sampler.outcomes.load(args.outcome_cache, sampler.noise.digest())
+        print(f'loaded the outcomes of {loaded} fault configurations from {args.outcome_cache}')
+    return sampler
+
+
+# hit rate of the outcome cache of the cirq sampler, saved to the file given with --outcome-cache
+def finish_outcome_cache(args, sampler):
+    outcomes = sampler.outcomes
+    print(f'outcome cache: {len(outcomes)} fault configurations, {outcomes.hits} hits and {outcomes.misses} misses '
+          f'(hit rate {outcomes.hit_rate:.1%})')
+    if args.outcome_cache:
+        outcomes.save(args.outcome_cache, sampler.noise.digest())
+
+
+def sweep(args):
+    import matplotlib.pyplot as plt
+
+    # the arguments are checked before the sampler is built, the cirq sampler's prefix states are removed in any case
+    if args.store and args.method != 'adaptive':
+        raise SystemExit('the results store records the batches of the adaptive method')
+    if args.method != 'adaptive' and args.sampler != 'frame':
+        raise SystemExit('the fault-count and polynomial methods need the Pauli-frame sampler (--sampler frame)')
+    spacing = np.logspace if args.log else np.linspace
+    physical_errors = spacing(*((np.log10(args.min), np.log10(args.max)) if args.log else (args.min, args.max)), args.points)
+    sampler = make_sampler(args)
+    try:
+        if args.sampler == 'mps':
+            truncation_check(sampler, args.truncation_shots, physical_errors.max(), args.seed)
+
+        plt.figure(figsize=(10, 6))
+        if args.method == 'adaptive':
+            batch = (args.batch or {'cirq': 100, 'statevector': 1000, 'mps': 10}.get(args.sampler)
+                     or {1: 10**6, 2: 10**5}[args.level])
+            store = ResultsStore(args.store) if args.store else None
+            try:
+                failures, shots = run_adaptive_sweep(sampler, physical_errors, batch, args.max_shots or 10 * batch,
+                                                     args.target_width, args.interval, args.seed, args.workers,
+                                                     args.chunk_size, store, sweep_columns(args))
+            finally:
+                if store:
+                    store.close()
+                if args.sampler == 'cirq':
+                    finish_outcome_cache(args, sampler)
+            plot_rates(physical_errors, failures, shots, args.interval)
+
+        elif args.method == 'fault-count':
+            # low error rates from shots with a fixed number of faults (importance sampling)
+            estimate = sample_by_fault_count(require_frame(sampler), args.max_faults, args.batch or 10**5, args.seed)
+            rates, errors, tails = np.array([estimate.logical_error_rate(p) for p in physical_errors]).T
+            for p, rate, error, tail in zip(physical_errors, rates, errors, tails):
+                print(f'logical error rate for physical error {p}: {rate} +- {error} (truncation bound {tail})')
+            plt.errorbar(physical_errors, rates, yerr=errors, marker='o', linestyle='-', label='Sampled by fault count')
+
+        else:
+            # exact logical error rates from all fault configurations up to the given weight
+            polynomial = enumerate_fault_configurations(require_frame(sampler), args.max_faults)
+            print(f'failing configurations {polynomial.failing}, logical error rate {polynomial.polynomial()} '
+                  f'+ O(p^{polynomial.max_weight + 1})')
+            rates = polynomial(physical_errors)
+            plt.plot(physical_errors, rates, linestyle='-',
+                     label=f'Fault configurations up to weight {polynomial.max_weight}')
+            plt.fill_between(physical_errors, rates, rates + polynomial.tail_bound(physical_errors), alpha=0.2)
+    finally:
+        if args.sampler == 'cirq':
+            sampler.close()
+
+    finish_plot(args)
+
+
+# truncation errors of the bond cap of the MPS sampler, on a few shots at the largest error rate, before the sweep
+def truncation_check(sampler, shots: int, p: float, seed: int):
+    stats = sampler.sample_shots(shots, p=p, seed=seed)
+    print(f'MPS truncation error at physical error {p}: max {stats["truncation"].max():.3g}, mean '
+          f'{stats["truncation"].mean():.3g} over {shots} shots, largest bond {stats["bond"].max()} '
+          f'(cap {sampler.max_bond})')
+
+
+# the store columns of the sweep described by the arguments (run_adaptive_sweep adds batch and seed)
+# the bond cap of the MPS sampler is part of its sampler column ('mps-256'), so different caps are different sweeps
+def sweep_columns(args) -> Dict:
+    sampler = f'mps-{args.max_bond}' if args.sampler == 'mps' else args.sampler
+    return dict(sampler=sampler, model=args.model, level=args.level, recovery=args.recovery,
+                optimize=args.optimize, schedule=args.schedule)
+
+
+# print and plot the rates of an adaptive sweep with their confidence intervals
+def plot_rates(physical_errors, failures, shots, interval: str):
+    import matplotlib.pyplot as plt
+    rates = failures / shots
+    for p, rate, m in zip(physical_errors, rates, shots):
+        print(f'logical error rate for physical error {p}: {rate} ({m} runs)')
+    plt.plot(physical_errors, rates, marker='o', linestyle='-', color='b', label='Data points')
+    low, high = CONFIDENCE_INTERVALS[interval](failures, shots)
+    plt.fill_between(physical_errors, low, high, color='b', alpha=0.2, label='95% confidence interval')
+
+
+def finish_plot(args):
+    import matplotlib.pyplot as plt
+    if args.no_plot:
+        plt.close()
+        return
+    if args.log:
+        plt.xscale('log')
+        plt.yscale('log')
+    plt.title(f'Logical Error Rates vs Physical Error Probability: level {args.level}, error {args.model}')
+    plt.xlabel('Physical Error Probability')
+    plt.ylabel('Logical Error Rates')
+    plt.legend()
+    plt.grid(True)
+    show(args.output)
+
+
+def memory(args):
+    # logical error rate and detection events after every round, printed while the rounds run
+    try:
+        experiment = MemoryExperiment(args.level, args.model, args.recovery)
+    except ValueError as e:
+        raise SystemExit(f'no memory experiment on the level {args.level} code: {e}')
+    print(f'memory experiment: level {args.level}, error {args.model}, {args.recovery} recovery, physical error '
+          f'{args.error}, {args.shots} shots')
+    for t, failures, detections in experiment.run(args.shots, args.rounds, args.error, args.seed):
+        print(f'round {t}: logical error rate {failures / args.shots}, detection events {detections / args.shots}',
+              flush=True)
+
+
+def record(args):
+    # syndromes and logical outcomes of every shot, written to a record file and read back through a memory map
+    if args.recovery not in CONCATENATED_RECOVERY_MODES and args.level != 1:
+        raise SystemExit(f'the {args.recovery!r} recovery only exists for the level 1 code')
+    sampler = checked_frame_sampler(args.level, args.model, args.recovery)
+    records = record_shots(sampler, args.output, args.shots, args.error, args.seed,
+                           syndrome_qubits(args.level, args.recovery), level=args.level,
+                           model=args.model, recovery=args.recovery)
+    print(f'{len(records)} shots with {records.syndrome_bits} syndrome bits ({records.row_bytes} bytes each) written '
+          f'to {args.output}, logical error rate {records.logical_error_rate()}')
+
+
+def dem(args):
+    # which faults flip which syndrome bits and the logical observable, merged and written as a detector error model
+    if args.recovery not in CONCATENATED_RECOVERY_MODES and args.level != 1:
+        raise SystemExit(f'the {args.recovery!r} recovery only exists for the level 1 code')
+    sampler = checked_frame_sampler(args.level, args.model, args.recovery)
+    model = detector_error_model(sampler, syndrome_qubits(args.level, args.recovery), args.error, level=args.level,
+                                 model=args.model, recovery=args.recovery)
+    model.save(args.output)
+    print(f'{3 * sampler.noise_locations} single faults merged into {len(model)} mechanisms on {model.detectors} '
+          f'detectors, written to {args.output}')
+
+
+def threshold(args):
+    # pseudo-threshold where the level 2 rate crosses the level 1 rate, refined around the crossing
+    # The noiseless syndromes of the level 2 circuit are random, so until its encoder is fixed the Pauli-frame sampler
+    # rejects it and there are no level 2 rates to compare with
+    try:
+        samplers = [frame_sampler(level, args.model, args.recovery, args.optimize, args.schedule) for level in (1, 2)]
+    except ValueError as e:
+        raise SystemExit(f'no pseudo-threshold without the level 2 rates, and the Pauli-frame sampler can\'t simulate '
+                         f'the level 2 circuit: {e}')
+    try:
+        estimate = find_threshold(samplers, args.min, args.max, args.points, args.shots, args.batch, args.max_shots,
+                                  args.bisections, args.interval, args.confidence, seed=args.seed, workers=args.workers)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    for p, (rate1, rate2), (shots1, shots2) in zip(estimate.error_rates, estimate.rates.T, estimate.shots.T):
+        print(f'physical error {p:.6g}: level 1 {rate1:.6g} ({shots1} runs), level 2 {rate2:.6g} ({shots2} runs)')
+    low, high = estimate.interval
+    print(f'pseudo-threshold: {estimate.threshold:.6g} ({args.confidence:.0%} confidence interval {low:.6g} ... {high:.6g})')
+
+
+def plot(args):
+    # the recorded batches of a sweep summed per error rate, without sampling anything
+    # Sweeps of the same circuit with other batch sizes or seeds are only summed with --pool
+    import matplotlib.pyplot as plt
+    columns = sweep_columns(args)
+    columns.update({name: getattr(args, name) for name in ('batch', 'seed') if getattr(args, name) is not None})
+    with ResultsStore(args.store) as store:
+        sweeps = store.sweeps(**columns)
+        if len(sweeps) > 1 and not args.pool:
+            raise SystemExit(f'{args.store} has {len(sweeps)} sweeps of this circuit (batch, seed): {sweeps}; choose one '
+                             f'with --batch and --seed, or sum them with --pool')
+        physical_errors, failures, shots = store.points(**columns)
+    if len(physical_errors) == 0:
+        raise SystemExit(f'no recorded batches of this sweep in {args.store}')
+    plt.figure(figsize=(10, 6))
+    plot_rates(physical_errors, failures, shots, args.interval)
+    finish_plot(args)
+
+
+def require_frame(sampler):
+    if not isinstance(sampler, PauliFrameSampler):
+        raise SystemExit('the fault-count and polynomial methods need the Pauli-frame sampler (--sampler frame)')
+    return sampler
+
+
+def counts(args):
+    # qubits, depth and operations of the lowered code of every level
+    for level in args.levels:
+        logicals, ancillas = concatenated_shor_qubits(level)
+        qubits = cirq.LineQubit.range(logicals + ancillas)
+        circuit = lower_to_cirq(ConcatenatedShor(level, args.recovery), logicals=np.array(qubits[:logicals]),
+                                ancillas=np.array(qubits[logicals:]))
+        if args.optimize:
+            circuit = optimize_circuit(circuit)
+        depth = f'depth {len(circuit)}'
+        if args.schedule:
+            scheduled = schedule_circuit(circuit)
+            depth = f'depth {len(circuit)} -> {len(scheduled)} scheduled'
+            circuit = scheduled
+        gates = collections.Counter(
+            'ClassicallyControlled' if isinstance(op, cirq.ClassicallyControlledOperation) else type(op.gate).__name__
+            for op in circuit.all_operations())
+        print(f'level {level}: {logicals} data qubits, {ancillas} ancillas, {depth}, {sum(gates.values())} operations')
+        for gate, count in sorted(gates.items()):
+            print(f'    {gate}: {count}')
+
+
+def resources(args):
+    # closed forms and values of the gate counts, qubits and depth from the bloq hierarchy, without lowering
+    print(f'level L ({args.recovery} recovery):')
+    for name, count in level_resources(recovery=args.recovery).items():
+        print(f'    {name}: {count}')
+    for level in args.levels:
+        counts = level_resources(level, args.recovery)
+        print(f'level {level}: ' + ', '.join(f'{name} {count}' for name, count in counts.items()))
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='code_concatenation', description="Shor's code and its concatenation")
+    parser.add_argument('--cache-dir', help='directory of the on-disk decomposition cache')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('draw', help='draw a bloq as a musical score, a text circuit or an SVG circuit')
+    p.add_argument('--bloq', choices=BLOQS, default='concatenatedShor_decode')
+    p.add_argument('--text', action='store_true', help='print the circuit of its decomposition')
+    p.add_argument('--svg', help='write the circuit of its decomposition to this SVG file')
+    p.add_argument('--output', help='save the musical score to this file instead of showing it')
+    p.set_defaults(run=draw)
+
+    p = commands.add_parser('simulate', help='state vector of the level 1 code without errors')
+    p.add_argument('--recovery', choices=RECOVERY_MODES, default='coherent')
+    p.set_defaults(run=simulate)
+
+    p = commands.add_parser('sweep', help='logical error rates over a range of physical error rates')
+    p.add_argument('--sampler', choices=SAMPLERS, default='frame')
+    p.add_argument('--max-bond', type=int, default=256, help='bond dimension cap of the MPS sampler')
+    p.add_argument('--cutoff', type=float, default=1e-12, help='relative weight of the singular values the MPS sampler drops')
+    p.add_argument('--truncation-shots', type=int, default=2, help='shots of the MPS truncation check')
+    p.add_argument('--cache-size', type=int, default=100_000, help='fault configurations the cirq sampler remembers')
+    p.add_argument('--outcome-cache', help='file the cirq sampler loads and saves the outcomes of fault configurations in')
+    p.add_argument('--level', type=int, choices=[1, 2], default=1)
+    p.add_argument('--model', choices=NOISE_MODELS, default='after encoding')
+    p.add_argument('--recovery', choices=RECOVERY_MODES, default='coherent')
+    p.add_argument('--optimize', action='store_true', help='cancel redundant gates before adding the noise')
+    p.add_argument('--schedule', action='store_true', help='reorder commuting gates into fewer moments before adding the noise')
+    p.add_argument('--method', choices=['adaptive', 'fault-count', 'polynomial'], default='adaptive')
+    p.add_argument('--min', type=float, default=0.01, help='smallest physical error rate')
+    p.add_argument('--max', type=float, default=0.05, help='largest physical error rate')
+    p.add_argument('--points', type=int, default=50)
+    p.add_argument('--log', action='store_true', help='log-spaced error rates and log-log axes')
+    p.add_argument('--batch', type=int, help='shots per batch (adaptive) or per fault count (fault-count)')
+    p.add_argument('--max-shots', type=int, help='shots after which a point stops (default 10 batches)')
+    p.add_argument('--target-width', type=float, default=0.5, help='relative confidence interval width to reach')
+    p.add_argument('--interval', choices=CONFIDENCE_INTERVALS, default='wilson')
+    p.add_argument('--max-faults', type=int, default=2, help='fault count (fault-count) or weight (polynomial) cutoff')
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--workers', type=int, help='worker processes (default: all cores)')
+    p.add_argument('--chunk-size', type=int, help='shots per process pool task')
+    p.add_argument('--store', help='SQLite file recording every batch, an interrupted sweep resumes from it')
+    p.add_argument('--output', help='save the plot to this file instead of showing it')
+    p.add_argument('--no-plot', action='store_true', help='only print the rates')
+    p.set_defaults(run=sweep)
+
+    p = commands.add_parser('memory', help='logical error rate after each of T rounds of syndrome measurement')
+    p.add_argument('--level', type=int, choices=[1, 2], default=1)
+    p.add_argument('--model', choices=NOISE_MODELS, default='after encoding')
+    p.add_argument('--recovery', choices=CONCATENATED_RECOVERY_MODES, default='coherent')
+    p.add_argument('--rounds', type=int, default=10)
+    p.add_argument('--shots', type=int, default=100_000)
+    p.add_argument('--error', type=float, default=0.01, help='physical error rate')
+    p.add_argument('--seed', type=int, default=0)
+    p.set_defaults(run=memory)
+
+    p = commands.add_parser('record', help='write the syndromes and logical outcomes of every shot to a binary file')
+    p.add_argument('--output', required=True, help='record file to write')
+    p.add_argument('--level', type=int, choices=[1, 2], default=1)
+    p.add_argument('--model', choices=NOISE_MODELS, default='after encoding')
+    p.add_argument('--recovery', choices=RECOVERY_MODES, default='coherent')
+    p.add_argument('--shots', type=int, default=1_000_000)
+    p.add_argument('--error', type=float, default=0.01, help='physical error rate')
+    p.add_argument('--seed', type=int, default=0)
+    p.set_defaults(run=record)
+
+    p = commands.add_parser('dem', help='write the detector error model of the circuit to a file')
+    p.add_argument('--output', required=True, help='detector error model file to write')
+    p.add_argument('--level', type=int, choices=[1, 2], default=1)
+    p.add_argument('--model', choices=NOISE_MODELS, default='after encoding')
+    p.add_argument('--recovery', choices=RECOVERY_MODES, default='coherent')
+    p.add_argument('--error', type=float, default=0.001, help='physical error rate')
+    p.set_defaults(run=dem)
+
+    p = commands.add_parser('threshold', help='pseudo-threshold where the level 2 code starts to beat the level 1 code')
+    p.add_argument('--model', choices=NOISE_MODELS, default='after encoding')
+    p.add_argument('--recovery', choices=CONCATENATED_RECOVERY_MODES, default='coherent')
+    p.add_argument('--optimize', action='store_true', help='cancel redundant gates before adding the noise')
+    p.add_argument('--schedule', action='store_true', help='reorder commuting gates into fewer moments before adding the noise')
+    p.add_argument('--min', type=float, default=0.001, help='smallest physical error rate of the coarse grid')
+    p.add_argument('--max', type=float, default=0.1, help='largest physical error rate of the coarse grid')
+    p.add_argument('--points', type=int, default=5, help='points of the log-spaced coarse grid')
+    p.add_argument('--shots', type=int, default=100_000, help='shots of each level at every coarse point')
+    p.add_argument('--batch', type=int, default=100_000, help='shots per batch at the bisection points')
+    p.add_argument('--max-shots', type=int, default=10_000_000, help='shots of each level at most at a bisection point')
+    p.add_argument('--bisections', type=int, default=8)
+    p.add_argument('--interval', choices=CONFIDENCE_INTERVALS, default='wilson')
+    p.add_argument('--confidence', type=float, default=0.95)
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--workers', type=int, help='worker processes (default: all cores)')
+    p.set_defaults(run=threshold)
+
+    p = commands.add_parser('plot', help='plot a sweep from the batches recorded in a results store')
+    p.add_argument('--store', required=True, help='SQLite file written by sweep --store')
+    p.add_argument('--sampler', choices=SAMPLERS, default='frame')
+    p.add_argument('--max-bond', type=int, default=256, help='bond dimension cap of the MPS sweep')
+    p.add_argument('--level', type=int, choices=[1, 2], default=1)
+    p.add_argument('--model', choices=NOISE_MODELS, default='after encoding')
+    p.add_argument('--recovery', choices=RECOVERY_MODES, default='coherent')
+    p.add_argument('--optimize', action='store_true')
+    p.add_argument('--schedule', action='store_true')
+    p.add_argument('--batch', type=int, help='shots per batch of the sweep')
+    p.add_argument('--seed', type=int, help='master seed of the sweep')
+    p.add_argument('--pool', action='store_true',
+                   help='sum the sweeps of the circuit with every batch size and seed')
+    p.add_argument('--interval', choices=CONFIDENCE_INTERVALS, default='wilson')
+    p.add_argument('--log', action='store_true', help='log-log axes')
+    p.add_argument('--output', help='save the plot to this file instead of showing it')
+    p.add_argument('--no-plot', action='store_true', help='only print the rates')
+    p.set_defaults(run=plot)
+
+    p = commands.add_parser('counts', help='qubits, depth and gate counts of the lowered code')
+    p.add_argument('--levels', type=int, nargs='+', default=[1, 2])
+    p.add_argument('--recovery', choices=CONCATENATED_RECOVERY_MODES, default='coherent')
+    p.add_argument('--optimize', action='store_true', help='count the gates left after the peephole optimization')
+    p.add_argument('--schedule', action='store_true', help='report the depth before and after scheduling')
+    p.set_defaults(run=counts)
+
+    p = commands.add_parser('resources', help='closed-form gate counts, qubits and depth of any level')
+    p.add_argument('--levels', type=int, nargs='+', default=[1, 2, 3, 4])
+    p.add_argument('--recovery', choices=CONCATENATED_RECOVERY_MODES, default='coherent')
+    p.set_defaults(run=resources)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = parser().parse_args(argv)
+    if args.cache_dir:
+        set_decomposition_cache_dir(args.cache_dir)
+    args.run(args)
+    return 0
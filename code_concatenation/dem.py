@@ -0,0 +1,129 @@
+import copy
+import json
+import re
+from typing import Dict, Optional, Sequence, Tuple
+
+import attrs
+import cirq
+import numpy as np
+
+from .frame import PauliFrameSampler, sample_bernoulli_positions
+from .records import syndrome_words
+
+
+# Detector error models
+# Without its recovery the circuit is linear in its faults: CNOTs, Hadamards, measurements and resets map the XOR of
+# two Pauli frames to the XOR of their images. Only the corrections (the MultiControlPauli lookups of the coherent
+# recovery, the classically controlled Paulis of the measured ones) depend on the syndrome, and they are what a decoder
+# replaces. So every single fault, one Pauli at one noise location, flips a fixed set of syndrome bits (the detectors,
+# the same bits as in the shot records, see record_shots) and maybe the logical observable (the readout of the decoded
+# qubit without any correction), and a shot with several faults flips the XOR of their sets.
+#
+# detector_error_model runs every single fault once through the Pauli-frame program with the corrections taken out and
+# merges the faults that flip the same set. A depolarizing channel of probability p is equivalent to independent X, Y
+# and Z faults of probability (1 - sqrt(1 - 4p/3)) / 2 each, and independent mechanisms with the same set merge into one
+# that fires when an odd number of them does, of probability (1 - prod(1 - 2 q)) / 2 (about the sum of the q). Faults
+# that flip nothing are left out. Sampling a shot from the model then only XORs the rows of the mechanisms that fire.
+#
+# The model is saved in the text format of stim's detector error models ('error(0.001) D0 D4 L0' per mechanism), which
+# stim, PyMatching and other decoders read, with the level, noise model, ... as '# key: value' comments.
+#
+# The detectors and the observable are flips relative to the noiseless run, so they are the syndrome bits and the
+# readout themselves only where those are 0 without noise. The Pauli-frame sampler is only built for circuits whose
+# noiseless syndromes and readout are deterministic, which rules out the level 2 circuit of this tree (its noiseless
+# syndromes are random); the noiseless syndromes and readout of the level 1 circuit are all 0.
+
+@attrs.frozen(eq=False)
+class DetectorErrorModel:
+    detectors: int
+    probabilities: np.ndarray   # probability of every mechanism
+    symptoms: np.ndarray        # symptoms[m, d]: mechanism m flips detector d (d < detectors) or the observable (d = detectors)
+    metadata: Dict = attrs.field(factory=dict)
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    # detectors (shape (shots, detectors)) and observable flips (shape (shots,)) of `shots` shots
+    def sample(self, shots: int, seed=None) -> Tuple[np.ndarray, np.ndarray]:
+        rng = np.random.default_rng(seed)
+        rows = np.packbits(self.symptoms, axis=1, bitorder='little')
+        flipped = np.zeros((shots, rows.shape[1]), dtype=np.uint8)
+        if len(self):
+            # positions of the Bernoulli trials at the largest probability, thinned to the probability of their mechanism
+            top = float(self.probabilities.max())
+            positions = sample_bernoulli_positions(rng, top, shots * len(self))
+            shot, mechanism = np.divmod(positions, len(self))
+            fired = rng.random(len(positions)) * top < self.probabilities[mechanism]
+            np.bitwise_xor.at(flipped, shot[fired], rows[mechanism[fired]])
+        bits = np.unpackbits(flipped, axis=1, count=self.detectors + 1, bitorder='little').astype(bool)
+        return bits[:, :-1], bits[:, -1]
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            for key, value in self.metadata.items():
+                f.write(f'# {key}: {json.dumps(value)}\n')
+            for probability, symptoms in zip(self.probabilities, self.symptoms):
+                targets = [f'D{d}' if d < self.detectors else 'L0' for d in np.flatnonzero(symptoms)]
+                f.write(f'error({probability:.12g}) {" ".join(targets)}\n')
+            for d in range(self.detectors):
+                f.write(f'detector D{d}\n')
+            f.write('logical_observable L0\n')
+
+    @classmethod
+    def load(cls, path: str) -> 'DetectorErrorModel':
+        metadata, errors, detectors = {}, [], 0
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('#'):
+                    key, _, value = line[1:].partition(':')
+                    metadata[key.strip()] = json.loads(value)
+                elif line.startswith('error('):
+                    probability, targets = re.fullmatch(r'error\(([^)]*)\)(.*)', line).groups()
+                    errors.append((float(probability), targets.split()))
+                elif line.startswith('detector '):
+                    detectors = max(detectors, int(line.split()[1][1:]) + 1)
+        symptoms = np.zeros((len(errors), detectors + 1), dtype=bool)
+        for m, (_, targets) in enumerate(errors):
+            for target in targets:
+                symptoms[m, int(target[1:]) if target[0] == 'D' else detectors] = True
+        probabilities = np.array([probability for probability, _ in errors])
+        return cls(detectors, probabilities, symptoms, metadata)
+
+
+# the detector error model of the circuit of a Pauli-frame sampler
+# syndrome_qubits: the ancillas whose final x frames are the detectors of a circuit that doesn't measure them
+# p sets the probability of every noise location (and has to be given for a circuit built with PHYSICAL_ERROR)
+# metadata: saved with the model (level, noise model, ...), along with p
+def detector_error_model(sampler: PauliFrameSampler, syndrome_qubits: Sequence[cirq.Qid], p: Optional[float] = None,
+                         **metadata) -> DetectorErrorModel:
+    if sampler.readout is None:
+        raise ValueError('the circuit of the sampler has no readout, which the logical observable needs')
+    noise = [step for step in sampler.program if step[0] == 'noise']
+    if p is None and any(cirq.is_parameterized(step[2]) for step in noise):
+        raise ValueError('the circuit has symbolic noise, the error rate p has to be given')
+    location_p = np.concatenate([np.full(len(step[1]), float(step[2] if p is None else p)) for step in noise])
+
+    # the program without its corrections
+    linear = copy.copy(sampler)
+    linear.program = [step for step in sampler.program if step[0] not in ('lookup', 'measured lookup')]
+
+    # shot 3 * location + pauli - 1 has the single fault pauli (1: X, 2: Z, 3: Y) at that location
+    locations = np.repeat(np.arange(sampler.noise_locations), 3)
+    paulis = np.tile([1, 2, 3], sampler.noise_locations)
+    shots = len(locations)
+    words = -(-shots // 64)
+    records: Dict[str, np.ndarray] = {}
+    x, z = linear._run(words, None, None, linear._faults_at(locations[:, None], paulis[:, None], words), records)
+    flipped = z[sampler.readout] if sampler.basis == 'X' else x[sampler.readout]
+    syndromes = syndrome_words(sampler, x, records, syndrome_qubits)
+    symptoms = np.unpackbits(np.vstack([syndromes, flipped]).view(np.uint8), axis=1, bitorder='little')[:, :shots].T
+
+    # independent X, Y and Z faults of each depolarizing channel, merged by the set of bits they flip
+    q = (1 - np.sqrt(1 - 4 * location_p[locations] / 3)) / 2
+    symptoms, mechanism = np.unique(symptoms.astype(bool), axis=0, return_inverse=True)
+    survival = np.ones(len(symptoms))
+    np.multiply.at(survival, mechanism.reshape(-1), 1 - 2 * q)
+    probabilities = (1 - survival) / 2
+    kept = symptoms.any(axis=1) & (probabilities > 0)
+    return DetectorErrorModel(len(syndromes), probabilities[kept], symptoms[kept], dict(metadata, p=p))
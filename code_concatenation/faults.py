@@ -0,0 +1,94 @@
+import itertools
+import math
+from typing import Tuple
+
+import attrs
+import numpy as np
+
+from .frame import PauliFrameSampler
+
+
+# Importance sampling by fault count
+# With N noise locations of probability p the logical error rate is sum_k Binomial(N, k, p) * f_k, where f_k is the
+# failure rate of shots with exactly k faults. At low p almost all shots have no fault, so plain sampling wastes them,
+# while f_1 ... f_K can be sampled directly and then combined for any p. Shots with more than K faults are not sampled,
+# their weight P(k > K) bounds the truncation error.
+@attrs.frozen(eq=False)
+class FaultCountEstimate:
+    locations: int
+    failures: np.ndarray   # failures[k] of shots[k] shots with exactly k faults
+    shots: np.ndarray
+
+    # weights Binomial(N, k, p) of the sampled fault counts
+    def weights(self, p: float) -> np.ndarray:
+        return np.array([math.comb(self.locations, k) * p**k * (1 - p)**(self.locations - k)
+                         for k in range(len(self.shots))])
+
+    # (logical error rate, its standard error, bound on the error of the truncated fault counts) at error rate p
+    def logical_error_rate(self, p: float) -> Tuple[float, float, float]:
+        w = self.weights(p)
+        f = np.divide(self.failures, self.shots, out=np.zeros(len(self.shots)), where=self.shots > 0)
+        variance = np.divide(f * (1 - f), self.shots, out=np.zeros(len(self.shots)), where=self.shots > 0)
+        return float(w @ f), float(np.sqrt(w**2 @ variance)), float(max(0.0, 1 - w.sum()))
+
+
+# sample f_1 ... f_max_faults with a PauliFrameSampler (shots with no fault never fail)
+def sample_by_fault_count(sampler: PauliFrameSampler, max_faults: int, shots: int, seed: int = 0) -> FaultCountEstimate:
+    max_faults = min(max_faults, sampler.noise_locations)
+    failures = np.zeros(max_faults + 1, dtype=np.int64)
+    counts = np.zeros(max_faults + 1, dtype=np.int64)
+    for k, k_seed in zip(range(1, max_faults + 1), np.random.SeedSequence(seed).spawn(max_faults)):
+        failures[k] = sampler.sample(shots, seed=k_seed, fault_count=k)
+        counts[k] = shots
+    return FaultCountEstimate(sampler.noise_locations, failures, counts)
+
+
+# Exact logical error polynomial
+# A Pauli fault configuration of weight w (w faulty locations, each with a given X, Y or Z) has probability
+# (p/3)^w (1-p)^(N-w), and with a Pauli-frame sampler its outcome is deterministic. So evaluating every configuration of
+# weight 0 ... W once gives the logical error rate sum_w A_w (p/3)^w (1-p)^(N-w) for any p, where A_w is the number of
+# failing configurations, up to the weight > W tail, which is at most P(more than W faults).
+@attrs.frozen(eq=False)
+class LogicalErrorPolynomial:
+    locations: int
+    failing: np.ndarray   # failing[w]: number of failing configurations of weight w
+
+    @property
+    def max_weight(self) -> int:
+        return len(self.failing) - 1
+
+    # logical error rate from the enumerated weights (a lower bound of the exact rate)
+    def __call__(self, p):
+        p = np.asarray(p, dtype=float)
+        return sum(a * (p / 3)**w * (1 - p)**(self.locations - w) for w, a in enumerate(self.failing))
+
+    # bound on the missing weight > max_weight part of the rate
+    def tail_bound(self, p):
+        p = np.asarray(p, dtype=float)
+        weight = sum(math.comb(self.locations, w) * p**w * (1 - p)**(self.locations - w) for w in range(self.max_weight + 1))
+        return np.maximum(0.0, 1 - weight)
+
+    # the rate as a power series in p, exact up to p^max_weight (higher weights only add higher powers)
+    def polynomial(self) -> np.polynomial.Polynomial:
+        coefficients = [sum(self.failing[w] / 3**w * math.comb(self.locations - w, d - w) * (-1)**(d - w) for w in range(d + 1))
+                        for d in range(self.max_weight + 1)]
+        return np.polynomial.Polynomial(coefficients)
+
+
+# evaluate every fault configuration of weight <= max_weight, batch_size configurations at a time
+def enumerate_fault_configurations(sampler: PauliFrameSampler, max_weight: int = 2,
+                                   batch_size: int = 1 << 18) -> LogicalErrorPolynomial:
+    failing = np.zeros(max_weight + 1, dtype=np.int64)
+    failing[0] = int(sampler.failures_with_faults(np.zeros((1, 0), dtype=np.int64), np.zeros((1, 0), dtype=np.int64))[0])
+    for w in range(1, max_weight + 1):
+        paulis = np.array(list(itertools.product((1, 2, 3), repeat=w)))
+        combinations = itertools.combinations(range(sampler.noise_locations), w)
+        per_batch = max(1, batch_size // len(paulis))
+        while True:
+            locations = np.array(list(itertools.islice(combinations, per_batch)), dtype=np.int64).reshape(-1, w)
+            if len(locations) == 0:
+                break
+            # every location set with every assignment of Paulis
+            failing[w] += int(sampler.failures_with_faults(np.repeat(locations, len(paulis), axis=0),
+                                                           np.tile(paulis, (len(locations), 1))).sum())
+    return LogicalErrorPolynomial(sampler.noise_locations, failing)
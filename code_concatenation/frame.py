@@ -0,0 +1,316 @@
+from typing import Dict, List, Optional, Tuple
+
+import cirq
+import numpy as np
+import sympy
+from qualtran import Bloq
+from qualtran.bloqs.mcmt import MultiTargetCNOT, MultiControlPauli
+
+from .noise import SymbolicDepolarize
+
+
+# Pauli-frame simulation of the Shor code circuits
+# Encoding, syndrome and decoding only use CNOT, Hadamard and MultiTargetCNOT, which are Clifford gates. So instead of
+# simulating the full state vector we track, for every shot, the Pauli error ("frame") relative to the noiseless run.
+# A frame is one x bit and one z bit per qubit, and the bits of 64 shots are packed into one uint64 word.
+
+# gates the lowered circuits are decomposed into
+PROJECT_GATES = (cirq.CXPowGate, cirq.HPowGate, cirq.XPowGate, cirq.ZPowGate, cirq.IdentityGate, cirq.DepolarizingChannel,
+                 SymbolicDepolarize, cirq.MeasurementGate, cirq.ResetChannel, MultiTargetCNOT, MultiControlPauli)
+
+
+def keep_project_gate(op: cirq.Operation) -> bool:
+    # the classically controlled corrections of ShorLookupRecovery are kept as they are
+    return isinstance(op, cirq.ClassicallyControlledOperation) or isinstance(op.gate, PROJECT_GATES)
+
+
+# one line of qubits per register of the bloq, in the order of its signature
+def line_qubits(bloq: Bloq) -> Dict[str, np.ndarray]:
+    quregs = {}
+    start = 0
+    for reg in bloq.signature.lefts():
+        quregs[reg.name] = np.array(cirq.LineQubit.range(start, start + reg.total_bits()))
+        start += reg.total_bits()
+    return quregs
+
+
+# lower a bloq to a cirq circuit made only of the gates above (instead of one big operation per bloq)
+def lower_to_cirq(bloq: Bloq, **quregs) -> cirq.Circuit:
+    circuit, _ = bloq.as_composite_bloq().to_cirq_circuit(**quregs)
+    return cirq.Circuit(cirq.decompose(circuit, keep=keep_project_gate))
+
+
+# the value qubit q has in the noiseless stabilizer state, which has to be deterministic where the frames rely on it
+def _reference_bit(state: cirq.CliffordTableauSimulationState, q: cirq.Qid, where) -> int:
+    tableau = state.tableau
+    if tableau.xs[tableau.n:, state.qubits.index(q)].any():
+        raise ValueError(f'{q} is random in the noiseless run at {where}, the Pauli-frame sampler needs deterministic '
+                         f'syndromes and readout')
+    # a deterministic measurement doesn't change the state
+    key = f'reference {len(state.log_of_measurement_results)}'
+    cirq.act_on(cirq.measure(q, key=key), state)
+    return int(state.log_of_measurement_results[key][0])
+
+
+# sorted positions of the successes in `size` Bernoulli(p) trials, sampled from the geometric gaps between them
+def sample_bernoulli_positions(rng: np.random.Generator, p: float, size: int) -> np.ndarray:
+    if p <= 0 or size == 0:
+        return np.zeros(0, dtype=np.int64)
+    expected = size * p
+    draws = int(expected + 6 * np.sqrt(expected) + 16)
+    positions = np.cumsum(rng.geometric(p, draws)) - 1
+    while positions[-1] < size:
+        more = np.cumsum(rng.geometric(p, draws)) + positions[-1]
+        positions = np.concatenate([positions, more])
+    return positions[positions < size]
+
+
+class PauliFrameSampler:
+    # circuit: lowered circuit (see lower_to_cirq) where every depolarizing channel is a noise location
+    # readout: the qubit holding the decoded logical qubit, basis: the basis ('X' or 'Z') it is prepared and read out in
+    # (readout=None for a part of a circuit whose logical qubit isn't read out at its end, see MemoryExperiment)
+    #
+    # The frames are flips relative to the noiseless run of the circuit, which is simulated once here on cirq's
+    # stabilizer simulator. MultiControlPauli gates (ShorRecovery, logical_6controlToffoli, logical_2controlCZ) are
+    # controlled by syndrome ancillas, so they become a classical lookup: a shot is corrected when its ancilla x bits
+    # flip the noiseless syndrome onto the control values, and the frame records the difference to the correction of
+    # the noiseless run. The measured syndromes of ShorLookupRecovery are the x bits of the ancillas at the time of the
+    # measurement and its classically controlled Paulis are looked up the same way. A reset (ShorResetRecovery)
+    # prepares a fresh |0>, so it clears the frame of its qubit.
+    # This only works when the noiseless syndromes and readout are deterministic, so a circuit where one of them is
+    # random (the level 2 code) raises a ValueError.
+    # qubits: the qubit order of the frames (default: the sorted qubits of the circuit), so that samplers of several
+    # parts of one circuit can pass their frames on to each other (see MemoryExperiment)
+    # reference: the noiseless state before the circuit (default: all qubits |0>), the noiseless state after it is
+    # kept in self.reference for the next part
+    def __init__(self, circuit: cirq.AbstractCircuit, readout: Optional[cirq.Qid], basis: str = 'X',
+                 qubits: Optional[List[cirq.Qid]] = None,
+                 reference: Optional[cirq.CliffordTableauSimulationState] = None):
+        self.qubits = sorted(circuit.all_qubits()) if qubits is None else list(qubits)
+        index = {q: i for i, q in enumerate(self.qubits)}
+        self.readout = None if readout is None else index[readout]
+        self.basis = basis
+        self.noise_locations = 0
+        measured = {}   # measurement key -> noiseless measured bits
+
+        if reference is None:
+            reference = cirq.CliffordTableauSimulationState(cirq.CliffordTableau(len(self.qubits)),
+                                                            qubits=self.qubits, prng=np.random.RandomState(0))
+        else:
+            reference = reference.copy()
+        self.reference = reference
+
+        self.program = []
+        for moment in circuit:
+            hadamards = []
+            noise = {}
+            for op in moment:
+                gate = op.gate
+                qs = [index[q] for q in op.qubits]
+                if isinstance(op, cirq.ClassicallyControlledOperation):
+                    pauli = op.without_classical_controls().gate
+                    condition = [(key, tuple(int(b) for b in np.binary_repr(value, width=len(measured[key]))))
+                                 for key, value in self._lookup_condition(op)]
+                    fired = all(measured[key] == bits for key, bits in condition)
+                    # the x bits that flip the noiseless bits onto the condition
+                    bits = [(key, tuple(b ^ r for b, r in zip(bits, measured[key]))) for key, bits in condition]
+                    self.program.append(('measured lookup', bits, qs[0], pauli == cirq.X, fired))
+                    if fired:
+                        cirq.act_on(pauli(op.qubits[0]), reference)
+                elif isinstance(gate, cirq.MeasurementGate):
+                    measured[gate.key] = tuple(_reference_bit(reference, q, op) for q in op.qubits)
+                    self.program.append(('measure', gate.key, np.array(qs)))
+                elif isinstance(gate, cirq.ResetChannel):
+                    if _reference_bit(reference, op.qubits[0], op):
+                        cirq.act_on(cirq.X(op.qubits[0]), reference)
+                    self.program.append(('reset', np.array(qs)))
+                elif isinstance(gate, cirq.HPowGate) and gate.exponent == 1:
+                    cirq.act_on(op, reference)
+                    hadamards.append(qs[0])
+                elif isinstance(gate, (cirq.CXPowGate, MultiTargetCNOT)) and getattr(gate, 'exponent', 1) == 1:
+                    for t in op.qubits[1:]:
+                        cirq.act_on(cirq.CNOT(op.qubits[0], t), reference)
+                    self.program.append(('cx', qs[0], np.array(qs[1:])))
+                elif isinstance(gate, MultiControlPauli):
+                    is_x = gate.target_gate == cirq.X
+                    noiseless = [_reference_bit(reference, q, op) for q in op.qubits[:-1]]
+                    fired = all(r == cv for r, cv in zip(noiseless, gate.cvs))
+                    cvs = tuple(cv ^ r for cv, r in zip(gate.cvs, noiseless))
+                    self.program.append(('lookup', tuple(qs[:-1]), cvs, qs[-1], is_x, fired))
+                    if fired:
+                        cirq.act_on(gate.target_gate(op.qubits[-1]), reference)
+                elif isinstance(gate, (cirq.DepolarizingChannel, SymbolicDepolarize)):
+                    noise.setdefault(gate.p, []).extend(qs)
+                elif isinstance(gate, cirq.IdentityGate):
+                    continue
+                elif isinstance(gate, (cirq.XPowGate, cirq.ZPowGate)) and gate.exponent == 1:
+                    # Pauli gates don't change the frame
+                    cirq.act_on(op, reference)
+                else:
+                    raise ValueError(f'{op} is not supported by the Pauli-frame sampler')
+            if hadamards:
+                self.program.append(('h', np.array(hadamards)))
+            for p, qs in noise.items():
+                self.program.append(('noise', np.array(qs), p))
+                self.noise_locations += len(qs)
+
+        if readout is not None:
+            final = reference.copy()
+            if basis == 'X':
+                cirq.act_on(cirq.H(readout), final)
+            if _reference_bit(final, readout, 'the readout'):
+                raise ValueError(f'the noiseless circuit reads out the logical qubit flipped in the {basis} basis')
+
+        # number of noise locations before each noise step, to map a location number to its step and qubit
+        self.noise_offsets = np.cumsum([0] + [len(step[1]) for step in self.program if step[0] == 'noise'])
+
+    # measurement keys and values of a correction conditioned on 'key == value' (as made by ShorLookupRecovery) or on
+    # '(key1 == value1) & (key2 == value2) & ...' (as made by ShorResetRecovery)
+    @staticmethod
+    def _lookup_condition(op: cirq.ClassicallyControlledOperation) -> List[Tuple[str, int]]:
+        (condition,) = op.classical_controls
+        expr = condition.expr if isinstance(condition, cirq.SympyCondition) else None
+        pauli = op.without_classical_controls().gate
+        terms = expr.args if isinstance(expr, sympy.And) else [expr]
+        if not all(isinstance(term, sympy.Eq) for term in terms) or pauli not in (cirq.X, cirq.Z):
+            raise ValueError(f'{op} is not supported by the Pauli-frame sampler')
+        return [(str(term.lhs), int(term.rhs)) for term in terms]
+
+    # run one batch of shots and return the packed frames
+    # faults: the (positions, paulis) of every noise step, if they are not sampled with the error rate p
+    # records: dict the measured x bits are stored in, by measurement key
+    def _run(self, words: int, rng: np.random.Generator, p: Optional[float], faults=None,
+             records: Optional[Dict[str, np.ndarray]] = None):
+        x = np.zeros((len(self.qubits), words), dtype=np.uint64)
+        z = np.zeros((len(self.qubits), words), dtype=np.uint64)
+        self._apply(x, z, {} if records is None else records, rng, p, faults)
+        return x, z
+
+    # run the program on the packed frames x and z in place, recording the measured x bits in records
+    def _apply(self, x, z, records: Dict[str, np.ndarray], rng: np.random.Generator, p: Optional[float], faults=None):
+        words = x.shape[1]
+        noise_step = 0
+        for step in self.program:
+            kind = step[0]
+            if kind == 'cx':
+                _, c, t = step
+                x[t] ^= x[c]
+                z[c] ^= np.bitwise_xor.reduce(z[t], axis=0)
+            elif kind == 'h':
+                qs = step[1]
+                x[qs], z[qs] = z[qs], x[qs]
+            elif kind == 'lookup':
+                _, controls, cvs, target, is_x, fired = step
+                fire = np.full(words, ~np.uint64(0))
+                for c, cv in zip(controls, cvs):
+                    fire &= x[c] if cv else ~x[c]
+                if fired:
+                    # the noiseless run is corrected, so the frame changes where the shot isn't
+                    fire = ~fire
+                if is_x:
+                    x[target] ^= fire
+                else:
+                    z[target] ^= fire
+            elif kind == 'measure':
+                _, key, qs = step
+                records[key] = x[qs]
+            elif kind == 'reset':
+                qs = step[1]
+                x[qs] = 0
+                z[qs] = 0
+            elif kind == 'measured lookup':
+                _, bits, target, is_x, fired = step
+                fire = np.full(words, ~np.uint64(0))
+                for key, key_bits in bits:
+                    for record, bit in zip(records[key], key_bits):
+                        fire &= record if bit else ~record
+                if fired:
+                    fire = ~fire
+                if is_x:
+                    x[target] ^= fire
+                else:
+                    z[target] ^= fire
+            else:
+                _, qs, location_p = step
+                if faults is None:
+                    # position = (index in qs) * 64 * words + shot, so position >> 6 is the (qubit, word) pair
+                    positions = sample_bernoulli_positions(rng, location_p if p is None else p, len(qs) * words * 64)
+                    pauli = rng.integers(1, 4, size=len(positions))   # 1: X, 2: Z, 3: Y
+                else:
+                    positions, pauli = faults[noise_step]
+                self._add_faults(x, z, qs, positions, pauli)
+                noise_step += 1
+
+    # XOR the Pauli faults at the sorted positions on the qubits qs into the frames
+    @staticmethod
+    def _add_faults(x, z, qs, positions, pauli):
+        words = x.shape[1]
+        for frame, part in [(x, 1), (z, 2)]:
+            hit = positions[(pauli & part) != 0]
+            if len(hit) == 0:
+                continue
+            keys = hit >> 6
+            bits = np.left_shift(np.uint64(1), (hit & 63).astype(np.uint64))
+            # the positions are sorted, so the bits of one word are next to each other
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            keys = keys[starts]
+            rows = qs[keys // words] * words + keys % words
+            frame.reshape(-1)[rows] ^= np.bitwise_or.reduceat(bits, starts)
+
+    # faults of `shots` shots with exactly k faults each, at distinct noise locations chosen uniformly
+    def _fixed_count_faults(self, shots: int, words: int, k: int, rng: np.random.Generator):
+        locations = rng.integers(0, self.noise_locations, size=(shots, k))
+        while True:
+            ordered = np.sort(locations, axis=1)
+            repeated = np.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+            if len(repeated) == 0:
+                break
+            locations[repeated] = rng.integers(0, self.noise_locations, size=(len(repeated), k))
+        return self._faults_at(locations, rng.integers(1, 4, size=(shots, k)), words)
+
+    # faults of the noise steps for the given noise location numbers and Paulis (1: X, 2: Z, 3: Y) of every shot
+    def _faults_at(self, locations: np.ndarray, pauli: np.ndarray, words: int):
+        shots, k = locations.shape
+        shot = np.repeat(np.arange(shots), k)
+        locations = locations.reshape(-1)
+        pauli = pauli.reshape(-1)
+        noise_step = np.searchsorted(self.noise_offsets, locations, side='right') - 1
+        positions = (locations - self.noise_offsets[noise_step]) * words * 64 + shot
+        faults = []
+        for i in range(len(self.noise_offsets) - 1):
+            mine = noise_step == i
+            order = np.argsort(positions[mine])
+            faults.append((positions[mine][order], pauli[mine][order]))
+        return faults
+
+    # whether the logical qubit is flipped, for shots with the given faults (locations and Paulis of shape (shots, k))
+    def failures_with_faults(self, locations: np.ndarray, pauli: np.ndarray) -> np.ndarray:
+        shots = len(locations)
+        words = -(-shots // 64)
+        x, z = self._run(words, None, None, self._faults_at(locations, pauli, words))
+        flipped = z[self.readout] if self.basis == 'X' else x[self.readout]
+        return np.unpackbits(flipped.view(np.uint8), bitorder='little')[:shots].astype(bool)
+
+    # number of shots (out of `shots`) where the decoded logical qubit is flipped
+    # p overrides the probability of every noise location (so one sampler serves the whole physical_erros grid)
+    # fault_count: instead of sampling with p, put exactly this many faults in every shot (see sample_by_fault_count)
+    def sample(self, shots: int, p: Optional[float] = None, seed=None, batch_size: int = 1 << 20,
+               fault_count: Optional[int] = None) -> int:
+        if fault_count is None and p is None and any(cirq.is_parameterized(step[2]) for step in self.program if step[0] == 'noise'):
+            raise ValueError('the circuit has symbolic noise, the error rate p has to be given')
+        rng = np.random.default_rng(seed)
+        failures = 0
+        done = 0
+        while done < shots:
+            batch = min(batch_size, shots - done)
+            words = -(-batch // 64)
+            faults = None if fault_count is None else self._fixed_count_faults(batch, words, fault_count, rng)
+            x, z = self._run(words, rng, p, faults)
+            flipped = z[self.readout] if self.basis == 'X' else x[self.readout]
+            bits = np.unpackbits(flipped.view(np.uint8), bitorder='little')[:batch]
+            failures += int(bits.sum())
+            done += batch
+        return failures
+
+    def logical_error_rate(self, shots: int, p: Optional[float] = None, seed=None) -> float:
+        return self.sample(shots, p, seed) / shots
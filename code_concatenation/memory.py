@@ -0,0 +1,118 @@
+from typing import Iterator, Optional, Tuple
+
+import cirq
+import numpy as np
+
+from .bloqs import (
+    CONCATENATED_RECOVERY_MODES, ConcatenatedShor, ConcatenatedShorDecode, ConcatenatedShorEncode,
+    ConcatenatedShorRecovery, ConcatenatedShorSyndrome, concatenated_shor_qubits,
+)
+from .frame import PauliFrameSampler, line_qubits, lower_to_cirq
+from .noise import PHYSICAL_ERROR, depolarize
+
+
+# Memory experiments
+# ConcatenatedShor runs one encode -> syndrome -> recovery -> decode pass. A memory experiment stores the encoded
+# logical qubit for T rounds of syndrome measurement and recovery. Unrolling T rounds into one circuit would build and
+# lower T copies of the same stages, so MemoryExperiment lowers the encoding, one round and the decoding once and runs
+# them as Pauli-frame programs: the frames of all shots are carried from one round to the next, and the same round
+# program is applied T times, so a run costs T times one round.
+#
+# The ancillas are reset before every round (the coherent recovery leaves the syndrome on them). After every round a
+# copy of the frames is decoded without noise, which gives the logical error rate after t rounds, and the syndrome of
+# the round (the x bits of the ancillas at its end) is compared with the one of the previous round: the shots
+# where it changed have a detection event. run only keeps the last syndrome; syndromes returns the whole history of
+# every shot, for decoders that look at all rounds.
+#
+# The rounds run on Pauli frames, so like PauliFrameSampler they need deterministic noiseless syndromes: the level 2
+# code, whose noiseless syndromes are random, raises a ValueError. Every round reuses the program of the first one,
+# which is only right when a noiseless round leaves the state as it found it, and that is checked as well.
+#
+# Noise models as in noisy_circuit: 'after encoding' puts a depolarizing channel on every data qubit at the start of
+# every round, 'everywhere' one on every qubit after every moment of the encoding and of every round.
+
+class MemoryExperiment:
+    def __init__(self, level: int = 1, model: str = 'after encoding', recovery: str = 'coherent',
+                 basis: Optional[str] = None):
+        if recovery not in CONCATENATED_RECOVERY_MODES:
+            raise ValueError(f'unknown recovery mode {recovery!r} for a memory experiment, expected one of '
+                             f'{CONCATENATED_RECOVERY_MODES}')
+        # the readout basis of the sweeps of the same level (see READOUT_BASIS)
+        self.basis = basis or {1: 'X'}.get(level, 'Z')
+        quregs = line_qubits(ConcatenatedShor(level, recovery))
+        self.qubits = [*quregs['logicals'], *quregs['ancillas']]
+        self.ancillas = np.arange(concatenated_shor_qubits(level)[0], len(self.qubits))
+
+        encode = lower_to_cirq(ConcatenatedShorEncode(level), **quregs)
+        if self.basis == 'X':
+            encode = cirq.Circuit(cirq.H(self.qubits[0])) + encode
+        round_ = (lower_to_cirq(ConcatenatedShorSyndrome(level), **quregs)
+                  + lower_to_cirq(ConcatenatedShorRecovery(level, recovery), **quregs))
+        if model == 'after encoding':
+            round_ = cirq.Circuit(depolarize(PHYSICAL_ERROR).on_each(*quregs['logicals'])) + round_
+        elif model == 'everywhere':
+            encode = encode.with_noise(depolarize(PHYSICAL_ERROR))
+            round_ = round_.with_noise(depolarize(PHYSICAL_ERROR))
+        else:
+            raise ValueError(f"unknown noise model {model!r}, expected 'after encoding' or 'everywhere'")
+        decode = lower_to_cirq(ConcatenatedShorDecode(level), **quregs)
+
+        # each part starts from the noiseless state the previous one ends in
+        self.encode = PauliFrameSampler(encode, None, self.basis, self.qubits)
+        self.round = PauliFrameSampler(round_, None, self.basis, self.qubits, self.encode.reference)
+        self.decode = PauliFrameSampler(decode, self.qubits[0], self.basis, self.qubits, self.round.reference)
+        again = PauliFrameSampler(round_, None, self.basis, self.qubits, self.round.reference)
+        if _lookups(again) != _lookups(self.round):
+            raise ValueError('a noiseless round changes the syndromes of the next one, so the rounds can\'t share one '
+                             'program')
+
+    # (round, failures, detections) after each of the rounds, as they are simulated: the number of the shots whose
+    # logical qubit is flipped when it is decoded after that round, and of the shots with a detection event in it
+    # p sets the probability of every noise location (the circuits are built with PHYSICAL_ERROR)
+    def run(self, shots: int, rounds: int, p: float, seed=None) -> Iterator[Tuple[int, int, int]]:
+        previous = 0
+        for t, flipped, syndrome in self._rounds(shots, rounds, p, seed):
+            detected = np.bitwise_or.reduce(syndrome ^ previous, axis=0)
+            previous = syndrome
+            yield t, _count_bits(flipped, shots), _count_bits(detected, shots)
+
+    # the syndrome history: syndromes[j, t - 1, i] is the syndrome bit of ancilla i after round t of shot j, for the
+    # same shots as run with the same seed (the history takes shots * rounds * ancillas bytes)
+    def syndromes(self, shots: int, rounds: int, p: float, seed=None) -> np.ndarray:
+        history = np.zeros((shots, rounds, len(self.ancillas)), dtype=bool)
+        for t, _, syndrome in self._rounds(shots, rounds, p, seed):
+            history[:, t - 1] = np.unpackbits(syndrome.view(np.uint8), axis=1, bitorder='little')[:, :shots].T
+        return history
+
+    # (round, flipped, syndrome) after each round: the packed flips of the logical qubit decoded after that round and
+    # the packed syndrome of the round, the x bits of the ancillas at its end
+    def _rounds(self, shots: int, rounds: int, p: float, seed=None) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        rng = np.random.default_rng(seed)
+        words = -(-shots // 64)
+        x = np.zeros((len(self.qubits), words), dtype=np.uint64)
+        z = np.zeros((len(self.qubits), words), dtype=np.uint64)
+        self.encode._apply(x, z, {}, rng, p)
+
+        for t in range(1, rounds + 1):
+            x[self.ancillas] = 0
+            z[self.ancillas] = 0
+            self.round._apply(x, z, {}, rng, p)
+            syndrome = x[self.ancillas]
+
+            decoded_x, decoded_z = x.copy(), z.copy()
+            self.decode._apply(decoded_x, decoded_z, {}, rng, None)
+            yield t, decoded_z[0] if self.basis == 'X' else decoded_x[0], syndrome
+
+    # failures after each round, as an array of length `rounds`
+    def sample(self, shots: int, rounds: int, p: float, seed=None) -> np.ndarray:
+        return np.array([failures for _, failures, _ in self.run(shots, rounds, p, seed)], dtype=np.int64)
+
+
+# the syndrome lookups of a sampler, with the noiseless syndromes they are relative to
+def _lookups(sampler: PauliFrameSampler):
+    return [step for step in sampler.program if step[0] in ('lookup', 'measured lookup')]
+
+
+# number of set bits among the first `shots` bits of packed words
+def _count_bits(words: np.ndarray, shots: int) -> int:
+    return int(np.unpackbits(words.view(np.uint8), bitorder='little')[:shots].sum())
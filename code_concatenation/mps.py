@@ -0,0 +1,243 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cirq
+import numpy as np
+from qualtran.bloqs.mcmt import MultiTargetCNOT, MultiControlPauli
+
+from .frame import PauliFrameSampler
+from .noise import SymbolicDepolarize
+
+
+# Matrix-product-state simulation of the lowered circuits
+# The state vector of the 161-qubit level 2 circuit does not fit in memory, but with the qubits of every block next to
+# each other (concatenated_order) its entanglement stays bounded: at most 8 ebits across any cut of the chain, so bonds
+# of dimension 256 hold the noiseless level 2 circuit exactly. MPSSampler keeps the state as a chain of tensors, one
+# per qubit, with the bonds between neighbours capped at max_bond, and runs every shot as a trajectory: the
+# depolarizing channels apply a sampled Pauli, measurements sample an outcome and project on it.
+#
+# A CNOT or MultiTargetCNOT is the sum of two product operators (|0><0| on the control, or |1><1| on the control and X
+# on the targets), and a multi-controlled Pauli P the identity plus (P - 1) on the target times the projectors of the
+# controls, so every gate is applied across the sites it spans as a matrix product operator of bond dimension 2,
+# without SWAPs. The bonds are then truncated back by a sweep of SVDs in canonical form, so the singular values of a
+# split are the Schmidt values of the whole state and the weight discarded by the cap (and by cutoff) is the exact
+# truncation error of that split. The truncation error of a shot is 1 - the product of (1 - discarded weight) over its
+# splits: near 0 when the cap is large enough, near 1 when the results of the shot can't be trusted.
+#
+# The syndromes of the noiseless level 2 circuit are random, and so is its readout: the level 2 rates are near 1/2 at
+# every error rate and can't be compared with the level 1 rates until the level 2 encoder is fixed.
+
+# real matrices, so that the tensors of the Clifford circuits stay real (XZ is Y up to a global phase)
+PAULIS = {1: np.array([[0.0, 1.0], [1.0, 0.0]]), 2: np.diag([1.0, -1.0])}
+PAULIS[3] = PAULIS[1] @ PAULIS[2]
+PROJECTORS = {0: np.diag([1.0, 0.0]), 1: np.diag([0.0, 1.0])}
+H = np.array([[1.0, 1.0], [1.0, -1.0]]) / np.sqrt(2)
+
+
+# 2x2 matrix u on the physical index of a site tensor, and a matrix m on its right bond
+def _on_site(u: np.ndarray, a: np.ndarray) -> np.ndarray:
+    return np.stack([u[0, 0] * a[:, 0] + u[0, 1] * a[:, 1], u[1, 0] * a[:, 0] + u[1, 1] * a[:, 1]], axis=1)
+
+
+def _times_right(a: np.ndarray, m: np.ndarray) -> np.ndarray:
+    return (a.reshape(-1, a.shape[2]) @ m).reshape(a.shape[0], 2, -1)
+
+
+# numpy's SVD (LAPACK gesdd) sometimes fails to converge on the degenerate spectra of these states, gesvd doesn't
+def _svd(m: np.ndarray):
+    try:
+        return np.linalg.svd(m, full_matrices=False)
+    except np.linalg.LinAlgError:
+        from scipy.linalg import svd
+        return svd(m, full_matrices=False, lapack_driver='gesvd')
+
+
+# sites of the qubits of the level L code (9^L data qubits and 9^L - 1 ancillas, as in concatenatedShorAll): every
+# block of the code with its syndrome ancillas in the middle (after its first 5 sub-blocks), recursively, so that the
+# gates of the checks span half a block instead of a whole one
+def concatenated_order(data: Sequence[cirq.Qid], ancillas: Sequence[cirq.Qid]) -> List[cirq.Qid]:
+    data, ancillas = list(data), list(ancillas)
+    if len(data) % 9 or len(ancillas) != len(data) - 1:
+        return data + ancillas
+    n = len(data) // 9
+    blocks = [concatenated_order(data[i * n:(i + 1) * n], ancillas[i * (n - 1):(i + 1) * (n - 1)]) for i in range(9)]
+    return sum(blocks[:5], []) + ancillas[9 * (n - 1):] + sum(blocks[5:], [])
+
+
+class MatrixProductState:
+    # |0...0> on n sites
+    def __init__(self, n: int, max_bond: int, cutoff: float):
+        self.tensors = [np.array([1.0, 0.0]).reshape(1, 2, 1) for _ in range(n)]
+        self.max_bond = max_bond
+        self.cutoff = cutoff
+        self.center = 0
+        self.fidelity = 1.0     # product of (1 - discarded weight) over the splits
+        self.largest_bond = 1
+
+    def move_center(self, site: int):
+        while self.center < site:
+            self._left_orthonormalize(self.center)
+            self.center += 1
+        while self.center > site:
+            a = self.tensors[self.center]
+            q, r = np.linalg.qr(a.reshape(a.shape[0], -1).T)
+            self.tensors[self.center] = q.T.reshape(-1, 2, a.shape[2])
+            self.tensors[self.center - 1] = _times_right(self.tensors[self.center - 1], r.T)
+            self.center -= 1
+
+    def _left_orthonormalize(self, site: int):
+        a = self.tensors[site]
+        q, r = np.linalg.qr(a.reshape(-1, a.shape[2]))
+        self.tensors[site] = q.reshape(a.shape[0], 2, -1)
+        b = self.tensors[site + 1]
+        self.tensors[site + 1] = (r @ b.reshape(b.shape[0], -1)).reshape(-1, 2, b.shape[2])
+
+    def apply_1q(self, site: int, u: np.ndarray):
+        self.tensors[site] = _on_site(u, self.tensors[site])
+
+    # apply the sum of the product operators terms[t] = {site: 2x2 matrix} (the identity on the sites a term leaves out),
+    # as a matrix product operator with one bond index per term, and truncate the bonds back
+    def apply_terms(self, terms: Sequence[Dict[int, np.ndarray]]):
+        sites = sorted(set().union(*terms))
+        lo, hi = sites[0], sites[-1]
+        if lo == hi:
+            self.apply_1q(lo, sum(term.get(lo, np.eye(2)) for term in terms))
+            return
+        self.move_center(lo)
+        for site in range(lo, hi + 1):
+            a = self.tensors[site]
+            blocks = [_on_site(term[site], a) if site in term else a for term in terms]
+            if site == lo:
+                self.tensors[site] = np.concatenate(blocks, axis=2)
+            elif site == hi:
+                self.tensors[site] = np.concatenate(blocks, axis=0)
+            else:
+                # block diagonal in the term index
+                left, right = a.shape[0], a.shape[2]
+                b = np.zeros((len(terms) * left, 2, len(terms) * right), dtype=np.result_type(*blocks))
+                for t, block in enumerate(blocks):
+                    b[t * left:(t + 1) * left, :, t * right:(t + 1) * right] = block
+                self.tensors[site] = b
+
+        # orthonormalize left to right, then truncate right to left where the singular values are the Schmidt values
+        for site in range(lo, hi):
+            self._left_orthonormalize(site)
+        for site in range(hi, lo, -1):
+            a = self.tensors[site]
+            u, s, v = _svd(a.reshape(a.shape[0], -1))
+            total = np.sum(s**2)
+            keep = min(self.max_bond, max(1, int(np.count_nonzero(s**2 > self.cutoff * total))))
+            kept = np.sum(s[:keep]**2)
+            self.fidelity *= kept / total
+            self.largest_bond = max(self.largest_bond, keep)
+            self.tensors[site] = v[:keep].reshape(keep, 2, a.shape[2])
+            self.tensors[site - 1] = _times_right(self.tensors[site - 1], u[:, :keep] * (s[:keep] / np.sqrt(kept)))
+        self.center = lo
+
+    # measure a site in the Z basis and project on the outcome
+    def measure(self, site: int, rng: np.random.Generator) -> int:
+        self.move_center(site)
+        a = self.tensors[site]
+        p1 = np.sum(np.abs(a[:, 1, :])**2) / np.sum(np.abs(a)**2)
+        bit = int(rng.random() < p1)
+        a = a.copy()
+        a[:, 1 - bit, :] = 0
+        self.tensors[site] = a / np.linalg.norm(a)
+        return bit
+
+
+class MPSSampler:
+    # circuit: lowered circuit (see lower_to_cirq) where every depolarizing channel is a noise location
+    # readout: the qubit holding the decoded logical qubit, basis: the basis ('X' or 'Z') it is prepared and read out in
+    # order: the qubits in the order of the sites of the chain (by default the sorted qubits of the circuit)
+    # max_bond: cap on the bond dimension, cutoff: singular values with a smaller share of the weight are dropped too
+    def __init__(self, circuit: cirq.AbstractCircuit, readout: cirq.Qid, basis: str = 'X',
+                 order: Optional[Sequence[cirq.Qid]] = None, max_bond: int = 256, cutoff: float = 1e-12):
+        self.qubits = list(order) if order is not None else sorted(circuit.all_qubits())
+        index = {q: i for i, q in enumerate(self.qubits)}
+        self.readout = index[readout]
+        self.basis = basis
+        self.max_bond = max_bond
+        self.cutoff = cutoff
+
+        self.program = []
+        for op in circuit.all_operations():
+            gate = op.gate
+            qs = [index[q] for q in op.qubits]
+            if isinstance(op, cirq.ClassicallyControlledOperation):
+                pauli = op.without_classical_controls().gate
+                condition = PauliFrameSampler._lookup_condition(op)
+                self.program.append(('measured lookup', condition, qs[0], np.real_if_close(cirq.unitary(pauli))))
+            elif isinstance(gate, cirq.MeasurementGate):
+                self.program.append(('measure', gate.key, qs))
+            elif isinstance(gate, cirq.ResetChannel):
+                self.program.append(('reset', qs))
+            elif isinstance(gate, (cirq.DepolarizingChannel, SymbolicDepolarize)):
+                self.program.append(('noise', qs, gate.p))
+            elif isinstance(gate, cirq.IdentityGate):
+                continue
+            elif isinstance(gate, MultiTargetCNOT) or (isinstance(gate, cirq.CXPowGate) and gate.exponent == 1):
+                # |0><0| on the control, or |1><1| on the control and X on every target
+                fanout = {t: PAULIS[1] for t in qs[1:]}
+                self.program.append(('terms', [{qs[0]: PROJECTORS[0]}, {qs[0]: PROJECTORS[1], **fanout}]))
+            elif isinstance(gate, MultiControlPauli) and gate.target_gate in (cirq.X, cirq.Z):
+                # the identity, plus (P - 1) on the target where every control has its value
+                controls = {c: PROJECTORS[cv] for c, cv in zip(qs[:-1], gate.cvs)}
+                pauli = np.real(cirq.unitary(gate.target_gate)) - np.eye(2)
+                self.program.append(('terms', [{}, {**controls, qs[-1]: pauli}]))
+            elif len(qs) == 1 and cirq.has_unitary(op):
+                self.program.append(('gate', qs[0], np.real_if_close(cirq.unitary(op))))
+            else:
+                raise ValueError(f'{op} is not supported by the MPS sampler')
+
+    # run one shot and return whether the logical qubit is flipped, and its final state
+    def _run_shot(self, rng: np.random.Generator, p: Optional[float]) -> Tuple[bool, MatrixProductState]:
+        state = MatrixProductState(len(self.qubits), self.max_bond, self.cutoff)
+        records: Dict[str, int] = {}
+        for step in self.program:
+            kind = step[0]
+            if kind == 'gate':
+                state.apply_1q(step[1], step[2])
+            elif kind == 'terms':
+                state.apply_terms(step[1])
+            elif kind == 'noise':
+                _, qs, location_p = step
+                hit = np.flatnonzero(rng.random(len(qs)) < (location_p if p is None else p))
+                for i, pauli in zip(hit, rng.integers(1, 4, size=len(hit))):
+                    state.apply_1q(qs[i], PAULIS[pauli])
+            elif kind == 'measure':
+                _, key, qs = step
+                value = 0
+                for q in qs:
+                    value = 2 * value + state.measure(q, rng)
+                records[key] = value
+            elif kind == 'reset':
+                for q in step[1]:
+                    if state.measure(q, rng):
+                        state.apply_1q(q, PAULIS[1])
+            else:
+                _, condition, target, u = step
+                if all(records[key] == value for key, value in condition):
+                    state.apply_1q(target, u)
+
+        if self.basis == 'X':
+            state.apply_1q(self.readout, H)
+        return bool(state.measure(self.readout, rng)), state
+
+    # number of shots (out of `shots`) where the decoded logical qubit is flipped, as for PauliFrameSampler
+    # p overrides the probability of every noise location
+    def sample(self, shots: int, p: Optional[float] = None, seed=None) -> int:
+        return int(self.sample_shots(shots, p, seed)['failures'].sum())
+
+    # failures, truncation errors and largest bond dimensions of every shot
+    def sample_shots(self, shots: int, p: Optional[float] = None, seed=None) -> Dict[str, np.ndarray]:
+        if p is None and any(cirq.is_parameterized(step[2]) for step in self.program if step[0] == 'noise'):
+            raise ValueError('the circuit has symbolic noise, the error rate p has to be given')
+        rng = np.random.default_rng(seed)
+        failures, truncation, bonds = [], [], []
+        for _ in range(shots):
+            flipped, state = self._run_shot(rng, p)
+            failures.append(flipped)
+            truncation.append(max(0.0, 1 - state.fidelity))
+            bonds.append(state.largest_bond)
+        return dict(failures=np.array(failures, dtype=bool), truncation=np.array(truncation),
+                    bond=np.array(bonds, dtype=np.int64))
@@ -0,0 +1,36 @@
+from typing import Union
+
+import attrs
+import cirq
+import sympy
+
+
+# Noise
+# The noisy circuits are built and lowered once with the physical error rate as a sympy symbol, and the symbol is
+# resolved with a cirq.ParamResolver for every point of the sweep.
+PHYSICAL_ERROR = sympy.Symbol('p')
+
+
+# depolarizing channel whose probability may be a sympy expression (cirq.depolarize only accepts numbers)
+@attrs.frozen
+class SymbolicDepolarize(cirq.Gate):
+    p: Union[float, sympy.Expr]
+
+    def _num_qubits_(self):
+        return 1
+
+    def _is_parameterized_(self):
+        return cirq.is_parameterized(self.p)
+
+    def _parameter_names_(self):
+        return cirq.parameter_names(self.p)
+
+    def _resolve_parameters_(self, resolver: cirq.ParamResolver, recursive: bool):
+        return cirq.depolarize(p=float(resolver.value_of(self.p, recursive)))
+
+    def _circuit_diagram_info_(self, args):
+        return f'D({self.p})'
+
+
+def depolarize(p: Union[float, sympy.Expr]) -> cirq.Gate:
+    return SymbolicDepolarize(p) if cirq.is_parameterized(p) else cirq.depolarize(p=p)
@@ -0,0 +1,91 @@
+from typing import List, Optional
+
+import cirq
+import numpy as np
+from qualtran.bloqs.mcmt import MultiTargetCNOT, MultiControlPauli
+
+
+# Peephole optimization of lowered circuits
+# ShorSyndrome closes a ZZ check with Hadamards on its two qubits and opens the next check with Hadamards on the same
+# qubits, and the concatenated code does the same with logicalH on whole blocks, so the lowered circuits contain H·H
+# pairs that do nothing. optimize_circuit cancels every operation against the previous operation on its qubits when both
+# are the same self-inverse gate, and replaces runs of single-qubit gates whose product is I, H, X or Z (up to a global
+# phase) by that gate. Noise channels, measurements and classically controlled operations are never cancelled or
+# merged, and no operation moves past them, so the logical behaviour of the circuit is unchanged.
+
+# single-qubit gates a run can be merged into (I removes the run)
+MERGED_GATES = [cirq.I, cirq.H, cirq.X, cirq.Z]
+
+
+def is_self_inverse(op: cirq.Operation) -> bool:
+    if not isinstance(op, cirq.GateOperation):
+        return False
+    gate = op.gate
+    if isinstance(gate, (MultiTargetCNOT, MultiControlPauli)):
+        return True
+    return (isinstance(gate, (cirq.HPowGate, cirq.XPowGate, cirq.YPowGate, cirq.ZPowGate, cirq.CXPowGate, cirq.CZPowGate))
+            and gate.exponent == 1 and gate.global_shift == 0)
+
+
+def is_mergeable(op: cirq.Operation) -> bool:
+    return (isinstance(op, cirq.GateOperation) and len(op.qubits) == 1 and not cirq.is_parameterized(op)
+            and not cirq.is_measurement(op) and cirq.has_unitary(op))
+
+
+# remove the pairs of equal self-inverse operations that are adjacent on all their qubits
+def cancel_self_inverse_pairs(ops: List[cirq.Operation]) -> List[Optional[cirq.Operation]]:
+    ops = list(ops)
+    stacks = {}   # qubit -> indices of the kept operations on it
+    for i, op in enumerate(ops):
+        tops = {stacks[q][-1] if stacks.get(q) else None for q in op.qubits}
+        if is_self_inverse(op) and len(tops) == 1:
+            j = tops.pop()
+            if j is not None and ops[j] == op:
+                for q in op.qubits:
+                    stacks[q].pop()
+                ops[i] = ops[j] = None
+                continue
+        for q in op.qubits:
+            stacks.setdefault(q, []).append(i)
+    return [op for op in ops if op is not None]
+
+
+# replace every run of single-qubit gates on a qubit by one of MERGED_GATES when their product is that gate
+def merge_single_qubit_runs(ops: List[cirq.Operation]) -> List[cirq.Operation]:
+    ops = list(ops)
+    runs = {}   # qubit -> indices of the current run of single-qubit gates on it
+
+    def close(q):
+        run = runs.pop(q, [])
+        if len(run) < 2:
+            return
+        unitary = np.eye(2)
+        for i in run:
+            unitary = cirq.unitary(ops[i]) @ unitary
+        for gate in MERGED_GATES:
+            if cirq.equal_up_to_global_phase(unitary, cirq.unitary(gate)):
+                for i in run:
+                    ops[i] = None
+                if gate != cirq.I:
+                    ops[run[-1]] = gate(q)
+                return
+
+    for i, op in enumerate(ops):
+        if is_mergeable(op):
+            runs.setdefault(op.qubits[0], []).append(i)
+        else:
+            for q in op.qubits:
+                close(q)
+    for q in list(runs):
+        close(q)
+    return [op for op in ops if op is not None]
+
+
+# cancel and merge until nothing changes, then pack the operations into the fewest moments
+def optimize_circuit(circuit: cirq.AbstractCircuit) -> cirq.Circuit:
+    ops = list(circuit.all_operations())
+    while True:
+        optimized = merge_single_qubit_runs(cancel_self_inverse_pairs(ops))
+        if len(optimized) == len(ops):
+            return cirq.Circuit(optimized)
+        ops = optimized
@@ -0,0 +1,131 @@
+import json
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import cirq
+import numpy as np
+
+from .frame import PauliFrameSampler
+
+
+# Shot records
+# The syndromes and logical outcomes of every shot, for offline decoders and analysis. A record file is a small header
+# followed by one fixed-size row per shot, so a reader can memory-map the rows and scan tens of millions of shots in
+# chunks without building a Python object per shot.
+#
+#   MAGIC (8 bytes) | header length (uint32, little endian) | JSON header, padded with spaces | rows
+#
+# The rows start at a multiple of 64 bytes. The header holds syndrome_bits and row_bytes and the metadata of the run
+# (level, noise model, recovery, p, seed, ...). A row packs its bits with np.packbits(..., bitorder='little'): bits
+# 0 ... syndrome_bits - 1 are the syndrome (in the order of the ancillas) and bit syndrome_bits is 1 when the logical
+# qubit was flipped. The number of shots follows from the size of the file, so a writer only ever appends.
+#
+# The syndromes come from the Pauli-frame sampler, so they are flips relative to the noiseless run. The sampler only
+# takes circuits whose noiseless syndromes are deterministic, which rules out the level 2 code; the noiseless syndromes
+# of the level 1 code are 0, so its flips are the outcomes themselves. When the circuit measures its
+# ancillas ('lookup' and 'reset' recoveries) the syndrome is the measured bits, ordered by measurement key, otherwise it
+# is the x frame of the syndrome qubits at the end of the circuit, which is what measuring them there would give.
+
+MAGIC = b'CCSHOTS1'
+_ALIGNMENT = 64
+
+
+class ShotRecordWriter:
+    def __init__(self, path: str, syndrome_bits: int, **metadata):
+        self.path = path
+        self.syndrome_bits = syndrome_bits
+        self.row_bytes = -(-(syndrome_bits + 1) // 8)
+        self.shots = 0
+        header = json.dumps({**metadata, 'syndrome_bits': syndrome_bits, 'row_bytes': self.row_bytes}).encode()
+        length = -(-(len(MAGIC) + 4 + len(header)) // _ALIGNMENT) * _ALIGNMENT - len(MAGIC) - 4
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC + np.uint32(length).tobytes() + header.ljust(length))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # append the rows of `shots` shots from packed bits: syndromes of shape (syndrome_bits, words) and flipped of
+    # shape (words,), shot j being bit j % 64 of word j // 64 (the layout of the Pauli-frame sampler)
+    def write_packed(self, syndromes: np.ndarray, flipped: np.ndarray, shots: int):
+        bits = np.unpackbits(np.vstack([syndromes, flipped]).view(np.uint8), axis=1, bitorder='little')[:, :shots]
+        self.file.write(np.packbits(bits.T, axis=1, bitorder='little').tobytes())
+        self.shots += shots
+
+
+# memory-mapped rows of a record file
+class ShotRecords:
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            magic, length = f.read(len(MAGIC)), np.frombuffer(f.read(4), dtype=np.uint32)[0]
+            if magic != MAGIC:
+                raise ValueError(f'{path} is not a shot record file')
+            self.header = json.loads(f.read(int(length)))
+        self.syndrome_bits = self.header['syndrome_bits']
+        self.row_bytes = self.header['row_bytes']
+        offset = len(MAGIC) + 4 + int(length)
+        rows = np.memmap(path, dtype=np.uint8, mode='r', offset=offset)
+        self.rows = rows[:len(rows) // self.row_bytes * self.row_bytes].reshape(-1, self.row_bytes)
+
+    def __len__(self):
+        return len(self.rows)
+
+    # syndromes of the shots start ... stop - 1, as booleans of shape (shots, syndrome_bits)
+    def syndromes(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        bits = np.unpackbits(self.rows[start:stop], axis=1, count=self.syndrome_bits, bitorder='little')
+        return bits.astype(bool)
+
+    # whether the logical qubit of the shots start ... stop - 1 was flipped
+    def logical(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        byte, bit = divmod(self.syndrome_bits, 8)
+        return (self.rows[start:stop, byte] >> bit) & 1 == 1
+
+    # (first shot, syndromes, logical) of consecutive chunks of shots
+    def chunks(self, size: int = 1 << 20) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        for start in range(0, len(self), size):
+            yield start, self.syndromes(start, start + size), self.logical(start, start + size)
+
+    def logical_error_rate(self, chunk_size: int = 1 << 22) -> float:
+        flipped = sum(int(np.count_nonzero(self.logical(start, start + chunk_size)))
+                      for start in range(0, len(self), chunk_size))
+        return flipped / max(1, len(self))
+
+
+# packed syndrome bits of a batch of shots run with the Pauli-frame sampler, one row per bit: the measured bits by
+# measurement key if the circuit measures its ancillas, otherwise the final x frames of syndrome_qubits
+def syndrome_words(sampler: PauliFrameSampler, x: np.ndarray, records: Dict[str, np.ndarray],
+                   syndrome_qubits: Sequence[cirq.Qid]) -> np.ndarray:
+    if records:
+        return np.vstack([records[key] for key in sorted(records)])
+    return x[[sampler.qubits.index(q) for q in syndrome_qubits]]
+
+
+# sample `shots` shots with the Pauli-frame sampler and write their syndromes and logical outcomes to a record file
+# syndrome_qubits: the ancillas whose final x frames are the syndrome of a circuit that doesn't measure them
+# metadata: written to the header (level, noise model, ...), along with p, seed and shots
+def record_shots(sampler: PauliFrameSampler, path: str, shots: int, p: Optional[float], seed: int,
+                 syndrome_qubits: Sequence[cirq.Qid], batch_size: int = 1 << 20, **metadata) -> ShotRecords:
+    if shots <= 0:
+        raise ValueError(f'a record file needs at least one shot, got {shots}')
+    rng = np.random.default_rng(seed)
+    writer = None
+    done = 0
+    try:
+        while done < shots:
+            batch = min(batch_size, shots - done)
+            records: Dict[str, np.ndarray] = {}
+            x, z = sampler._run(-(-batch // 64), rng, p, records=records)
+            syndromes = syndrome_words(sampler, x, records, syndrome_qubits)
+            if writer is None:
+                writer = ShotRecordWriter(path, len(syndromes), p=p, seed=seed, shots=shots, **metadata)
+            flipped = z[sampler.readout] if sampler.basis == 'X' else x[sampler.readout]
+            writer.write_packed(syndromes, flipped, batch)
+            done += batch
+    finally:
+        if writer is not None:
+            writer.close()
+    return ShotRecords(path)
@@ -0,0 +1,131 @@
+import functools
+from typing import Dict, Tuple, Union
+
+import attrs
+import sympy
+from qualtran import Bloq, BloqBuilder, Signature, SoquetT
+from qualtran.bloqs.basic_gates import CNOT, Hadamard, XGate, ZGate
+from qualtran.bloqs.mcmt import MultiTargetCNOT, MultiControlPauli
+
+from .bloqs import (
+    ClassicallyControlledPauli, ConcatenatedShor, MeasureQubit, ResetQubit, concatenated_shor_qubits, split_register,
+    join_register,
+)
+from .frame import line_qubits, lower_to_cirq
+
+
+# Resource counts of the concatenated code from the bloq hierarchy
+# Every bloq declares the bloqs it calls (build_call_graph), so Qualtran's call_graph and bloq_counts reach the gates
+# of any level without building a decomposition. gate_counts reduces the leaves to the gates of the lowered circuits: a
+# MultiTargetCNOT with n targets is n CNOTs, and a multi-controlled Pauli with k controls is k - 1 Toffoli-equivalents
+# (the And ladder Qualtran decomposes it into). The measured recoveries call one MeasureQubit per measured qubit, one
+# ResetQubit per reset and one ClassicallyControlledPauli per conditional correction of their circuit. A stage of level L runs the same stage on its 9 blocks and then the gates
+# of its top_calls on blocks of n = 9^(L-1) qubits, a + b n of each gate, so each of its counts solves
+#     C(L) = 9 C(L-1) + a + b 9^(L-1)
+# and level_resources gives the closed form of this recurrence for a symbolic level.
+#
+# The depth is an estimate that runs the stages one after another: the stage of level L - 1 on all blocks in parallel,
+# then the top gates, whose depth a + b n is measured on lowered circuits with blocks of n = 1 and n = 2 qubits. It is
+# an upper bound on the depth of the lowered circuit, where consecutive stages overlap.
+
+LEVEL = sympy.Symbol('L', positive=True, integer=True)
+
+# the bloqs call_graph stops at
+LEAF_BLOQS = (CNOT, Hadamard, XGate, ZGate, MultiTargetCNOT, MultiControlPauli, MeasureQubit, ResetQubit,
+              ClassicallyControlledPauli)
+GATES = ('CNOT', 'H', 'Pauli', 'Toffoli', 'measurements', 'resets', 'conditional Paulis')
+
+
+def is_leaf(bloq: Bloq) -> bool:
+    return isinstance(bloq, LEAF_BLOQS)
+
+
+# gate counts of a bloq (or of {bloq: number of calls}) from its call graph
+def gate_counts(bloq: Union[Bloq, Dict[Bloq, int]]) -> Dict[str, Union[int, sympy.Expr]]:
+    if isinstance(bloq, dict):
+        calls = bloq
+    elif is_leaf(bloq):
+        calls = {bloq: 1}
+    else:
+        calls = bloq.call_graph(keep=is_leaf)[1]
+
+    counts = dict.fromkeys(GATES, 0)
+    for leaf, n in calls.items():
+        if not is_leaf(leaf):
+            for gate, count in gate_counts(leaf).items():
+                counts[gate] += n * count
+        elif isinstance(leaf, CNOT):
+            counts['CNOT'] += n
+        elif isinstance(leaf, Hadamard):
+            counts['H'] += n
+        elif isinstance(leaf, (XGate, ZGate)):
+            counts['Pauli'] += n
+        elif isinstance(leaf, MultiTargetCNOT):
+            counts['CNOT'] += n * leaf.bitsize
+        elif isinstance(leaf, MultiControlPauli):
+            counts['Toffoli'] += n * (len(leaf.cvs) - 1)
+        elif isinstance(leaf, MeasureQubit):
+            counts['measurements'] += n
+        elif isinstance(leaf, ResetQubit):
+            counts['resets'] += n
+        else:
+            counts['conditional Paulis'] += n
+    return counts
+
+
+# the top gates of a stage alone: 9 blocks of n qubits and the last 8 ancillas
+@attrs.frozen
+class _StageTop(Bloq):
+    stage: Bloq
+    n: int
+    @property
+    def signature(self):
+        return Signature.build(logicals=9 * self.n, ancillas=8)
+
+    def build_composite_bloq(self, bb: BloqBuilder, logicals: SoquetT, ancillas: SoquetT):
+        logs, ancillas = self.stage.build_top(bb, split_register(bb, logicals, [self.n] * 9), ancillas, self.n)
+        return {'logicals': join_register(bb, logs), 'ancillas': ancillas}
+
+
+def lowered_depth(bloq: Bloq) -> int:
+    return len(lower_to_cirq(bloq, **line_qubits(bloq)))
+
+
+# depth of the level-1 stage and (a, b) of the depth a + b n of its top gates on blocks of n qubits
+@functools.lru_cache(maxsize=None)
+def stage_depths(stage: Bloq) -> Tuple[int, int, int]:
+    level1 = lowered_depth(attrs.evolve(stage, level=1))
+    top1, top2 = lowered_depth(_StageTop(stage, 1)), lowered_depth(_StageTop(stage, 2))
+    return level1, 2 * top1 - top2, top2 - top1
+
+
+# closed forms of the counts and the depth of a stage (of any level) as functions of LEVEL
+@functools.lru_cache(maxsize=None)
+def stage_resources(stage: Bloq) -> Dict[str, sympy.Expr]:
+    # C(L) = 9^(L-1) C(1) + a (9^(L-1) - 1) / 8 + b (L - 1) 9^(L-1)
+    n = sympy.Symbol('n')
+    level1 = gate_counts(attrs.evolve(stage, level=1))
+    top = gate_counts(stage.top_calls(n))
+    blocks = sympy.Integer(9) ** (LEVEL - 1)
+    counts = {}
+    for gate in GATES:
+        a, b = sympy.sympify(top[gate]).subs(n, 0), sympy.sympify(top[gate]).coeff(n)
+        counts[gate] = sympy.expand(blocks * level1[gate] + a * (blocks - 1) / 8 + b * (LEVEL - 1) * blocks)
+
+    # depth(L) = depth(1) + sum over l = 2 ... L of a + b 9^(l-1)
+    depth1, a, b = stage_depths(attrs.evolve(stage, level=2))
+    counts['depth'] = sympy.expand(depth1 + (LEVEL - 1) * a + b * (9 * blocks - 9) / 8)
+    return counts
+
+
+# CNOT, H, Pauli, Toffoli-equivalent and measurement counts, qubits and depth of ConcatenatedShor(level): closed forms
+# of LEVEL by default, or their values at the given level
+def level_resources(level=LEVEL, recovery: str = 'coherent') -> Dict[str, Union[int, sympy.Expr]]:
+    total = dict.fromkeys(GATES + ('depth',), 0)
+    for stage in ConcatenatedShor(2, recovery).stages():
+        for name, count in stage_resources(stage).items():
+            total[name] += count
+    total['qubits'] = sum(concatenated_shor_qubits(LEVEL))
+    if isinstance(level, int):
+        return {name: int(count.subs(LEVEL, level)) for name, count in total.items()}
+    return {name: sympy.expand(count.subs(LEVEL, level)) for name, count in total.items()}
@@ -0,0 +1,86 @@
+from typing import Dict, Hashable, Optional
+
+import cirq
+from qualtran.bloqs.mcmt import MultiTargetCNOT, MultiControlPauli
+
+
+# Depth-minimizing scheduling of lowered circuits
+# The syndrome checks run one after another in the lowered circuits, although the CNOTs of different checks commute
+# whenever they share only target qubits (or only control qubits). schedule_circuit places every operation, in circuit
+# order, into the earliest moment that is free on its qubits and comes after every earlier operation it does not commute
+# with. Two operations commute when on each shared qubit both act in the same basis: 'Z' for controls and Z-type gates,
+# 'X' for CNOT targets and X gates. Hadamards, noise channels and measurements commute with nothing, so the noise of the
+# 'after encoding' model stays where it is, and corrections stay after the measurements they are conditioned on.
+
+
+# resource (qubit or measurement key) -> basis the operation acts in on it ('Z', 'X' or 'read' for a classical control),
+# None where it commutes with nothing
+def operation_roles(op: cirq.Operation) -> Dict[Hashable, Optional[str]]:
+    if isinstance(op, cirq.ClassicallyControlledOperation):
+        roles = operation_roles(op.without_classical_controls())
+        roles.update(dict.fromkeys(cirq.control_keys(op), 'read'))
+        return roles
+
+    roles = dict.fromkeys(op.qubits)
+    gate = op.gate
+    if cirq.is_measurement(op):
+        roles.update(dict.fromkeys(cirq.measurement_key_objs(op)))
+    elif isinstance(gate, MultiTargetCNOT) or (isinstance(gate, cirq.CXPowGate) and gate.exponent == 1):
+        roles.update(dict.fromkeys(op.qubits, 'X'))
+        roles[op.qubits[0]] = 'Z'
+    elif isinstance(gate, MultiControlPauli) and gate.target_gate in (cirq.X, cirq.Z):
+        roles.update(dict.fromkeys(op.qubits, 'Z'))
+        roles[op.qubits[-1]] = 'X' if gate.target_gate == cirq.X else 'Z'
+    elif isinstance(gate, cirq.CZPowGate) and gate.exponent == 1:
+        roles.update(dict.fromkeys(op.qubits, 'Z'))
+    elif isinstance(gate, (cirq.XPowGate, cirq.ZPowGate)) and gate.exponent == 1 and gate.global_shift == 0:
+        roles[op.qubits[0]] = 'X' if isinstance(gate, cirq.XPowGate) else 'Z'
+    return roles
+
+
+def schedule_circuit(circuit: cirq.AbstractCircuit) -> cirq.Circuit:
+    ops = list(circuit.all_operations())
+
+    # on every resource the operations form runs of the same role, and an operation has to wait for the previous run
+    # (the operations it does not commute with)
+    successors = [[] for _ in ops]
+    waiting = [0] * len(ops)
+    runs = {}   # resource -> (role, operations of the current run, operations of the previous run)
+    for i, op in enumerate(ops):
+        for resource, role in operation_roles(op).items():
+            run_role, run, previous = runs.get(resource, (None, [], []))
+            if role is None or role != run_role:
+                runs[resource] = (role, [i], run)
+                previous = run
+            else:
+                run.append(i)
+            for j in previous:
+                successors[j].append(i)
+                waiting[i] += 1
+
+    # priority: the number of moments still needed after the operation (its longest path of dependent operations)
+    remaining = [1] * len(ops)
+    for i in reversed(range(len(ops))):
+        for j in successors[i]:
+            remaining[i] = max(remaining[i], remaining[j] + 1)
+
+    # fill every moment with the ready operations on free qubits, the ones on the longest paths first
+    moments = []
+    ready = [i for i in range(len(ops)) if waiting[i] == 0]
+    while ready:
+        ready.sort(key=lambda i: (-remaining[i], i))
+        moment, used, later = [], set(), []
+        for i in ready:
+            if used.isdisjoint(ops[i].qubits):
+                moment.append(i)
+                used.update(ops[i].qubits)
+            else:
+                later.append(i)
+        for i in moment:
+            for j in successors[i]:
+                waiting[j] -= 1
+                if waiting[j] == 0:
+                    later.append(j)
+        moments.append(cirq.Moment(ops[i] for i in moment))
+        ready = later
+    return cirq.Circuit(moments)
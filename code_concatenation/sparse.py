@@ -0,0 +1,267 @@
+import collections
+import hashlib
+import os
+import pickle
+import tempfile
+import weakref
+from typing import Dict, Optional, Sequence, Tuple
+
+import cirq
+import numpy as np
+
+from .frame import sample_bernoulli_positions
+from .noise import SymbolicDepolarize
+
+
+# Sparse fault sampling
+# A noisy circuit run on cirq's simulator rolls the dice of every depolarizing channel on every shot, although at low
+# error rates most shots have no fault at all. SparseNoise takes the channels out of the circuit and samples the faults
+# of a whole batch of shots up front, from the gaps between the faulty (location, shot) pairs: a fault-free shot does
+# not need to be simulated, and a shot with faults only needs the noiseless circuit with its sampled Paulis inserted.
+# Shots with the same faults share one circuit, which is run once with that many repetitions.
+
+NOISE_GATES = (cirq.DepolarizingChannel, SymbolicDepolarize)
+FAULT_PAULIS = {1: cirq.X, 2: cirq.Z, 3: cirq.Y}
+
+# faults of one shot: sorted (location, Pauli) pairs, Paulis numbered as in FAULT_PAULIS
+FaultConfiguration = Tuple[Tuple[int, int], ...]
+
+
+class SparseNoise:
+    # circuit: lowered circuit (built with PHYSICAL_ERROR or with numbers) where every depolarizing channel is a noise
+    # location
+    def __init__(self, circuit: cirq.AbstractCircuit):
+        self.moments = []       # the moments of the circuit without their channels
+        self.locations = []     # (moment, qubit) of every channel
+        self.probabilities = []
+        for i, moment in enumerate(circuit):
+            kept = []
+            for op in moment:
+                if isinstance(op.gate, NOISE_GATES):
+                    self.locations.append((i, op.qubits[0]))
+                    self.probabilities.append(op.gate.p)
+                else:
+                    kept.append(op)
+            self.moments.append(cirq.Moment(kept))
+
+    @property
+    def noiseless_circuit(self) -> cirq.Circuit:
+        return cirq.Circuit(self.moments)
+
+    # digest of the noiseless circuit and its noise locations, the key of the outcomes saved for this circuit
+    def digest(self) -> str:
+        return hashlib.sha256(repr((self.moments, self.locations)).encode()).hexdigest()
+
+    # number of shots of every fault configuration that occurs in `shots` shots, the fault-free shots left out
+    # p overrides the probability of every location (and has to be given for a circuit built with PHYSICAL_ERROR)
+    def sample_faults(self, shots: int, rng: np.random.Generator,
+                      p: Optional[float] = None) -> Dict[FaultConfiguration, int]:
+        if p is None and any(cirq.is_parameterized(q) for q in self.probabilities):
+            raise ValueError('the circuit has symbolic noise, the error rate p has to be given')
+        by_probability = collections.defaultdict(list)
+        for location, location_p in enumerate(self.probabilities):
+            by_probability[float(location_p if p is None else p)].append(location)
+
+        shot, location = [], []
+        for location_p, group in by_probability.items():
+            # position = shot * (locations of the group) + index in the group
+            positions = sample_bernoulli_positions(rng, location_p, shots * len(group))
+            shot.append(positions // len(group))
+            location.append(np.asarray(group)[positions % len(group)])
+        shot, location = np.concatenate(shot), np.concatenate(location)
+        pauli = rng.integers(1, 4, size=len(shot))
+
+        order = np.lexsort((location, shot))
+        shot, location, pauli = shot[order], location[order], pauli[order]
+        starts = np.flatnonzero(np.r_[True, shot[1:] != shot[:-1]]) if len(shot) else []
+        configurations = collections.Counter()
+        for start, end in zip(starts, [*starts[1:], len(shot)]):
+            configurations[tuple(zip(location[start:end].tolist(), pauli[start:end].tolist()))] += 1
+        return dict(configurations)
+
+    # the noiseless circuit with the Paulis of a fault configuration where their channels were
+    def circuit_with_faults(self, faults: FaultConfiguration) -> cirq.Circuit:
+        moments = list(self.moments)
+        for location, pauli in faults:
+            i, qubit = self.locations[location]
+            moments[i] = moments[i].with_operation(FAULT_PAULIS[pauli](qubit))
+        return cirq.Circuit(moments)
+
+    # moment of the first fault of a configuration
+    def first_moment(self, faults: FaultConfiguration) -> int:
+        return min(self.locations[location][0] for location, _ in faults)
+
+
+# Noiseless prefix states
+# Until the moment of its first fault a shot runs the noiseless circuit, so PrefixStates simulates the noiseless moments
+# once and keeps the state before every moment: a shot whose first fault is in moment i starts from a copy of state i
+# and only simulates the moments from i on. In the 'after encoding' model that skips the encoder in every shot, in the
+# 'everywhere' model whatever comes before the first fault. The prefix stops at the first measurement, reset or
+# classically controlled gate, as a shot starting later would miss its outcome.
+# A state is kept the way cirq's simulator holds it, as state vectors of the groups of qubits that are not entangled
+# with each other (a cirq.SimulationProductState): a shot started from one big state vector would run every later gate
+# on all qubits. The vectors are written to a temporary .npy file and memory-mapped read-only, and a pickled
+# PrefixStates (as sent to the workers of run_sweep) only holds the path, so all processes share the pages of one
+# buffer. close() (or leaving a with block) removes the file; it is also removed when the PrefixStates that wrote it is
+# garbage collected.
+class PrefixStates:
+    def __init__(self, moments: Sequence[cirq.Moment], qubits: Sequence[cirq.Qid], dtype=np.complex64):
+        self.qubits = list(qubits)
+        self.dtype = dtype
+        end = next((i for i, moment in enumerate(moments) if any(_ends_prefix(op) for op in moment)), len(moments))
+        index = {q: i for i, q in enumerate(self.qubits)}
+
+        # factors[i]: (qubit indices, offset in the buffer) of the groups of state i
+        self.factors, vectors, offset = [], [], 0
+        state = self._product_state([((i,), np.array([1, 0], dtype=dtype)) for i in range(len(self.qubits))],
+                                    np.random.RandomState(0))
+        for i in range(end + 1):
+            if i > 0:
+                for op in moments[i - 1]:
+                    cirq.act_on(op, state)
+            self.factors.append([])
+            for group, vector in _factors(state, index):
+                self.factors[-1].append((group, offset))
+                vectors.append(vector)
+                offset += len(vector)
+
+        fd, self.path = tempfile.mkstemp(suffix='.npy', prefix='prefix-states-')
+        os.close(fd)
+        self._remove = weakref.finalize(self, os.remove, self.path)
+        try:
+            np.save(self.path, np.concatenate(vectors))
+            self.buffer = np.load(self.path, mmap_mode='r')
+        except BaseException:
+            self._remove()
+            raise
+
+    # number of moments the prefix covers (a shot can start before any of the moments 0 ... end)
+    @property
+    def end(self) -> int:
+        return len(self.factors) - 1
+
+    # a copy of the state before moment i, as the initial state of cirq.Simulator.simulate, measuring with prng
+    def state(self, i: int, prng: np.random.RandomState) -> cirq.SimulationProductState:
+        return self._product_state([(group, np.array(self.buffer[offset:offset + 2**len(group)]))
+                                    for group, offset in self.factors[i]], prng)
+
+    def _product_state(self, groups, prng: np.random.RandomState) -> cirq.SimulationProductState:
+        classical_data = cirq.ClassicalDataDictionaryStore()
+        states = {None: cirq.StateVectorSimulationState(qubits=(), prng=prng, classical_data=classical_data,
+                                                         dtype=self.dtype)}
+        for group, vector in groups:
+            qubits = [self.qubits[j] for j in group]
+            state = cirq.StateVectorSimulationState(qubits=qubits, prng=prng, classical_data=classical_data,
+                                                    initial_state=vector, dtype=self.dtype)
+            states.update(dict.fromkeys(qubits, state))
+        return cirq.SimulationProductState(states, self.qubits, split_untangled_states=True,
+                                           classical_data=classical_data)
+
+    # drop the memory map, and remove the file if this PrefixStates wrote it (not in the workers that unpickled it)
+    def close(self):
+        self.buffer = None
+        remove = getattr(self, '_remove', None)
+        if remove is not None:
+            remove()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getstate__(self):
+        return {'qubits': self.qubits, 'dtype': self.dtype, 'factors': self.factors, 'path': self.path}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.buffer = np.load(self.path, mmap_mode='r')
+
+
+# the groups of qubits of a product state, as (qubit indices, state vector) pairs
+def _factors(state: cirq.SimulationProductState, index: Dict[cirq.Qid, int]):
+    groups = {id(group): group for q, group in state.items() if q is not None}
+    return [(tuple(index[q] for q in group.qubits), group.target_tensor.reshape(-1).copy())
+            for group in groups.values()]
+
+
+def _ends_prefix(op: cirq.Operation) -> bool:
+    return (isinstance(op, cirq.ClassicallyControlledOperation) or cirq.is_measurement(op)
+            or isinstance(op.gate, cirq.ResetChannel))
+
+
+# Outcome cache
+# The outcome of a fault configuration doesn't depend on the error rate, and for the level 1 circuits it is
+# deterministic: Pauli faults in a Clifford circuit whose noiseless run always decodes correctly give deterministic
+# syndromes, and so a deterministic readout. The same low-weight configurations (a single X on data qubit 4, ...) come
+# back in thousands of shots and at every error rate of a sweep, so OutcomeCache keeps the outcome of the most recently
+# used max_size configurations and only the configurations it has never seen are simulated. The outcomes can be saved
+# to a file, keyed on the digest of the circuit, so that later sweeps of the same circuit start warm.
+class OutcomeCache:
+    def __init__(self, max_size: int = 100_000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._outcomes = collections.OrderedDict()   # fault configuration -> failed, least recently used first
+        self._new = None   # outcomes added since the last take_updates(), once it was called
+
+    def __len__(self):
+        return len(self._outcomes)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / max(1, self.hits + self.misses)
+
+    # whether the configuration failed, or None when it isn't cached
+    def get(self, faults: FaultConfiguration) -> Optional[bool]:
+        failed = self._outcomes.get(faults)
+        if failed is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._outcomes.move_to_end(faults)
+        return failed
+
+    def put(self, faults: FaultConfiguration, failed: bool):
+        if self._new is not None:
+            self._new[faults] = failed
+        self._add(faults, failed)
+
+    def _add(self, faults: FaultConfiguration, failed: bool):
+        self._outcomes[faults] = failed
+        self._outcomes.move_to_end(faults)
+        while len(self._outcomes) > self.max_size:
+            self._outcomes.popitem(last=False)
+
+    # the outcomes added and the hits and misses since the last call, for a worker process to send to the cache of the
+    # main process (the first call only starts recording the outcomes)
+    def take_updates(self) -> Tuple[Dict[FaultConfiguration, bool], int, int]:
+        updates = (self._new or {}, self.hits, self.misses)
+        self._new, self.hits, self.misses = {}, 0, 0
+        return updates
+
+    def merge(self, updates: Tuple[Dict[FaultConfiguration, bool], int, int]):
+        outcomes, hits, misses = updates
+        for faults, failed in outcomes.items():
+            self._add(faults, failed)
+        self.hits += hits
+        self.misses += misses
+
+    def save(self, path: str, digest: str):
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump({'digest': digest, 'outcomes': list(self._outcomes.items())}, f)
+        os.replace(tmp, path)
+
+    # add the outcomes saved for the circuit with this digest, and return how many there were
+    def load(self, path: str, digest: str) -> int:
+        try:
+            with open(path, 'rb') as f:
+                saved = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return 0
+        if saved.get('digest') != digest:
+            return 0
+        for faults, failed in saved['outcomes']:
+            self._add(faults, failed)
+        return len(saved['outcomes'])
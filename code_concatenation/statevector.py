@@ -0,0 +1,214 @@
+from typing import Dict, List, Optional
+
+import cirq
+import numpy as np
+from qualtran.bloqs.mcmt import MultiTargetCNOT, MultiControlPauli
+
+from .frame import PauliFrameSampler
+from .sparse import SparseNoise
+
+
+# Batched state-vector simulation
+# The lowered circuits only use H, X, Z, CNOT, MultiTargetCNOT and MultiControlPauli (plus measurements, resets and
+# the classically controlled Paulis of the measured recoveries), whose amplitudes are real. Instead of one
+# cirq.Simulator call per shot, StateVectorSampler keeps a batch of shots as one real array of shape
+# (2, 2, ..., 2, shots), one axis per qubit and the shots last, and applies every gate to all of them at once with NumPy slicing: X swaps
+# the two halves of its axis, Z negates one half, H mixes them, and the controlled gates do the same on the slice where
+# their controls have their control values. A measurement draws one outcome per shot and projects each shot onto it.
+# With the shots as the last axis, the innermost loop of every NumPy operation runs over the whole batch, whichever
+# qubit the gate acts on.
+#
+# The faults are sampled up front like in the sparse cirq sampler (SparseNoise): the fault-free shots are counted as
+# successes, every faulty shot is one row of the batch, and the Paulis of a moment are applied to the rows that have
+# them by indexing the batch. A sweep point is then one vectorized pass over the circuit per batch of faulty shots.
+# The state has 2^n amplitudes per shot, so this is for the level 1 code.
+
+class StateVectorSampler:
+    # circuit: lowered circuit (built with PHYSICAL_ERROR or with numbers) where every depolarizing channel is a noise
+    # location, readout: the qubit holding the decoded logical qubit, basis: the basis ('X' or 'Z') it is read out in
+    # batch_size: rows per batch (default: 8 MB of amplitudes, larger batches no longer fit the cache and are slower)
+    def __init__(self, circuit: cirq.AbstractCircuit, readout: cirq.Qid = cirq.LineQubit(0), basis: str = 'X',
+                 batch_size: Optional[int] = None, dtype=np.float32):
+        self.noise = SparseNoise(circuit)
+        self.qubits = sorted(circuit.all_qubits())
+        self.readout = self.qubits.index(readout)
+        self.basis = basis
+        self.dtype = dtype
+        self.batch_size = batch_size or max(1, (1 << 21) // 2**len(self.qubits))
+        index = {q: i for i, q in enumerate(self.qubits)}
+        self.location_moments = np.array([moment for moment, _ in self.noise.locations], dtype=np.int64)
+        self.location_qubits = np.array([index[q] for _, q in self.noise.locations], dtype=np.int64)
+
+        # the steps of every moment, on qubit indices
+        self.moments = []
+        for moment in self.noise.moments:
+            steps = []
+            for op in moment:
+                gate = op.gate
+                qs = [index[q] for q in op.qubits]
+                if isinstance(op, cirq.ClassicallyControlledOperation):
+                    pauli = op.without_classical_controls().gate
+                    steps.append(('measured lookup', PauliFrameSampler._lookup_condition(op), qs[0], pauli == cirq.X))
+                elif isinstance(gate, cirq.MeasurementGate):
+                    steps.append(('measure', gate.key, qs))
+                elif isinstance(gate, cirq.ResetChannel):
+                    steps.append(('reset', qs[0]))
+                elif isinstance(gate, cirq.HPowGate) and gate.exponent == 1:
+                    steps.append(('h', qs[0]))
+                elif isinstance(gate, (cirq.CXPowGate, MultiTargetCNOT)) and getattr(gate, 'exponent', 1) == 1:
+                    steps.append(('lookup', (qs[0],), (1,), qs[1:], True))
+                elif isinstance(gate, MultiControlPauli) and gate.target_gate in (cirq.X, cirq.Z):
+                    steps.append(('lookup', tuple(qs[:-1]), tuple(gate.cvs), qs[-1:], gate.target_gate == cirq.X))
+                elif isinstance(gate, (cirq.XPowGate, cirq.ZPowGate)) and gate.exponent == 1:
+                    steps.append(('lookup', (), (), qs, isinstance(gate, cirq.XPowGate)))
+                elif isinstance(gate, cirq.IdentityGate):
+                    continue
+                else:
+                    raise ValueError(f'{op} is not supported by the state-vector sampler')
+            self.moments.append(steps)
+        self.measures = any(step[0] in ('measure', 'reset') for steps in self.moments for step in steps)
+
+    # number of shots (out of `shots`) where the decoded logical qubit is flipped
+    # p overrides the probability of every noise location (and has to be given for a circuit built with PHYSICAL_ERROR)
+    # Without mid-circuit measurements the shots of one fault configuration end in the same state, so it is simulated
+    # once and its flips are drawn from the probability of the flipped readout. Otherwise every shot is one row.
+    def sample(self, shots: int, p: Optional[float] = None, seed=None) -> int:
+        rng = np.random.default_rng(seed)
+        configurations = self.noise.sample_faults(shots, rng, p)
+        if self.measures:
+            rows = [faults for faults, count in configurations.items() for _ in range(count)]
+            counts = np.ones(len(rows), dtype=np.int64)
+        else:
+            rows = list(configurations)
+            counts = np.array(list(configurations.values()), dtype=np.int64)
+        failures = 0
+        for start in range(0, len(rows), self.batch_size):
+            flipped = self._run(rows[start:start + self.batch_size], rng)
+            failures += int(rng.binomial(counts[start:start + self.batch_size], flipped).sum())
+        return failures
+
+    # probability of a flipped readout for every row of a batch of shots with the given faults
+    def _run(self, rows: List[tuple], rng: np.random.Generator) -> np.ndarray:
+        state = np.zeros((2,) * len(self.qubits) + (len(rows),), dtype=self.dtype)
+        state[(0,) * len(self.qubits)] = 1
+
+        # (row, location, Pauli) of every fault, sorted by moment
+        row = np.array([r for r, configuration in enumerate(rows) for _ in configuration], dtype=np.int64)
+        location, pauli = np.array([fault for configuration in rows for fault in configuration], dtype=np.int64).T
+        moment = self.location_moments[location]
+        order = np.argsort(moment, kind='stable')
+        row, location, pauli, moment = row[order], location[order], pauli[order], moment[order]
+        bounds = np.searchsorted(moment, np.arange(len(self.moments) + 1))
+
+        records: Dict[str, np.ndarray] = {}
+        for i, steps in enumerate(self.moments):
+            for step in steps:
+                self._apply(state, step, records, rng)
+            if bounds[i] < bounds[i + 1]:
+                faults = slice(bounds[i], bounds[i + 1])
+                qubit = self.location_qubits[location[faults]]
+                for q in np.unique(qubit):
+                    for part, is_x in [(1, True), (2, False)]:
+                        fire = np.zeros(len(rows), dtype=bool)
+                        fire[row[faults][(qubit == q) & ((pauli[faults] & part) != 0)]] = True
+                        _pauli_on_rows(state, fire, q, is_x)
+
+        if self.basis == 'X':
+            _hadamard(state, self.readout)
+        p0, p1 = _probabilities(state, self.readout)
+        return np.clip(p1 / (p0 + p1), 0, 1)
+
+    def _apply(self, state: np.ndarray, step, records: Dict[str, np.ndarray], rng: np.random.Generator):
+        kind = step[0]
+        if kind == 'h':
+            _hadamard(state, step[1])
+        elif kind == 'lookup':
+            # Paulis on the targets of the slice where the controls have their control values
+            _, controls, cvs, targets, is_x = step
+            index = [slice(None)] * state.ndim
+            for c, cv in zip(controls, cvs):
+                index[c] = cv
+            view = state[tuple(index)]
+            for t in targets:
+                axis = t - sum(c < t for c in controls)
+                if is_x:
+                    _swap_halves(view, axis)
+                else:
+                    _half(view, axis, 1)[...] *= -1
+        elif kind == 'measure':
+            # the measured bits as an integer, the first qubit as the most significant bit (like cirq)
+            _, key, qs = step
+            value = np.zeros(state.shape[-1], dtype=np.int64)
+            for q in qs:
+                value = 2 * value + _measure(state, q, rng)
+            records[key] = value
+        elif kind == 'reset':
+            q = step[1]
+            _pauli_on_rows(state, _measure(state, q, rng), q, True)
+        else:
+            _, condition, target, is_x = step
+            fire = np.ones(state.shape[-1], dtype=bool)
+            for key, value in condition:
+                fire &= records[key] == value
+            _pauli_on_rows(state, fire, target, is_x)
+
+
+# the half of the amplitudes where the qubit of an axis is 0 or 1 (a view)
+def _half(state: np.ndarray, axis: int, bit: int) -> np.ndarray:
+    index = [slice(None)] * state.ndim
+    index[axis] = bit
+    return state[tuple(index)]
+
+
+def _swap_halves(state: np.ndarray, axis: int):
+    zero, one = _half(state, axis, 0), _half(state, axis, 1)
+    saved = zero.copy()
+    zero[...] = one
+    one[...] = saved
+
+
+def _hadamard(state: np.ndarray, axis: int):
+    zero, one = _half(state, axis, 0), _half(state, axis, 1)
+    scale = state.dtype.type(np.sqrt(0.5))
+    difference = (zero - one) * scale
+    zero += one
+    zero *= scale
+    one[...] = difference
+
+
+# X or Z on one qubit of the rows of the batch where fire is set: a few rows are gathered by indexing, many are
+# masked in one pass over the batch
+def _pauli_on_rows(state: np.ndarray, fire: np.ndarray, q: int, is_x: bool):
+    rows = np.flatnonzero(fire)
+    if len(rows) == 0:
+        return
+    zero, one = _half(state, q, 0), _half(state, q, 1)
+    if 8 * len(rows) < len(fire):
+        if is_x:
+            saved = zero[..., rows]
+            zero[..., rows] = one[..., rows]
+            one[..., rows] = saved
+        else:
+            one[..., rows] *= -1
+    elif is_x:
+        saved = np.where(fire, one, zero)
+        one[...] = np.where(fire, zero, one)
+        zero[...] = saved
+    else:
+        one *= np.where(fire, -1, 1).astype(state.dtype)
+
+
+# unnormalized probabilities of qubit q being 0 and 1 in every row
+def _probabilities(state: np.ndarray, q: int):
+    shots = state.shape[-1]
+    return tuple(np.square(_half(state, q, bit), dtype=np.float64).reshape(-1, shots).sum(axis=0) for bit in (0, 1))
+
+
+# measure qubit q of every row and project the rows onto their outcomes
+def _measure(state: np.ndarray, q: int, rng: np.random.Generator) -> np.ndarray:
+    p0, p1 = _probabilities(state, q)
+    outcome = rng.random(state.shape[-1]) * (p0 + p1) < p1
+    _half(state, q, 0)[..., outcome] = 0
+    _half(state, q, 1)[..., ~outcome] = 0
+    state /= np.sqrt(np.where(outcome, p1, p0)).astype(state.dtype)
+    return outcome
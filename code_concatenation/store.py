@@ -0,0 +1,81 @@
+import sqlite3
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+# Append-only store of sweep results
+# run_adaptive_sweep records the failures of every batch (one row per error rate and batch round) in an SQLite file as
+# soon as the round is done. A sweep is identified by the columns of SWEEP_COLUMNS. Running the same sweep again reads
+# the recorded rounds instead of sampling them, so a crashed sweep resumes after its last recorded round and a
+# finished one can be extended with a smaller target width or more shots. Every round is sampled with a seed derived
+# from (seed, round), so the resumed results are the same as those of an uninterrupted run. Rows are never changed.
+
+# columns identifying a sweep: sampler, noise model, code level and circuit options, shots per batch and master seed
+SWEEP_COLUMNS = ('sampler', 'model', 'level', 'recovery', 'optimize', 'schedule', 'batch', 'seed')
+
+_SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS batches (
+    sampler TEXT, model TEXT, level INTEGER, recovery TEXT, optimize INTEGER, schedule INTEGER, batch INTEGER,
+    seed INTEGER, round INTEGER, p REAL, shots INTEGER, failures INTEGER,
+    PRIMARY KEY ({', '.join(SWEEP_COLUMNS)}, round, p)
+)
+'''
+
+
+class ResultsStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # error rate -> failures of the recorded batches of one round of a sweep
+    def load_round(self, sweep: Dict, batch_round: int) -> Dict[float, int]:
+        where = ' AND '.join(f'{column} = ?' for column in SWEEP_COLUMNS)
+        rows = self.connection.execute(f'SELECT p, failures FROM batches WHERE {where} AND round = ?',
+                                       [*(sweep[column] for column in SWEEP_COLUMNS), batch_round])
+        return dict(rows)
+
+    # record the failures of one round (one batch of shots at every given error rate) in one transaction
+    def record_round(self, sweep: Dict, batch_round: int, error_rates: Sequence[float], failures: Sequence[int]):
+        key = [sweep[column] for column in SWEEP_COLUMNS]
+        with self.connection:
+            self.connection.executemany(
+                f'INSERT OR IGNORE INTO batches VALUES ({", ".join("?" * (len(SWEEP_COLUMNS) + 4))})',
+                [(*key, batch_round, float(p), sweep['batch'], int(f)) for p, f in zip(error_rates, failures)])
+
+    # (batch, seed) of every recorded sweep matching the given columns
+    def sweeps(self, **where) -> List[Tuple[int, int]]:
+        condition = _condition(where)
+        rows = self.connection.execute(
+            f'SELECT DISTINCT batch, seed FROM batches WHERE {condition} ORDER BY batch, seed', list(where.values()))
+        return [tuple(row) for row in rows]
+
+    # error rates with their failures and shots summed over the recorded batches of the sweeps matching the given columns
+    # Leaving out batch and seed pools every sweep of the circuit; sweeps with the same seed share their first shots
+    # (see run_adaptive_sweep), so only sweeps with different seeds are independent samples.
+    def points(self, **where) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        condition = _condition(where)
+        rows = self.connection.execute(
+            f'SELECT p, SUM(failures), SUM(shots) FROM batches WHERE {condition} GROUP BY p ORDER BY p',
+            list(where.values())).fetchall()
+        p, failures, shots = np.array(rows, dtype=float).reshape(-1, 3).T
+        return p, failures.astype(np.int64), shots.astype(np.int64)
+
+
+# the WHERE condition selecting the given sweep columns
+def _condition(where: Dict) -> str:
+    unknown = set(where) - set(SWEEP_COLUMNS)
+    if unknown:
+        raise ValueError(f'unknown sweep columns {sorted(unknown)}, expected some of {SWEEP_COLUMNS}')
+    return ' AND '.join(f'{column} = ?' for column in where) or '1'
@@ -0,0 +1,277 @@
+import concurrent.futures
+import statistics
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cirq
+import numpy as np
+
+from .bloqs import (
+    SYNDROME_ANCILLAS, ShorCodeAll, ShorCodeAll_withError, concatenated_shor_qubits, concatenatedShorAll,
+    concatenatedShorAll_withError,
+)
+from .frame import PauliFrameSampler, line_qubits, lower_to_cirq
+from .mps import MPSSampler, concatenated_order
+from .noise import PHYSICAL_ERROR, depolarize
+from .optimize import optimize_circuit
+from .schedule import schedule_circuit
+from .sparse import FaultConfiguration, OutcomeCache, PrefixStates, SparseNoise
+from .store import ResultsStore
+
+
+# Readout: after decoding, the logical qubit (qubit 0) is back in |+>. Rotating it into the X basis and measuring it gives 0
+# when the error was corrected and 1 when it wasn't, so all n shots of one error rate are sampled with a single
+# simulator.run call instead of n simulate calls that each compare a 2^17 state vector.
+def with_logical_readout(circuit: cirq.AbstractCircuit, qubit: cirq.Qid = cirq.LineQubit(0)) -> cirq.Circuit:
+    return cirq.Circuit(circuit) + cirq.Circuit([cirq.H(qubit), cirq.measure(qubit, key='logical')])
+
+
+# number of the n shots in which the logical qubit is flipped
+# the error rate of a circuit built with PHYSICAL_ERROR is given through the resolver
+def count_logical_errors(simulator: cirq.Simulator, circuit: cirq.AbstractCircuit, n: int,
+                         resolver: cirq.ParamResolverOrSimilarType = None) -> int:
+    result = simulator.run(with_logical_readout(circuit), param_resolver=resolver, repetitions=n)
+    return int(np.count_nonzero(result.measurements['logical']))
+
+
+# Parallel sweeps
+# The points of a sweep are independent, so run_sweep splits them into (error rate, shot chunk) tasks for a process pool.
+# Every chunk gets its own seed spawned from the master seed, and the chunks only depend on the number of shots and
+# the chunk size, so the counts are the same for any number of workers.
+
+# sampler running the lowered circuit (built with PHYSICAL_ERROR) on cirq's simulator, with the same sample() as
+# PauliFrameSampler so that both can be used by run_sweep
+# sparse: sample the faults of all shots up front (SparseNoise) and only simulate the shots that have faults, with their
+# Paulis instead of the channels; the fault-free shots are counted as successes, as the noiseless level 1 circuits
+# always decode correctly. sparse=False runs every shot through the channels.
+# outcomes: an OutcomeCache (with sparse), every fault configuration is then simulated once and looked up afterwards
+# prefix: start the shots of a fault configuration (with sparse) from the cached noiseless state before its first fault
+# (PrefixStates), run the moments without measurements once and fork the shots from there
+class CirqSampler:
+    def __init__(self, circuit: cirq.AbstractCircuit, sparse: bool = True, outcomes: Optional[OutcomeCache] = None,
+                 prefix: bool = True):
+        self.circuit = circuit
+        self.noise = SparseNoise(circuit) if sparse else None
+        self.outcomes = outcomes if sparse else None
+        self.prefix = PrefixStates(self.noise.moments, sorted(circuit.all_qubits())) if sparse and prefix else None
+
+    # remove the file of the prefix states
+    def close(self):
+        if self.prefix is not None:
+            self.prefix.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def sample(self, shots: int, p: Optional[float] = None, seed=None) -> int:
+        if self.noise is None:
+            resolver = None if p is None else {PHYSICAL_ERROR: p}
+            return count_logical_errors(cirq.Simulator(seed=seed), self.circuit, shots, resolver)
+
+        rng = np.random.default_rng(seed)
+        prng = np.random.RandomState(rng.integers(2**32))
+        simulator = cirq.Simulator(seed=prng)
+        failures = 0
+        for faults, count in self.noise.sample_faults(shots, rng, p).items():
+            if self.outcomes is None:
+                failures += self._count_faulty(simulator, prng, faults, count)
+                continue
+            failed = self.outcomes.get(faults)
+            if failed is None:
+                failed = self._count_faulty(simulator, prng, faults, 1) > 0
+                self.outcomes.put(faults, failed)
+            failures += count * failed
+        return failures
+
+    # number of the n shots with these faults in which the logical qubit is flipped
+    def _count_faulty(self, simulator: cirq.Simulator, prng: np.random.RandomState, faults: FaultConfiguration,
+                      n: int) -> int:
+        if self.prefix is None:
+            return count_logical_errors(simulator, self.noise.circuit_with_faults(faults), n)
+        # the moments up to the end of the prefix have no measurements, so they are run once for all n shots
+        circuit = self.noise.circuit_with_faults(faults)
+        start = min(self.noise.first_moment(faults), self.prefix.end)
+        state = self.prefix.state(start, prng)
+        for op in circuit[start:self.prefix.end].all_operations():
+            cirq.act_on(op, state)
+        rest = with_logical_readout(circuit[self.prefix.end:])
+        if self.prefix.end == len(circuit):
+            # no measurement before the readout: sample all n readouts from the final state
+            for op in rest[:-1].all_operations():
+                cirq.act_on(op, state)
+            return int(np.count_nonzero(state.sample(sorted(rest[-1].qubits), repetitions=n, seed=prng)))
+        failures = 0
+        for _ in range(n):
+            shot = state.copy()
+            for op in rest.all_operations():
+                cirq.act_on(op, shot)
+            failures += shot.log_of_measurement_results['logical'][0]
+        return failures
+
+
+# the sampler of a worker process, set once by the pool initializer instead of being sent with every task
+_worker_sampler = None
+
+
+def _init_sweep_worker(sampler):
+    global _worker_sampler
+    _worker_sampler = sampler
+    outcomes = getattr(sampler, 'outcomes', None)
+    if outcomes is not None:
+        # the hits and misses of the main process stay there
+        outcomes.take_updates()
+
+
+# the failures, and the updates of the outcome cache of the sampler (if it has one) to merge into the main process
+def _sweep_task(p: float, shots: int, seed: int):
+    failures = _worker_sampler.sample(shots, p=p, seed=seed)
+    outcomes = getattr(_worker_sampler, 'outcomes', None)
+    return failures, outcomes.take_updates() if outcomes is not None else None
+
+
+# number of failures for every error rate, out of `shots` shots each
+# workers=None uses all cores, workers=1 runs the tasks in this process
+def run_sweep(sampler, error_rates: Sequence[float], shots: int, seed=0, workers: Optional[int] = None,
+              chunk_size: Optional[int] = None) -> np.ndarray:
+    chunk_size = chunk_size or shots
+    chunks = [min(chunk_size, shots - start) for start in range(0, shots, chunk_size)]
+    tasks = []
+    for j, (p, point_seed) in enumerate(zip(error_rates, np.random.SeedSequence(seed).spawn(len(error_rates)))):
+        for size, chunk_seed in zip(chunks, point_seed.spawn(len(chunks))):
+            tasks.append((j, float(p), size, int(chunk_seed.generate_state(1)[0])))
+
+    failures = np.zeros(len(error_rates), dtype=np.int64)
+    if workers == 1:
+        for j, p, size, task_seed in tasks:
+            failures[j] += sampler.sample(size, p=p, seed=task_seed)
+        return failures
+
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=_init_sweep_worker, initargs=(sampler,)) as pool:
+        futures = {pool.submit(_sweep_task, p, size, task_seed): j for j, p, size, task_seed in tasks}
+        for future in concurrent.futures.as_completed(futures):
+            task_failures, updates = future.result()
+            failures[futures[future]] += task_failures
+            if updates is not None:
+                sampler.outcomes.merge(updates)
+    return failures
+
+
+# Adaptive sampling
+# Instead of a fixed number of shots per point, run_adaptive_sweep keeps adding batches to the points whose confidence
+# interval is still wider than target_width times the estimated rate, until every point has converged or hit max_shots.
+
+# confidence intervals of a failure probability from failures out of shots (both may be arrays)
+def wilson_interval(failures, shots, confidence: float = 0.95):
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    rate = np.divide(failures, shots)
+    center = (rate + z**2 / (2 * shots)) / (1 + z**2 / shots)
+    half_width = z / (1 + z**2 / shots) * np.sqrt(rate * (1 - rate) / shots + z**2 / (4 * shots**2))
+    return center - half_width, center + half_width
+
+
+def clopper_pearson_interval(failures, shots, confidence: float = 0.95):
+    from scipy.stats import beta
+    failures, shots = np.asarray(failures), np.asarray(shots)
+    alpha = 1 - confidence
+    low = np.where(failures > 0, beta.ppf(alpha / 2, failures, shots - failures + 1), 0.0)
+    high = np.where(failures < shots, beta.ppf(1 - alpha / 2, failures + 1, shots - failures), 1.0)
+    return low, high
+
+
+CONFIDENCE_INTERVALS = {'wilson': wilson_interval, 'clopper-pearson': clopper_pearson_interval}
+
+
+# failures and shots for every error rate, sampled in batches of `batch` shots until converged
+# with a ResultsStore and the sweep columns (SWEEP_COLUMNS except batch and seed), every round is recorded in the store
+# and the rounds already recorded there are read instead of sampled
+def run_adaptive_sweep(sampler, error_rates: Sequence[float], batch: int, max_shots: int, target_width: float = 0.2,
+                       interval: str = 'wilson', seed: int = 0, workers: Optional[int] = None,
+                       chunk_size: Optional[int] = None, store: Optional[ResultsStore] = None,
+                       sweep: Optional[Dict] = None) -> Tuple[np.ndarray, np.ndarray]:
+    error_rates = np.asarray(error_rates)
+    failures = np.zeros(len(error_rates), dtype=np.int64)
+    shots = np.zeros(len(error_rates), dtype=np.int64)
+    active = np.ones(len(error_rates), dtype=bool)
+    sweep = dict(sweep or {}, batch=batch, seed=seed)
+    batch_round = 0
+    while active.any():
+        points = np.flatnonzero(active)
+        recorded = store.load_round(sweep, batch_round) if store else {}
+        if all(float(p) in recorded for p in error_rates[points]):
+            failures[points] += [recorded[float(p)] for p in error_rates[points]]
+        else:
+            # the seed of a round only depends on the master seed and the round
+            batch_failures = run_sweep(sampler, error_rates[points], batch, (seed, batch_round), workers, chunk_size)
+            if store:
+                store.record_round(sweep, batch_round, error_rates[points], batch_failures)
+            failures[points] += batch_failures
+        shots[points] += batch
+        low, high = CONFIDENCE_INTERVALS[interval](failures, shots)
+        converged = (failures > 0) & (high - low <= target_width * failures / shots)
+        active = ~converged & (shots < max_shots)
+        batch_round += 1
+    return failures, shots
+
+
+# Noisy circuits of the sweeps
+# 'after encoding': a depolarizing channel on every data qubit between encoding and syndrome measurement
+# 'everywhere': a depolarizing channel on every qubit after every moment of the lowered circuit
+NOISE_MODELS = ('after encoding', 'everywhere')
+
+# qubits of the registers of ShorCodeAll (level 1, with the 8 ancillas of the 'coherent' and 'lookup' recoveries) and
+# concatenatedShorAll (level 2)
+LEVEL_QUBITS = {
+    1: dict(logical=cirq.LineQubit.range(9), ancilla=cirq.LineQubit.range(9, 17)),
+    2: dict(logicals=cirq.LineQubit.range(81), ancillas=cirq.LineQubit.range(81, 161)),
+}
+
+# the syndrome ancillas of the circuit of noisy_circuit, which follow the 9**level data qubits: SYNDROME_ANCILLAS of
+# the recovery at level 1, 80 at level 2
+def syndrome_qubits(level: int, recovery: str = 'coherent') -> List[cirq.Qid]:
+    data, ancillas = concatenated_shor_qubits(level)
+    return cirq.LineQubit.range(data, data + (SYNDROME_ANCILLAS[recovery] if level == 1 else ancillas))
+
+
+# basis the decoded logical qubit (qubit 0) is read out in: ShorCodeAll prepares |+>, concatenatedShorAll leaves |0>
+READOUT_BASIS = {1: 'X', 2: 'Z'}
+
+
+# lowered circuit of the level 1 or level 2 code with the noise model, built with PHYSICAL_ERROR
+# optimize (optimize_circuit) and schedule (schedule_circuit) run before the noise is added, so that 'everywhere' also
+# gets fewer noise locations
+def noisy_circuit(level: int, model: str, recovery: str = 'coherent', optimize: bool = False,
+                  schedule: bool = False) -> cirq.Circuit:
+    if model == 'after encoding':
+        bloq = {1: ShorCodeAll_withError, 2: concatenatedShorAll_withError}[level](PHYSICAL_ERROR, recovery)
+    elif model == 'everywhere':
+        bloq = {1: ShorCodeAll, 2: concatenatedShorAll}[level](recovery)
+    else:
+        raise ValueError(f'unknown noise model {model!r}, expected one of {NOISE_MODELS}')
+
+    circuit = lower_to_cirq(bloq, **line_qubits(bloq))
+    if optimize:
+        circuit = optimize_circuit(circuit)
+    if schedule:
+        circuit = schedule_circuit(circuit)
+    if model == 'everywhere':
+        circuit = circuit.with_noise(depolarize(PHYSICAL_ERROR))
+    return circuit
+
+
+# raises a ValueError for the level 2 circuit, whose noiseless syndromes are random (see PauliFrameSampler)
+def frame_sampler(level: int, model: str, recovery: str = 'coherent', optimize: bool = False,
+                  schedule: bool = False) -> PauliFrameSampler:
+    circuit = noisy_circuit(level, model, recovery, optimize, schedule)
+    return PauliFrameSampler(circuit, cirq.LineQubit(0), READOUT_BASIS[level])
+
+
+# the sites of the chain follow the blocks of the code (concatenated_order); a cap of 256 keeps the level 2 circuit
+# exact, smaller caps truncate it (see the truncation errors of MPSSampler.sample_shots)
+def mps_sampler(level: int, model: str, recovery: str = 'coherent', optimize: bool = False, schedule: bool = False,
+                max_bond: int = 256, cutoff: float = 1e-12) -> MPSSampler:
+    circuit = noisy_circuit(level, model, recovery, optimize, schedule)
+    qubits = sorted(circuit.all_qubits())
+    order = concatenated_order(qubits[:9**level], qubits[9**level:])
+    return MPSSampler(circuit, cirq.LineQubit(0), READOUT_BASIS[level], order, max_bond, cutoff)
@@ -0,0 +1,106 @@
+import itertools
+import math
+from typing import Dict, Optional, Sequence, Tuple
+
+import attrs
+import numpy as np
+
+from .sweeps import CONFIDENCE_INTERVALS, run_sweep
+
+
+# Pseudo-threshold estimation
+# Concatenation pays off below the pseudo-threshold, the physical error rate where the logical error rate of the level 2
+# code crosses the one of the level 1 code. A fixed grid spends most of its shots far from the crossing, so
+# find_threshold samples both levels on a coarse grid of `points` log-spaced error rates, takes the first pair of
+# neighbouring points where level 2 goes from better to worse than level 1, and bisects that bracket at its geometric
+# mean. A midpoint gets batches of shots until the confidence intervals of the two rates are disjoint, which tells on
+# which side of the crossing it is, or until each level has max_shots there; a midpoint that stays undecided ends the
+# bisection, as the curves can't be told apart there with that budget.
+#
+# Near the crossing both rates are close to power laws in p, so log(rate) of each level is fitted with a line in log(p)
+# over the points of the coarse bracket (weighted by the inverse variance of the log rates), and the threshold is where
+# the two lines cross. Its confidence interval comes from a parametric bootstrap: the failures of every point are
+# redrawn from the binomial distribution of the measured rate, and the fit is repeated `resamples` times.
+#
+# The Pauli-frame sampler rejects the level 2 circuit of this tree, whose noiseless syndromes are random, so the
+# threshold command can't run until the level 2 encoder is fixed; find_threshold works on any two samplers.
+
+@attrs.frozen(eq=False)
+class ThresholdEstimate:
+    threshold: float
+    interval: Tuple[float, float]   # confidence interval of the threshold
+    error_rates: np.ndarray         # every sampled error rate, sorted
+    failures: np.ndarray            # failures[i, j] of the lower (i = 0) or higher (i = 1) level at error_rates[j]
+    shots: np.ndarray
+
+    @property
+    def rates(self) -> np.ndarray:
+        return self.failures / self.shots
+
+
+# samplers: the samplers of the lower and higher level (anything with sample(shots, p, seed), like run_sweep takes)
+# low, high: the range of the coarse grid, shots: shots of every level at every coarse point
+# batch, max_shots: shots per batch and per level at most at a bisection point
+# seed: the master seed; every round of sampling gets its own seed from it, as the rounds of run_adaptive_sweep
+def find_threshold(samplers: Sequence, low: float, high: float, points: int = 5, shots: int = 100_000,
+                   batch: int = 100_000, max_shots: int = 10_000_000, bisections: int = 8, interval: str = 'wilson',
+                   confidence: float = 0.95, resamples: int = 1000, seed: int = 0, workers: Optional[int] = None,
+                   chunk_size: Optional[int] = None) -> ThresholdEstimate:
+    counts: Dict[float, np.ndarray] = {}   # error rate -> [[failures, shots] of the lower level, ... higher level]
+    rounds = itertools.count()
+
+    def sample(error_rates, n):
+        sample_round = next(rounds)
+        for i, sampler in enumerate(samplers):
+            failures = run_sweep(sampler, error_rates, n, (seed, sample_round, i), workers, chunk_size)
+            for p, f in zip(error_rates, failures):
+                counts.setdefault(float(p), np.zeros((2, 2), dtype=np.int64))[i] += (f, n)
+
+    # 1 when the higher level is worse at p, -1 when it is better, 0 while the intervals overlap
+    def side(p) -> int:
+        failures, n = counts[p].T
+        lower, upper = CONFIDENCE_INTERVALS[interval](failures, n, confidence)
+        return 1 if lower[1] > upper[0] else -1 if upper[1] < lower[0] else 0
+
+    grid = np.geomspace(low, high, points)
+    sample(grid, shots)
+    difference = [np.subtract(*(counts[float(p)][::-1, 0] / shots)) for p in grid]
+    crossing = next((j for j in range(points - 1) if difference[j] <= 0 < difference[j + 1]), None)
+    if crossing is None:
+        raise ValueError(f'the logical error rates of the two levels do not cross between {low} and {high}')
+    a, b = float(grid[crossing]), float(grid[crossing + 1])
+
+    for _ in range(bisections):
+        middle = math.sqrt(a * b)
+        while True:
+            sample([middle], batch)
+            middle_side = side(middle)
+            if middle_side or counts[middle][:, 1].min() >= max_shots:
+                break
+        if middle_side == 0:
+            break
+        a, b = (middle, b) if middle_side < 0 else (a, middle)
+
+    error_rates = np.array(sorted(counts))
+    failures = np.array([counts[p][:, 0] for p in error_rates]).T
+    n = np.array([counts[p][:, 1] for p in error_rates]).T
+    bracket = (error_rates >= grid[crossing]) & (error_rates <= grid[crossing + 1])
+    threshold = _crossing(error_rates[bracket], failures[:, bracket], n[:, bracket])
+
+    rng = np.random.default_rng(seed)
+    redrawn = rng.binomial(n[:, bracket], failures[:, bracket] / n[:, bracket], size=(resamples, 2, bracket.sum()))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        thresholds = [_crossing(error_rates[bracket], f, n[:, bracket]) for f in redrawn]
+    ends = np.nanquantile(thresholds, [(1 - confidence) / 2, (1 + confidence) / 2])
+    return ThresholdEstimate(threshold, (float(ends[0]), float(ends[1])), error_rates, failures, n)
+
+
+# error rate where the weighted log-log lines of the two levels cross
+# a point without failures counts half a failure, so that its log rate is finite
+def _crossing(error_rates: np.ndarray, failures: np.ndarray, shots: np.ndarray) -> float:
+    lines = []
+    for f, n in zip(failures, shots):
+        rate = (f + 0.5) / (n + 1)
+        lines.append(np.polyfit(np.log(error_rates), np.log(rate), 1, w=np.sqrt(n * rate / (1 - rate))))
+    (slope_lower, intercept_lower), (slope_higher, intercept_higher) = lines
+    return float(np.exp((intercept_lower - intercept_higher) / (slope_higher - slope_lower)))
@@ -0,0 +1,56 @@
+import cirq
+import pytest
+
+from code_concatenation import (
+    CONCATENATED_RECOVERY_MODES, CVS, X_LOOKUP, Z_CORRECTIONS, Z_LOOKUP, ConcatenatedShor, ShorCodeAll_withError,
+    SparseNoise, concatenated_shor_qubits, concatenatedShorAll, count_logical_errors, line_qubits, lower_to_cirq,
+    noisy_circuit,
+)
+
+
+# failures of the level 1 circuit after encoding, noiseless and with every single Pauli on each data qubit
+def single_fault_failures(recovery: str):
+    noise = SparseNoise(noisy_circuit(1, 'after encoding', recovery))
+    assert sorted(q for _, q in noise.locations) == cirq.LineQubit.range(9)
+    simulator = cirq.Simulator(seed=0)
+    noiseless = count_logical_errors(simulator, noise.noiseless_circuit, 20)
+    faulty = {(location, pauli): count_logical_errors(simulator, noise.circuit_with_faults(((location, pauli),)), 5)
+              for location in range(len(noise.locations)) for pauli in (1, 2, 3)}
+    return noiseless, faulty
+
+
+@pytest.mark.parametrize('recovery', CONCATENATED_RECOVERY_MODES)
+def test_level_2_is_the_concatenated_shor_code(recovery):
+    level2 = ConcatenatedShor(2, recovery)
+    original = concatenatedShorAll(recovery)
+    assert lower_to_cirq(level2, **line_qubits(level2)) == lower_to_cirq(original, **line_qubits(original))
+
+
+def test_qubits_of_a_level():
+    assert [concatenated_shor_qubits(level) for level in (1, 2, 3)] == [(9, 8), (81, 80), (729, 728)]
+    assert sum(len(qubits) for qubits in line_qubits(ConcatenatedShor(3)).values()) == 729 + 728
+
+
+def test_reset_recovery():
+    bloq = ShorCodeAll_withError(0.01, 'reset')
+    assert len(lower_to_cirq(bloq, **line_qubits(bloq)).all_qubits()) == 10
+
+    # like the coherent recovery, the noiseless circuit reads out |+> and every single data qubit fault is corrected
+    for recovery in ('coherent', 'reset'):
+        noiseless, faulty = single_fault_failures(recovery)
+        assert noiseless == 0
+        assert len(faulty) == 27 and not any(faulty.values())
+
+
+def test_lookup_tables_follow_the_syndrome_patterns():
+    x_patterns = {int(''.join(map(str, CVS[i])), 2): i for i in range(9)}
+    z_patterns = {int(''.join(map(str, CVS[i])), 2): j for i, j in Z_CORRECTIONS}
+    for table, patterns, bits in [(X_LOOKUP, x_patterns, 6), (Z_LOOKUP, z_patterns, 2)]:
+        assert len(table) == 2**bits
+        assert table.tolist() == [patterns.get(syndrome, -1) for syndrome in range(2**bits)]
+
+
+def test_lookup_recovery_corrects_every_single_fault():
+    noiseless, faulty = single_fault_failures('lookup')
+    assert noiseless == 0
+    assert len(faulty) == 27 and not any(faulty.values())
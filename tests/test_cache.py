@@ -0,0 +1,52 @@
+import os
+
+import pytest
+from qualtran import LeftDangle, RightDangle
+
+from code_concatenation import DECOMPOSITIONS, ShorCodeAll, noisy_circuit, set_decomposition_cache_dir
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    DECOMPOSITIONS.clear()
+    set_decomposition_cache_dir(str(tmp_path))
+    yield tmp_path
+    set_decomposition_cache_dir(None)
+    DECOMPOSITIONS.clear()
+
+
+def test_warm_cache_lowers_to_the_same_circuit(cache_dir):
+    cold = noisy_circuit(1, 'after encoding', 'lookup')
+    assert DECOMPOSITIONS.misses > 0 and os.listdir(cache_dir)
+
+    DECOMPOSITIONS.clear()
+    warm = noisy_circuit(1, 'after encoding', 'lookup')
+    assert DECOMPOSITIONS.misses == 0 and DECOMPOSITIONS.hits > 0
+    assert warm == cold
+
+    set_decomposition_cache_dir(None)
+    DECOMPOSITIONS.clear()
+    assert noisy_circuit(1, 'after encoding', 'lookup') == cold
+
+
+def test_dangling_ends_keep_their_identity(cache_dir):
+    bloq = ShorCodeAll()
+    DECOMPOSITIONS.get(bloq)
+    loaded = DECOMPOSITIONS._load(DECOMPOSITIONS._path(bloq))
+    ends = {connection.left.binst for connection in loaded.connections} | {connection.right.binst
+                                                                         for connection in loaded.connections}
+    assert any(end is LeftDangle for end in ends) and any(end is RightDangle for end in ends)
+
+
+@pytest.mark.parametrize('stale', [b'cno_such_module\nThing\n.', b'ccode_concatenation.bloqs\nRenamedBloq\n.',
+                                   b'truncated'])
+def test_unreadable_pickles_are_rebuilt(cache_dir, stale):
+    bloq = ShorCodeAll()
+    path = DECOMPOSITIONS._path(bloq)
+    with open(path, 'wb') as f:
+        f.write(stale)
+    cbloq = DECOMPOSITIONS.get(bloq)
+    assert DECOMPOSITIONS.misses >= 1
+    assert cbloq.bloq_instances
+    DECOMPOSITIONS.clear()
+    assert DECOMPOSITIONS._load(path) is not None
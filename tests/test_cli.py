@@ -0,0 +1,72 @@
+import os
+
+import matplotlib
+import pytest
+
+from code_concatenation import DetectorErrorModel, ShotRecords
+from code_concatenation import cli
+from code_concatenation.cli import main
+
+matplotlib.use('Agg')
+
+
+def test_counts(capsys):
+    assert main(['counts', '--levels', '1']) == 0
+    assert 'level 1: 9 data qubits, 8 ancillas' in capsys.readouterr().out
+
+
+def test_resources(capsys):
+    assert main(['resources', '--levels', '1', '2']) == 0
+    out = capsys.readouterr().out
+    assert 'level L (coherent recovery):' in out and 'qubits 17' in out and 'qubits 161' in out
+
+
+def test_frame_sweep(capsys):
+    assert main(['sweep', '--sampler', 'frame', '--no-plot', '--points', '2', '--batch', '10000', '--workers', '1']) == 0
+    assert capsys.readouterr().out.count('logical error rate for physical error') == 2
+
+
+def test_level_2_sweep_is_rejected():
+    with pytest.raises(SystemExit, match="can't simulate the level 2 circuit"):
+        main(['sweep', '--level', '2', '--no-plot', '--points', '2'])
+
+
+def test_record(tmp_path, capsys):
+    path = str(tmp_path / 'level1.shots')
+    assert main(['record', '--shots', '1000', '--error', '0.05', '--output', path]) == 0
+    assert '1000 shots with 8 syndrome bits' in capsys.readouterr().out
+    assert len(ShotRecords(path)) == 1000
+
+
+def test_dem(tmp_path, capsys):
+    path = str(tmp_path / 'level1.dem')
+    assert main(['dem', '--recovery', 'reset', '--output', path]) == 0
+    assert 'on 8 detectors' in capsys.readouterr().out
+    assert DetectorErrorModel.load(path).metadata['recovery'] == 'reset'
+
+
+def test_sweep_arguments_are_checked_before_the_sampler_is_built(monkeypatch):
+    monkeypatch.setattr(cli, 'make_sampler', lambda args: pytest.fail('the sampler was built'))
+    with pytest.raises(SystemExit, match='need the Pauli-frame sampler'):
+        main(['sweep', '--sampler', 'cirq', '--method', 'polynomial', '--no-plot'])
+    with pytest.raises(SystemExit, match='records the batches of the adaptive method'):
+        main(['sweep', '--method', 'fault-count', '--store', 'results.db', '--no-plot'])
+
+
+def test_cirq_sweep_removes_its_prefix_states(monkeypatch):
+    def interrupted(*args, **kwargs):
+        raise SystemExit('interrupted')
+
+    built = []
+    make_sampler = cli.make_sampler
+
+    def recording_make_sampler(args):
+        built.append(make_sampler(args))
+        return built[-1]
+
+    monkeypatch.setattr(cli, 'make_sampler', recording_make_sampler)
+    monkeypatch.setattr(cli, 'run_adaptive_sweep', interrupted)
+    with pytest.raises(SystemExit, match='interrupted'):
+        main(['sweep', '--sampler', 'cirq', '--points', '2', '--no-plot'])
+    path = built[0].prefix.path
+    assert path and not os.path.exists(path)
@@ -0,0 +1,48 @@
+import copy
+
+import numpy as np
+import pytest
+
+from code_concatenation import (
+    DetectorErrorModel, PauliFrameSampler, detector_error_model, frame_sampler, noisy_circuit, syndrome_qubits,
+)
+from code_concatenation.records import syndrome_words
+
+
+def test_save_and_load_round_trip(tmp_path):
+    sampler = frame_sampler(1, 'everywhere', 'lookup')
+    model = detector_error_model(sampler, syndrome_qubits(1, 'lookup'), 0.001, level=1, model='everywhere')
+    path = str(tmp_path / 'level1.dem')
+    model.save(path)
+    loaded = DetectorErrorModel.load(path)
+    assert loaded.detectors == model.detectors == 8
+    assert loaded.metadata == {'level': 1, 'model': 'everywhere', 'p': 0.001}
+    np.testing.assert_allclose(loaded.probabilities, model.probabilities, rtol=1e-11)
+    assert np.array_equal(loaded.symptoms, model.symptoms)
+
+
+@pytest.mark.parametrize('recovery', ['coherent', 'reset'])
+def test_sampled_shots_match_the_circuit_without_corrections(recovery):
+    # the rates of every detector and of the observable, from the model and from the linearized circuit
+    shots, p = 200_000, 0.02
+    sampler = frame_sampler(1, 'everywhere', recovery)
+    qubits = syndrome_qubits(1, recovery)
+    detectors, observable = detector_error_model(sampler, qubits, p).sample(shots, seed=0)
+
+    linear = copy.copy(sampler)
+    linear.program = [step for step in sampler.program if step[0] not in ('lookup', 'measured lookup')]
+    records = {}
+    x, z = linear._run(-(-shots // 64), np.random.default_rng(1), p, records=records)
+    words = np.vstack([syndrome_words(linear, x, records, qubits), z[linear.readout]])
+    bits = np.unpackbits(words.view(np.uint8), axis=1, bitorder='little')[:, :shots]
+
+    expected = bits.mean(axis=1)
+    rates = np.append(detectors.mean(axis=0), observable.mean())
+    sigma = np.sqrt(expected * (1 - expected) / shots)
+    assert np.all(np.abs(rates - expected) < 5 * np.sqrt(2) * sigma + 1e-4)
+
+
+def test_needs_a_readout():
+    sampler = PauliFrameSampler(noisy_circuit(1, 'after encoding'), None, 'X')
+    with pytest.raises(ValueError, match='no readout'):
+        detector_error_model(sampler, syndrome_qubits(1), 0.01)
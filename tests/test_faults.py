@@ -0,0 +1,42 @@
+import itertools
+import math
+
+import cirq
+import numpy as np
+
+from code_concatenation import (
+    SparseNoise, count_logical_errors, enumerate_fault_configurations, frame_sampler, noisy_circuit,
+    sample_by_fault_count,
+)
+
+
+def test_error_polynomial_of_the_level_1_code():
+    sampler = frame_sampler(1, 'after encoding')
+    polynomial = enumerate_fault_configurations(sampler, max_weight=2)
+
+    # every weight 2 configuration on cirq's simulator
+    noise = SparseNoise(noisy_circuit(1, 'after encoding'))
+    assert len(noise.locations) == polynomial.locations == 9
+    simulator = cirq.Simulator(seed=0)
+    failing = sum(count_logical_errors(simulator, noise.circuit_with_faults(((a, pa), (b, pb))), 1)
+                  for a, b in itertools.combinations(range(len(noise.locations)), 2)
+                  for pa, pb in itertools.product((1, 2, 3), repeat=2))
+    assert polynomial.failing.tolist() == [0, 0, failing]
+
+    # sum_w A_w (p/3)^w (1-p)^(N-w) = A_2 / 9 p^2 + O(p^3)
+    np.testing.assert_allclose(polynomial.polynomial().coef, [0, 0, failing / 9])
+    p = np.array([1e-4, 1e-3, 1e-2])
+    np.testing.assert_allclose(polynomial(p), failing * (p / 3)**2 * (1 - p)**7)
+    # P(3 or more faults) <= C(9, 3) p^3
+    assert np.all(polynomial.tail_bound(p) <= math.comb(9, 3) * p**3)
+
+
+def test_fault_count_sampling_agrees_with_the_polynomial():
+    sampler = frame_sampler(1, 'after encoding')
+    polynomial = enumerate_fault_configurations(sampler, max_weight=2)
+    estimate = sample_by_fault_count(sampler, max_faults=2, shots=200_000, seed=0)
+    assert estimate.failures[1] == 0
+    # f_2 is the failing fraction of the weight 2 configurations
+    f2 = estimate.failures[2] / estimate.shots[2]
+    expected = polynomial.failing[2] / (9 * 9 * 8 / 2)
+    assert abs(f2 - expected) < 5 * np.sqrt(expected * (1 - expected) / estimate.shots[2])
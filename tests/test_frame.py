@@ -0,0 +1,54 @@
+import cirq
+import numpy as np
+import pytest
+from qualtran.bloqs.mcmt import MultiControlPauli
+
+from code_concatenation import (
+    PauliFrameSampler, SparseNoise, count_logical_errors, frame_sampler, noisy_circuit,
+)
+
+
+# the outcome of every sampled fault configuration on cirq's simulator
+def cirq_failures(noise: SparseNoise, locations, paulis):
+    simulator = cirq.Simulator(seed=0)
+    return [count_logical_errors(simulator, noise.circuit_with_faults(tuple(zip(ls.tolist(), ps.tolist()))), 1) == 1
+            for ls, ps in zip(locations, paulis)]
+
+
+@pytest.mark.parametrize('model, recovery, samples', [
+    ('after encoding', 'coherent', None), ('after encoding', 'lookup', None), ('after encoding', 'reset', None),
+    ('everywhere', 'coherent', 30), ('everywhere', 'reset', 30),
+])
+def test_single_and_double_faults_match_cirq(model, recovery, samples):
+    circuit = noisy_circuit(1, model, recovery)
+    sampler = frame_sampler(1, model, recovery)
+    noise = SparseNoise(circuit)
+    # both number the noise locations in circuit order
+    frame_qubits = np.concatenate([step[1] for step in sampler.program if step[0] == 'noise'])
+    assert [sampler.qubits[i] for i in frame_qubits] == [q for _, q in noise.locations]
+
+    rng = np.random.default_rng(1)
+    locations = np.repeat(np.arange(sampler.noise_locations), 3)[:, None]
+    paulis = np.tile([1, 2, 3], sampler.noise_locations)[:, None]
+    if samples is not None:
+        chosen = rng.choice(len(locations), samples, replace=False)
+        locations, paulis = locations[chosen], paulis[chosen]
+    pairs = np.array([rng.choice(sampler.noise_locations, 2, replace=False) for _ in range(20)])
+    for ls, ps in [(locations, paulis), (np.sort(pairs, axis=1), rng.integers(1, 4, size=(20, 2)))]:
+        assert sampler.failures_with_faults(ls, ps).tolist() == cirq_failures(noise, ls, ps)
+
+
+def test_noiseless_correction_is_the_reference():
+    # the noiseless control is |1>, so the noiseless run is corrected and an X on the control undoes that
+    control, target = cirq.LineQubit.range(2)
+    circuit = cirq.Circuit(cirq.X(control), cirq.depolarize(0.1)(control),
+                           MultiControlPauli(cvs=(1,), target_gate=cirq.X).on(control, target), cirq.X(target))
+    sampler = PauliFrameSampler(circuit, target, 'Z')
+    assert sampler.failures_with_faults(np.array([[0], [0], [0]]), np.array([[1], [2], [3]])).tolist() == [True, False, True]
+
+
+def test_random_noiseless_syndromes_are_rejected():
+    with pytest.raises(ValueError, match='random in the noiseless run'):
+        frame_sampler(2, 'after encoding')
+    with pytest.raises(ValueError, match='random in the noiseless run'):
+        PauliFrameSampler(cirq.Circuit(cirq.H(cirq.LineQubit(0))), cirq.LineQubit(0), 'Z')
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from code_concatenation import MemoryExperiment, frame_sampler
+
+
+@pytest.mark.parametrize('model, recovery', [('after encoding', 'coherent'), ('after encoding', 'lookup'),
+                                             ('everywhere', 'lookup')])
+def test_one_round_matches_the_single_pass_circuit(model, recovery):
+    # one round of the memory experiment is the circuit of the sweeps
+    shots, p = 200_000, 0.05
+    memory = MemoryExperiment(1, model, recovery).sample(shots, 1, p, seed=0)[0] / shots
+    single = frame_sampler(1, model, recovery).sample(shots, p, seed=1) / shots
+    sigma = np.sqrt(single * (1 - single) / shots)
+    assert abs(memory - single) < 5 * np.sqrt(2) * sigma
+
+
+def test_failures_grow_with_the_rounds():
+    failures = MemoryExperiment(1).sample(100_000, 5, 0.05, seed=0)
+    assert np.all(np.diff(failures) > 0)
+
+
+def test_level_2_is_rejected():
+    with pytest.raises(ValueError, match='random in the noiseless run'):
+        MemoryExperiment(2)
+
+
+def test_syndrome_history():
+    experiment = MemoryExperiment(1, 'everywhere', 'lookup')
+    shots, rounds = 1000, 4
+    history = experiment.syndromes(shots, rounds, 0.02, seed=5)
+    assert history.shape == (shots, rounds, 8)
+    # the detection events of run are the changes of the history
+    changes = np.diff(history, axis=1, prepend=False).any(axis=2)
+    detections = [detections for _, _, detections in experiment.run(shots, rounds, 0.02, seed=5)]
+    assert detections == changes.sum(axis=0).tolist()
+    assert not experiment.syndromes(100, 2, 0.0, seed=0).any()
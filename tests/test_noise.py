@@ -0,0 +1,30 @@
+import cirq
+
+from code_concatenation import (
+    PHYSICAL_ERROR, ShorCodeAll_withError, SymbolicDepolarize, count_logical_errors, depolarize, line_qubits,
+    lower_to_cirq, noisy_circuit,
+)
+
+
+def test_symbolic_depolarize_resolves_to_cirq_depolarize():
+    gate = depolarize(PHYSICAL_ERROR)
+    assert isinstance(gate, SymbolicDepolarize) and cirq.is_parameterized(gate)
+    assert cirq.parameter_names(gate) == {'p'}
+    resolved = cirq.resolve_parameters(gate, cirq.ParamResolver({PHYSICAL_ERROR: 0.01}))
+    assert resolved == cirq.depolarize(0.01) and not cirq.is_parameterized(resolved)
+    assert depolarize(0.01) == cirq.depolarize(0.01)
+
+
+def test_resolved_circuit_is_the_numeric_circuit():
+    symbolic = noisy_circuit(1, 'after encoding')
+    assert cirq.is_parameterized(symbolic)
+    resolved = cirq.resolve_parameters(symbolic, {PHYSICAL_ERROR: 0.05})
+    assert not cirq.is_parameterized(resolved)
+    bloq = ShorCodeAll_withError(0.05)
+    numeric = lower_to_cirq(bloq, **line_qubits(bloq))
+    assert resolved == numeric
+
+    # and a sweep point resolved on the fly samples the same shots
+    resolver = cirq.ParamResolver({PHYSICAL_ERROR: 0.05})
+    assert (count_logical_errors(cirq.Simulator(seed=7), symbolic, 200, resolver)
+            == count_logical_errors(cirq.Simulator(seed=7), numeric, 200))
@@ -0,0 +1,19 @@
+import cirq
+import numpy as np
+import pytest
+
+from code_concatenation import ShorCodeAll, line_qubits, lower_to_cirq, optimize_circuit
+
+
+@pytest.mark.parametrize('recovery', ['coherent', 'lookup'])
+def test_optimized_circuit_has_the_same_final_state(recovery):
+    bloq = ShorCodeAll(recovery)
+    circuit = lower_to_cirq(bloq, **line_qubits(bloq))
+    optimized = optimize_circuit(circuit)
+    assert len(list(optimized.all_operations())) < len(list(circuit.all_operations()))
+
+    # the same seed gives the same outcomes of the measured recovery
+    qubits = sorted(circuit.all_qubits())
+    states = [cirq.Simulator(seed=0).simulate(c, qubit_order=qubits).final_state_vector for c in (circuit, optimized)]
+    assert cirq.allclose_up_to_global_phase(*states, atol=1e-6)
+    assert np.isclose(np.linalg.norm(states[0]), 1, atol=1e-5)
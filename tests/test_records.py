@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from code_concatenation import ShotRecords, frame_sampler, record_shots, syndrome_qubits
+
+
+@pytest.mark.parametrize('recovery', ['coherent', 'lookup', 'reset'])
+def test_records_round_trip(tmp_path, recovery):
+    sampler = frame_sampler(1, 'everywhere', recovery)
+    path = str(tmp_path / 'level1.shots')
+    # batches that don't fill their last word
+    records = record_shots(sampler, path, 1000, 0.05, 3, syndrome_qubits(1, recovery), batch_size=300, level=1)
+    assert len(records) == 1000 and records.syndrome_bits == 8
+    assert records.header['level'] == 1 and records.header['p'] == 0.05 and records.header['shots'] == 1000
+
+    # the same shots as the sampler with the same seed, batch by batch
+    rng = np.random.default_rng(3)
+    for start in range(0, 1000, 300):
+        x, z = sampler._run(-(-min(300, 1000 - start) // 64), rng, 0.05, records={})
+        flipped = np.unpackbits(z[sampler.readout].view(np.uint8), bitorder='little')[:min(300, 1000 - start)]
+        assert records.logical(start, start + 300).tolist() == flipped.astype(bool).tolist()
+
+    reopened = ShotRecords(path)
+    assert np.array_equal(reopened.syndromes(), records.syndromes())
+    chunks = list(reopened.chunks(400))
+    assert [start for start, _, _ in chunks] == [0, 400, 800]
+    assert np.array_equal(np.concatenate([logical for _, _, logical in chunks]), reopened.logical())
+    assert reopened.logical_error_rate() == reopened.logical().mean()
+    # faults are rare at p = 0.05 but not that rare
+    assert 0 < reopened.syndromes().any(axis=1).mean() < 1
+
+
+def test_no_shots_is_rejected(tmp_path):
+    path = tmp_path / 'empty.shots'
+    with pytest.raises(ValueError, match='at least one shot'):
+        record_shots(frame_sampler(1, 'after encoding'), str(path), 0, 0.01, 0, syndrome_qubits(1))
+    assert not path.exists()
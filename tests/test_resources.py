@@ -0,0 +1,48 @@
+import cirq
+import pytest
+from qualtran.bloqs.mcmt import MultiControlPauli, MultiTargetCNOT
+
+from code_concatenation import (
+    GATES, ConcatenatedShor, ShorCodeAll, gate_counts, level_resources, line_qubits, lower_to_cirq,
+)
+
+
+# the counts of the lowered circuit of a bloq, in the categories of gate_counts
+def lowered_counts(bloq):
+    counts = dict.fromkeys(GATES, 0)
+    for op in lower_to_cirq(bloq, **line_qubits(bloq)).all_operations():
+        gate = op.gate
+        if isinstance(op, cirq.ClassicallyControlledOperation):
+            counts['conditional Paulis'] += 1
+        elif isinstance(gate, cirq.MeasurementGate):
+            counts['measurements'] += cirq.num_qubits(gate)
+        elif isinstance(gate, cirq.ResetChannel):
+            counts['resets'] += 1
+        elif isinstance(gate, cirq.CXPowGate):
+            counts['CNOT'] += 1
+        elif isinstance(gate, MultiTargetCNOT):
+            counts['CNOT'] += gate.bitsize
+        elif isinstance(gate, cirq.HPowGate):
+            counts['H'] += 1
+        elif isinstance(gate, (cirq.XPowGate, cirq.ZPowGate)):
+            counts['Pauli'] += 1
+        elif isinstance(gate, MultiControlPauli):
+            counts['Toffoli'] += len(gate.cvs) - 1
+        else:
+            raise AssertionError(f'unexpected operation {op}')
+    return counts
+
+
+@pytest.mark.parametrize('level', [1, 2])
+@pytest.mark.parametrize('recovery', ['coherent', 'lookup'])
+def test_closed_forms_match_the_lowered_circuit(level, recovery):
+    resources = level_resources(level, recovery)
+    bloq = ConcatenatedShor(level, recovery)
+    assert {gate: resources[gate] for gate in GATES} == lowered_counts(bloq)
+    assert resources['qubits'] == len(lower_to_cirq(bloq, **line_qubits(bloq)).all_qubits())
+
+
+def test_reset_recovery_counts_match_the_lowered_circuit():
+    counts = gate_counts(ShorCodeAll('reset'))
+    assert counts == lowered_counts(ShorCodeAll('reset'))
+    assert counts['resets'] == counts['measurements'] == 8 and counts['conditional Paulis'] == 12
@@ -0,0 +1,19 @@
+import cirq
+import pytest
+
+from code_concatenation import ShorCodeAll, line_qubits, lower_to_cirq, optimize_circuit, schedule_circuit
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_scheduled_circuit_is_shorter_with_the_same_final_state(optimize):
+    bloq = ShorCodeAll()
+    circuit = lower_to_cirq(bloq, **line_qubits(bloq))
+    if optimize:
+        circuit = optimize_circuit(circuit)
+    scheduled = schedule_circuit(circuit)
+    assert len(scheduled) < len(circuit)
+    assert sorted(map(str, scheduled.all_operations())) == sorted(map(str, circuit.all_operations()))
+
+    qubits = sorted(circuit.all_qubits())
+    states = [cirq.Simulator().simulate(c, qubit_order=qubits).final_state_vector for c in (circuit, scheduled)]
+    assert cirq.allclose_up_to_global_phase(*states, atol=1e-6)
@@ -0,0 +1,87 @@
+import os
+import pickle
+
+import cirq
+import numpy as np
+import pytest
+
+from code_concatenation import CirqSampler, OutcomeCache, PrefixStates, SparseNoise, noisy_circuit, run_sweep
+
+
+@pytest.mark.parametrize('model, recovery', [('after encoding', 'coherent'), ('after encoding', 'lookup')])
+def test_prefix_states_give_the_same_counts(model, recovery):
+    circuit = noisy_circuit(1, model, recovery)
+    with CirqSampler(circuit, prefix=True) as sampler:
+        with_prefix = [sampler.sample(300, p, seed=1) for p in (0.02, 0.05)]
+    without_prefix = [CirqSampler(circuit, prefix=False).sample(300, p, seed=1) for p in (0.02, 0.05)]
+    assert with_prefix == without_prefix
+
+
+def test_prefix_states_are_the_noiseless_states():
+    noise = SparseNoise(noisy_circuit(1, 'after encoding'))
+    qubits = sorted(noise.noiseless_circuit.all_qubits())
+    with PrefixStates(noise.moments, qubits) as prefix:
+        assert prefix.end == len(noise.moments)
+        for i in [0, 5, prefix.end]:
+            expected = cirq.final_state_vector(cirq.Circuit(noise.moments[:i]), qubit_order=qubits,
+                                               dtype=np.complex64)
+            state = prefix.state(i, np.random.RandomState(0))
+            np.testing.assert_allclose(state.create_merged_state().target_tensor.reshape(-1), expected, atol=1e-6)
+
+        # a pickled copy maps the same file and doesn't remove it
+        copy = pickle.loads(pickle.dumps(prefix))
+        np.testing.assert_array_equal(copy.buffer, prefix.buffer)
+        copy.close()
+        assert os.path.exists(prefix.path)
+    assert not os.path.exists(prefix.path)
+
+
+def test_outcome_cache_evicts_the_least_recently_used():
+    cache = OutcomeCache(max_size=2)
+    a, b, c = ((0, 1),), ((1, 2),), ((2, 3),)
+    cache.put(a, True)
+    cache.put(b, False)
+    assert cache.get(a) is True   # a is now the most recently used
+    cache.put(c, True)
+    assert len(cache) == 2
+    assert cache.get(b) is None and cache.get(a) is True and cache.get(c) is True
+    assert (cache.hits, cache.misses) == (3, 1)
+    assert cache.hit_rate == 0.75
+    assert OutcomeCache().hit_rate == 0
+
+
+def test_outcome_cache_save_and_load(tmp_path):
+    cache = OutcomeCache()
+    cache.put(((0, 1),), True)
+    cache.put(((0, 2), (4, 3)), False)
+    path = str(tmp_path / 'outcomes.pickle')
+    cache.save(path, 'digest')
+
+    loaded = OutcomeCache()
+    assert loaded.load(path, 'digest') == 2
+    assert loaded.get(((0, 1),)) is True and loaded.get(((0, 2), (4, 3))) is False
+    assert OutcomeCache().load(path, 'another circuit') == 0
+    assert OutcomeCache().load(str(tmp_path / 'missing.pickle'), 'digest') == 0
+    (tmp_path / 'corrupt.pickle').write_bytes(b'not a pickle')
+    assert OutcomeCache().load(str(tmp_path / 'corrupt.pickle'), 'digest') == 0
+
+
+def test_cached_outcomes_give_the_same_counts():
+    circuit = noisy_circuit(1, 'after encoding')
+    error_rates = [0.02, 0.05]
+    with CirqSampler(circuit, outcomes=OutcomeCache()) as cached, CirqSampler(circuit) as uncached:
+        with_cache = [cached.sample(300, p, seed=2) for p in error_rates]
+        assert with_cache == [uncached.sample(300, p, seed=2) for p in error_rates]
+        assert cached.outcomes.hits > 0
+
+
+def test_worker_outcomes_are_merged():
+    circuit = noisy_circuit(1, 'after encoding')
+    with CirqSampler(circuit, outcomes=OutcomeCache()) as sampler:
+        failures = run_sweep(sampler, [0.02, 0.05], 200, seed=3, workers=2, chunk_size=100)
+        outcomes = sampler.outcomes
+        # every configuration was a miss once in some worker, so the main process holds all of them
+        assert len(outcomes) > 0 and outcomes.misses >= len(outcomes)
+        assert outcomes.hits + outcomes.misses > 0
+    with CirqSampler(circuit) as sampler:
+        assert failures.tolist() == run_sweep(sampler, [0.02, 0.05], 200, seed=3, workers=1, chunk_size=100).tolist()
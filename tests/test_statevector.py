@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from code_concatenation import StateVectorSampler, frame_sampler, noisy_circuit
+
+
+@pytest.mark.parametrize('model, recovery', [('after encoding', 'coherent'), ('after encoding', 'reset'),
+                                             ('everywhere', 'lookup')])
+def test_fault_configurations_match_the_frame_sampler(model, recovery):
+    sampler = StateVectorSampler(noisy_circuit(1, model, recovery))
+    frame = frame_sampler(1, model, recovery)
+    rng = np.random.default_rng(0)
+    # every single fault of the first 40 locations and 100 random pairs
+    singles = [((location, pauli),) for location in range(min(40, frame.noise_locations)) for pauli in (1, 2, 3)]
+    pairs = [tuple(zip(sorted(rng.choice(frame.noise_locations, 2, replace=False).tolist()),
+                       rng.integers(1, 4, 2).tolist())) for _ in range(100)]
+    for rows in (singles, pairs):
+        flipped = sampler._run(rows, np.random.default_rng(1))
+        # the level 1 outcome of a fault configuration is deterministic
+        np.testing.assert_allclose(flipped, np.round(flipped), atol=1e-5)
+        locations = np.array([[location for location, _ in row] for row in rows])
+        paulis = np.array([[pauli for _, pauli in row] for row in rows])
+        assert (flipped > 0.5).tolist() == frame.failures_with_faults(locations, paulis).tolist()
+
+
+def test_rates_match_the_frame_sampler():
+    shots, p = 5_000, 0.1
+    rate = StateVectorSampler(noisy_circuit(1, 'after encoding')).sample(shots, p, seed=0) / shots
+    expected = frame_sampler(1, 'after encoding').sample(1_000_000, p, seed=1) / 1_000_000
+    assert abs(rate - expected) < 5 * np.sqrt(expected * (1 - expected) / shots)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from code_concatenation import SWEEP_COLUMNS, ResultsStore, run_adaptive_sweep
+from code_concatenation.cli import main
+
+SWEEP = dict(sampler='test', model='after encoding', level=1, recovery='coherent', optimize=False, schedule=False)
+
+
+class CountingSampler:
+    def __init__(self):
+        self.calls = 0
+
+    def sample(self, shots, p=None, seed=None):
+        self.calls += 1
+        return int(np.random.default_rng(seed).binomial(shots, p))
+
+
+def test_a_recorded_sweep_is_read_back_instead_of_sampled(tmp_path):
+    path = str(tmp_path / 'results.db')
+    error_rates = [0.01, 0.05]
+    sampler = CountingSampler()
+    with ResultsStore(path) as store:
+        first = run_adaptive_sweep(sampler, error_rates, 1000, 20_000, 0.2, seed=3, workers=1, store=store, sweep=SWEEP)
+    calls = sampler.calls
+    assert calls > 0
+
+    with ResultsStore(path) as store:
+        again = run_adaptive_sweep(sampler, error_rates, 1000, 20_000, 0.2, seed=3, workers=1, store=store, sweep=SWEEP)
+        p, failures, shots = store.points(**SWEEP)
+    assert sampler.calls == calls
+    np.testing.assert_array_equal(first, again)
+    np.testing.assert_array_equal(p, error_rates)
+    np.testing.assert_array_equal(failures, first[0])
+    np.testing.assert_array_equal(shots, first[1])
+
+    # a longer sweep resumes after the recorded rounds and gives the same counts as an uninterrupted one
+    with ResultsStore(path) as store:
+        longer = run_adaptive_sweep(sampler, error_rates, 1000, 40_000, 0.1, seed=3, workers=1, store=store, sweep=SWEEP)
+    fresh = run_adaptive_sweep(CountingSampler(), error_rates, 1000, 40_000, 0.1, seed=3, workers=1)
+    np.testing.assert_array_equal(longer, fresh)
+
+
+def test_recorded_rounds_are_never_changed(tmp_path):
+    sweep = dict(SWEEP, batch=100, seed=0)
+    assert set(sweep) == set(SWEEP_COLUMNS)
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        store.record_round(sweep, 0, [0.01, 0.02], [1, 2])
+        store.record_round(sweep, 0, [0.01, 0.03], [7, 3])
+        assert store.load_round(sweep, 0) == {0.01: 1, 0.02: 2, 0.03: 3}
+        assert store.load_round(sweep, 1) == {}
+        p, failures, shots = store.points(level=1)
+        assert p.tolist() == [0.01, 0.02, 0.03] and failures.tolist() == [1, 2, 3] and shots.tolist() == [100] * 3
+
+
+def test_sweeps_with_other_seeds_are_kept_apart(tmp_path):
+    path = str(tmp_path / 'results.db')
+    columns = dict(sampler='frame', model='after encoding', level=1, recovery='coherent', optimize=False,
+                   schedule=False)
+    with ResultsStore(path) as store:
+        for seed, failures in [(0, 1), (1, 5)]:
+            store.record_round(dict(columns, batch=100, seed=seed), 0, [0.01], [failures])
+        assert store.sweeps(**columns) == [(100, 0), (100, 1)]
+        assert store.points(**columns, seed=1)[1].tolist() == [5]
+        assert store.points(**columns)[1].tolist() == [6]
+
+    with pytest.raises(SystemExit, match='2 sweeps of this circuit'):
+        main(['plot', '--store', path, '--no-plot'])
+    assert main(['plot', '--store', path, '--no-plot', '--seed', '1']) == 0
+    assert main(['plot', '--store', path, '--no-plot', '--pool']) == 0
@@ -0,0 +1,41 @@
+import cirq
+import numpy as np
+
+from code_concatenation import (
+    RECOVERY_MODES, CirqSampler, OutcomeCache, SparseNoise, count_logical_errors, frame_sampler, noisy_circuit,
+    run_sweep, with_logical_readout,
+)
+
+
+def test_logical_readout():
+    q = cirq.LineQubit(0)
+    readout = with_logical_readout(cirq.Circuit(cirq.H(q)))
+    assert readout[-2:] == cirq.Circuit([cirq.H(q), cirq.measure(q, key='logical')])
+
+    # the decoded qubit is read in the X basis: |+> never fails, a Z on it always does and an X never does
+    simulator = cirq.Simulator(seed=0)
+    assert count_logical_errors(simulator, cirq.Circuit(cirq.H(q)), 50) == 0
+    assert count_logical_errors(simulator, cirq.Circuit(cirq.H(q), cirq.Z(q)), 50) == 50
+    assert count_logical_errors(simulator, cirq.Circuit(cirq.H(q), cirq.X(q)), 50) == 0
+
+    for recovery in RECOVERY_MODES:
+        noise = SparseNoise(noisy_circuit(1, 'after encoding', recovery))
+        assert count_logical_errors(simulator, noise.noiseless_circuit, 50) == 0
+        # X on every data qubit is a logical operator that flips the readout, Z on every data qubit leaves it
+        x, z = [noise.circuit_with_faults(tuple((location, pauli) for location in range(9))) for pauli in (1, 2)]
+        assert count_logical_errors(simulator, x, 50) == 50
+        assert count_logical_errors(simulator, z, 50) == 0
+
+
+def test_counts_do_not_depend_on_the_workers():
+    error_rates = [0.01, 0.05, 0.1]
+    sampler = frame_sampler(1, 'everywhere')
+    serial = run_sweep(sampler, error_rates, 10_000, seed=4, workers=1, chunk_size=3_000)
+    assert serial.tolist() == run_sweep(sampler, error_rates, 10_000, seed=4, workers=2, chunk_size=3_000).tolist()
+    assert np.all(serial > 0)
+
+    circuit = noisy_circuit(1, 'after encoding')
+    with CirqSampler(circuit, outcomes=OutcomeCache()) as sampler:
+        serial = run_sweep(sampler, error_rates, 300, seed=5, workers=1, chunk_size=100)
+    with CirqSampler(circuit, outcomes=OutcomeCache()) as sampler:
+        assert serial.tolist() == run_sweep(sampler, error_rates, 300, seed=5, workers=2, chunk_size=100).tolist()
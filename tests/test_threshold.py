@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from code_concatenation import enumerate_fault_configurations, find_threshold, frame_sampler
+from code_concatenation.cli import main
+
+
+# a sampler whose logical error rate is a given function of p
+class CurveSampler:
+    def __init__(self, rate):
+        self.rate = rate
+
+    def sample(self, shots: int, p: float, seed=None) -> int:
+        return int(np.random.default_rng(seed).binomial(shots, min(1.0, self.rate(p))))
+
+
+def test_synthetic_crossing():
+    # 2 p^2 and 200 p^4 cross at p = 0.1
+    samplers = [CurveSampler(lambda p: 2 * p**2), CurveSampler(lambda p: 200 * p**4)]
+    estimate = find_threshold(samplers, 0.03, 0.25, max_shots=1_000_000, resamples=200, workers=1)
+    assert abs(estimate.threshold - 0.1) < 0.005
+    low, high = estimate.interval
+    assert low < estimate.threshold < high and high - low < 0.02
+    assert np.all(np.diff(estimate.error_rates) > 0) and estimate.failures.shape == estimate.shots.shape
+
+
+def test_curves_that_do_not_cross():
+    samplers = [CurveSampler(lambda p: 2 * p**2), CurveSampler(lambda p: 4 * p**2)]
+    with pytest.raises(ValueError, match='do not cross'):
+        find_threshold(samplers, 0.01, 0.1, shots=10_000, workers=1)
+
+
+def test_level_1_against_a_synthetic_level_2():
+    # the level 1 rate is about A_2 (p/3)^2, the higher curve c p^4 crosses it at 0.05
+    sampler = frame_sampler(1, 'after encoding')
+    a2 = enumerate_fault_configurations(sampler, max_weight=2).failing[2]
+    c = a2 / 9 / 0.05**2
+    estimate = find_threshold([sampler, CurveSampler(lambda p: c * p**4)], 0.01, 0.2, max_shots=1_000_000,
+                              resamples=200, workers=1)
+    assert 0.04 < estimate.threshold < 0.06
+    assert estimate.interval[0] < estimate.threshold < estimate.interval[1]
+
+
+def test_threshold_command_explains_the_level_2_circuit():
+    with pytest.raises(SystemExit, match='no pseudo-threshold without the level 2 rates'):
+        main(['threshold', '--min', '0.001', '--max', '0.1'])